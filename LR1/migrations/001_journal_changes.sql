@@ -0,0 +1,50 @@
+-- Журнал змін journal для інкрементальної синхронізації локальних копій.
+-- Нові рядки клієнт забирає за позначкою journal_id > high-water mark,
+-- а оновлення та видалення — з journal_changes за change_id > останньої позначки.
+
+CREATE TABLE IF NOT EXISTS public.journal_changes
+(
+    change_id bigserial NOT NULL,
+    journal_id integer NOT NULL,
+    op character(1) NOT NULL,
+    changed_at timestamp NOT NULL DEFAULT now(),
+    CONSTRAINT journal_changes_pkey PRIMARY KEY (change_id),
+    CONSTRAINT journal_changes_op_check CHECK (op IN ('U', 'D'))
+);
+
+-- Тригери рівня оператора з transition tables: один INSERT ... SELECT на весь UPDATE/DELETE,
+-- а не окремий виклик функції на кожен рядок (важливо для generate_journal та delete_all).
+CREATE OR REPLACE FUNCTION public.journal_log_update()
+RETURNS trigger AS $$
+BEGIN
+    INSERT INTO public.journal_changes(journal_id, op)
+    SELECT n.journal_id, 'U' FROM new_rows n;
+    -- якщо змінили сам journal_id — старий id для клієнта означає видалення
+    INSERT INTO public.journal_changes(journal_id, op)
+    SELECT o.journal_id, 'D'
+    FROM old_rows o
+    WHERE NOT EXISTS (SELECT 1 FROM new_rows n WHERE n.journal_id = o.journal_id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.journal_log_delete()
+RETURNS trigger AS $$
+BEGIN
+    INSERT INTO public.journal_changes(journal_id, op)
+    SELECT o.journal_id, 'D' FROM old_rows o;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS journal_changes_upd ON public.journal;
+CREATE TRIGGER journal_changes_upd
+    AFTER UPDATE ON public.journal
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.journal_log_update();
+
+DROP TRIGGER IF EXISTS journal_changes_del ON public.journal;
+CREATE TRIGGER journal_changes_del
+    AFTER DELETE ON public.journal
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.journal_log_delete();
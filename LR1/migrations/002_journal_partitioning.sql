@@ -0,0 +1,84 @@
+-- Декларативне партиціювання journal за діапазонами entry_date (одна партиція на рік: journal_y2021, ...).
+-- Запити з умовою на entry_date (complex_query_2) читають лише потрібні роки, а старі роки
+-- можна від'єднати (DETACH PARTITION) або перенести в схему archive без перезапису даних.
+-- Ключ партиціювання має входити в первинний ключ, тому PK стає (journal_id, entry_date);
+-- унікальність journal_id перевіряє клієнт (Model.insert_journal) і генератор (MAX(journal_id)).
+
+-- Створити партиції для всіх років, що перетинаються з [date_from, date_to]; повертає кількість нових
+CREATE OR REPLACE FUNCTION public.journal_ensure_partitions(date_from date, date_to date)
+RETURNS integer AS $$
+DECLARE
+    y integer;
+    created integer := 0;
+BEGIN
+    FOR y IN EXTRACT(YEAR FROM date_from)::int .. EXTRACT(YEAR FROM date_to)::int LOOP
+        IF to_regclass(format('public.journal_y%s', y)) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS public.%I PARTITION OF public.journal FOR VALUES FROM (%L) TO (%L)',
+                'journal_y' || y, make_date(y, 1, 1), make_date(y + 1, 1, 1)
+            );
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    first_date date;
+    last_date date;
+BEGIN
+    IF (SELECT c.relkind FROM pg_class c WHERE c.oid = 'public.journal'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE public.journal RENAME TO journal_legacy;
+    ALTER TABLE public.journal_legacy RENAME CONSTRAINT "Journal_pkey" TO journal_legacy_pkey;
+
+    CREATE TABLE public.journal
+    (
+        journal_id integer NOT NULL,
+        student_id integer NOT NULL,
+        teacher_id integer NOT NULL,
+        subject_id integer NOT NULL,
+        entry_date date NOT NULL,
+        grade integer,
+        attendance_status character varying(30) NOT NULL,
+        CONSTRAINT "Journal_pkey" PRIMARY KEY (journal_id, entry_date)
+    ) PARTITION BY RANGE (entry_date);
+
+    ALTER TABLE public.journal
+        ADD FOREIGN KEY (student_id) REFERENCES public.student (student_id);
+    ALTER TABLE public.journal
+        ADD FOREIGN KEY (teacher_id) REFERENCES public.teacher (teacher_id);
+    ALTER TABLE public.journal
+        ADD FOREIGN KEY (subject_id) REFERENCES public.subject (subject_id);
+
+    SELECT MIN(entry_date), MAX(entry_date) INTO first_date, last_date FROM public.journal_legacy;
+    -- наперед створюється і наступний рік
+    PERFORM public.journal_ensure_partitions(
+        LEAST(COALESCE(first_date, current_date), current_date),
+        GREATEST(COALESCE(last_date, current_date), current_date + interval '1 year')::date
+    );
+
+    INSERT INTO public.journal SELECT * FROM public.journal_legacy;
+    -- разом зі старою таблицею видаляються і її тригери journal_changes_*
+    DROP TABLE public.journal_legacy;
+END;
+$$;
+
+-- Тригери журналу змін (міграція 001) на партиціонованій таблиці
+DROP TRIGGER IF EXISTS journal_changes_upd ON public.journal;
+CREATE TRIGGER journal_changes_upd
+    AFTER UPDATE ON public.journal
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.journal_log_update();
+
+DROP TRIGGER IF EXISTS journal_changes_del ON public.journal;
+CREATE TRIGGER journal_changes_del
+    AFTER DELETE ON public.journal
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.journal_log_delete();
+
+CREATE SCHEMA IF NOT EXISTS archive;
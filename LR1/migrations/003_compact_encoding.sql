@@ -0,0 +1,87 @@
+-- Компактне кодування: journal.attendance_status varchar(30) -> attendance smallint (довідник attendance_code),
+-- student.class varchar(20) -> class_id smallint (вимір school_class).
+-- Коди відвідуваності збігаються з індексами ATTENDANCE_STATUSES у моделях: 0 present, 1 absent, 2 late.
+-- Представлення journal_decoded / student_decoded повертають рядки в початковому вигляді
+-- (ті самі стовпці в тому самому порядку) — через них моделі читають дані.
+
+CREATE TABLE IF NOT EXISTS public.attendance_code
+(
+    code smallint NOT NULL,
+    status character varying(30) NOT NULL,
+    CONSTRAINT attendance_code_pkey PRIMARY KEY (code),
+    CONSTRAINT attendance_code_status_key UNIQUE (status)
+);
+
+INSERT INTO public.attendance_code(code, status)
+VALUES (0, 'present'), (1, 'absent'), (2, 'late')
+ON CONFLICT (code) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS public.school_class
+(
+    class_id smallint GENERATED BY DEFAULT AS IDENTITY,
+    name character varying(20) NOT NULL,
+    CONSTRAINT school_class_pkey PRIMARY KEY (class_id),
+    CONSTRAINT school_class_name_key UNIQUE (name)
+);
+
+-- Ідентифікатор класу за назвою (новий клас додається у вимір); NULL -> NULL
+CREATE OR REPLACE FUNCTION public.class_id_of(class_name character varying)
+RETURNS smallint AS $$
+DECLARE
+    cid smallint;
+BEGIN
+    IF class_name IS NULL THEN
+        RETURN NULL;
+    END IF;
+    SELECT class_id INTO cid FROM public.school_class WHERE name = class_name;
+    IF cid IS NULL THEN
+        INSERT INTO public.school_class(name) VALUES (class_name)
+        ON CONFLICT (name) DO NOTHING
+        RETURNING class_id INTO cid;
+        IF cid IS NULL THEN
+            SELECT class_id INTO cid FROM public.school_class WHERE name = class_name;
+        END IF;
+    END IF;
+    RETURN cid;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+               WHERE table_schema = 'public' AND table_name = 'student' AND column_name = 'class') THEN
+        INSERT INTO public.school_class(name)
+        SELECT DISTINCT class FROM public.student ORDER BY 1
+        ON CONFLICT (name) DO NOTHING;
+
+        ALTER TABLE public.student ADD COLUMN class_id smallint;
+        UPDATE public.student s SET class_id = c.class_id FROM public.school_class c WHERE c.name = s.class;
+        ALTER TABLE public.student ALTER COLUMN class_id SET NOT NULL;
+        ALTER TABLE public.student
+            ADD CONSTRAINT student_class_id_fkey FOREIGN KEY (class_id) REFERENCES public.school_class (class_id);
+        ALTER TABLE public.student DROP COLUMN class;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM information_schema.columns
+               WHERE table_schema = 'public' AND table_name = 'journal' AND column_name = 'attendance_status') THEN
+        -- один перезапис таблиці (і всіх партицій) без UPDATE: без роздування і без тригерів journal_changes
+        ALTER TABLE public.journal ALTER COLUMN attendance_status TYPE smallint
+            USING CASE attendance_status WHEN 'present' THEN 0 WHEN 'absent' THEN 1 WHEN 'late' THEN 2 END;
+        ALTER TABLE public.journal RENAME COLUMN attendance_status TO attendance;
+        ALTER TABLE public.journal
+            ADD CONSTRAINT journal_attendance_fkey FOREIGN KEY (attendance) REFERENCES public.attendance_code (code);
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE VIEW public.journal_decoded AS
+SELECT j.journal_id, j.student_id, j.teacher_id, j.subject_id, j.entry_date, j.grade,
+       a.status AS attendance_status
+FROM public.journal j
+JOIN public.attendance_code a ON a.code = j.attendance;
+
+CREATE OR REPLACE VIEW public.student_decoded AS
+SELECT s.student_id, s.parents_id, s.first_name, s.last_name, s.birth_date,
+       c.name AS class, s.email
+FROM public.student s
+JOIN public.school_class c ON c.class_id = s.class_id;
@@ -0,0 +1,122 @@
+-- Табелі успішності: підсумки journal по (учень, предмет, місяць) у report_card_summary,
+-- які підтримуються тригерами рівня оператора, і покривний індекс journal для неповних місяців
+-- на краях періоду. Табель класу за довільний період — один запит (Model.report_cards).
+-- Потребує міграції 003 (journal.attendance — код: 0 present, 1 absent, 2 late).
+
+CREATE TABLE IF NOT EXISTS public.report_card_summary
+(
+    student_id integer NOT NULL,
+    subject_id integer NOT NULL,
+    month date NOT NULL,
+    marks_count integer NOT NULL,
+    graded_count integer NOT NULL,
+    grade_sum integer NOT NULL,
+    present_count integer NOT NULL,
+    absent_count integer NOT NULL,
+    late_count integer NOT NULL,
+    CONSTRAINT report_card_summary_pkey PRIMARY KEY (student_id, subject_id, month)
+);
+
+-- Порожні після видалень рядки знаходяться за маленьким частковим індексом, а не повним проходом
+CREATE INDEX IF NOT EXISTS report_card_summary_empty_idx
+    ON public.report_card_summary (student_id) WHERE marks_count = 0;
+
+-- Вибірка за учнем і датою читає лише індекс (index-only scan) — без звернень до heap
+CREATE INDEX IF NOT EXISTS journal_student_date_idx
+    ON public.journal (student_id, entry_date) INCLUDE (subject_id, grade, attendance);
+
+-- Застосувати до підсумків дельту рядків journal (sign = 1 — додані, -1 — прибрані)
+CREATE OR REPLACE FUNCTION public.report_card_summary_apply()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO public.report_card_summary AS s
+        SELECT d.student_id, d.subject_id, date_trunc('month', d.entry_date)::date,
+               COUNT(*), COUNT(d.grade), COALESCE(SUM(d.grade), 0),
+               COUNT(*) FILTER (WHERE d.attendance = 0),
+               COUNT(*) FILTER (WHERE d.attendance = 1),
+               COUNT(*) FILTER (WHERE d.attendance = 2)
+        FROM new_rows d
+        GROUP BY 1, 2, 3
+        ON CONFLICT (student_id, subject_id, month) DO UPDATE SET
+            marks_count = s.marks_count + EXCLUDED.marks_count,
+            graded_count = s.graded_count + EXCLUDED.graded_count,
+            grade_sum = s.grade_sum + EXCLUDED.grade_sum,
+            present_count = s.present_count + EXCLUDED.present_count,
+            absent_count = s.absent_count + EXCLUDED.absent_count,
+            late_count = s.late_count + EXCLUDED.late_count;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO public.report_card_summary AS s
+        SELECT d.student_id, d.subject_id, date_trunc('month', d.entry_date)::date,
+               -COUNT(*), -COUNT(d.grade), -COALESCE(SUM(d.grade), 0),
+               -COUNT(*) FILTER (WHERE d.attendance = 0),
+               -COUNT(*) FILTER (WHERE d.attendance = 1),
+               -COUNT(*) FILTER (WHERE d.attendance = 2)
+        FROM old_rows d
+        GROUP BY 1, 2, 3
+        ON CONFLICT (student_id, subject_id, month) DO UPDATE SET
+            marks_count = s.marks_count + EXCLUDED.marks_count,
+            graded_count = s.graded_count + EXCLUDED.graded_count,
+            grade_sum = s.grade_sum + EXCLUDED.grade_sum,
+            present_count = s.present_count + EXCLUDED.present_count,
+            absent_count = s.absent_count + EXCLUDED.absent_count,
+            late_count = s.late_count + EXCLUDED.late_count;
+    ELSE
+        -- UPDATE: старі значення віднімаються, нові додаються (одним INSERT ... ON CONFLICT)
+        INSERT INTO public.report_card_summary AS s
+        SELECT d.student_id, d.subject_id, date_trunc('month', d.entry_date)::date,
+               SUM(d.sign), SUM(d.sign * (d.grade IS NOT NULL)::int), COALESCE(SUM(d.sign * d.grade), 0),
+               COALESCE(SUM(d.sign) FILTER (WHERE d.attendance = 0), 0),
+               COALESCE(SUM(d.sign) FILTER (WHERE d.attendance = 1), 0),
+               COALESCE(SUM(d.sign) FILTER (WHERE d.attendance = 2), 0)
+        FROM (
+            SELECT 1 AS sign, n.student_id, n.subject_id, n.entry_date, n.grade, n.attendance FROM new_rows n
+            UNION ALL
+            SELECT -1, o.student_id, o.subject_id, o.entry_date, o.grade, o.attendance FROM old_rows o
+        ) d
+        GROUP BY 1, 2, 3
+        ON CONFLICT (student_id, subject_id, month) DO UPDATE SET
+            marks_count = s.marks_count + EXCLUDED.marks_count,
+            graded_count = s.graded_count + EXCLUDED.graded_count,
+            grade_sum = s.grade_sum + EXCLUDED.grade_sum,
+            present_count = s.present_count + EXCLUDED.present_count,
+            absent_count = s.absent_count + EXCLUDED.absent_count,
+            late_count = s.late_count + EXCLUDED.late_count;
+    END IF;
+
+    DELETE FROM public.report_card_summary WHERE marks_count = 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS report_card_summary_ins ON public.journal;
+CREATE TRIGGER report_card_summary_ins
+    AFTER INSERT ON public.journal
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.report_card_summary_apply();
+
+DROP TRIGGER IF EXISTS report_card_summary_upd ON public.journal;
+CREATE TRIGGER report_card_summary_upd
+    AFTER UPDATE ON public.journal
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.report_card_summary_apply();
+
+DROP TRIGGER IF EXISTS report_card_summary_del ON public.journal;
+CREATE TRIGGER report_card_summary_del
+    AFTER DELETE ON public.journal
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.report_card_summary_apply();
+
+-- Початкове наповнення з наявних даних
+TRUNCATE public.report_card_summary;
+INSERT INTO public.report_card_summary
+SELECT student_id, subject_id, date_trunc('month', entry_date)::date,
+       COUNT(*), COUNT(grade), COALESCE(SUM(grade), 0),
+       COUNT(*) FILTER (WHERE attendance = 0),
+       COUNT(*) FILTER (WHERE attendance = 1),
+       COUNT(*) FILTER (WHERE attendance = 2)
+FROM public.journal
+GROUP BY 1, 2, 3;
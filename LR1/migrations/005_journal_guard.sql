@@ -0,0 +1,199 @@
+-- Тригер-охоронець journal (ЛР2, завдання 3) як версіонований артефакт у двох варіантах:
+--   row       — початковий BEFORE UPDATE OR DELETE FOR EACH ROW з курсорними циклами
+--               (на кожен змінений рядок — повний прохід записів учня);
+--   statement — AFTER UPDATE / AFTER DELETE FOR EACH STATEMENT з таблицями переходів:
+--               ті самі перевірки та повідомлення одним set-based запитом на оператор.
+-- Правила однакові: оцінка 1..12 при UPDATE, заборона видаляти записи з оцінкою >= 10.
+-- Активний варіант перемикає journal_guard_install('row' | 'statement' | 'none') (python main.py guard --install);
+-- сама міграція тригерів не встановлює і не знімає: лишається чинний до неї варіант (тригер
+-- trg_journal_before_ud зі звіту ЛР2 — це row, тепер з функцією звідси) або жодного.
+
+-- Варіант row: тригерна функція зі звіту ЛР2 без змін логіки
+CREATE OR REPLACE FUNCTION public.journal_before_update_delete()
+RETURNS trigger AS $$
+DECLARE
+    rec         record;
+    total_grade int := 0;
+    cnt         int := 0;
+    avg_grade   numeric;
+BEGIN
+
+    -- Обробка Update
+    IF TG_OP = 'UPDATE' THEN
+
+        -- 1) Умовний оператор - перевірка коректності оцінки
+        IF NEW.grade IS NOT NULL AND (NEW.grade < 1 OR NEW.grade > 12) THEN
+            RAISE EXCEPTION 'Недопустима оцінка: %, дозволено 1..12', NEW.grade;
+        END IF;
+
+        -- 2) Курсорний цикл - рахуємо середній бал цього студента
+        total_grade := 0;
+        cnt := 0;
+
+        FOR rec IN
+            SELECT grade
+            FROM public.journal
+            WHERE student_id = NEW.student_id
+        LOOP
+            IF rec.grade IS NOT NULL THEN
+                total_grade := total_grade + rec.grade;
+                cnt := cnt + 1;
+            END IF;
+        END LOOP;
+
+        -- 3) Блок з обробкою виключної ситуації
+        BEGIN
+            avg_grade := total_grade::numeric / cnt;
+            RAISE NOTICE 'Середній бал студента % до оновлення: %',
+                         NEW.student_id, avg_grade;
+        EXCEPTION
+            WHEN division_by_zero THEN
+                RAISE NOTICE
+                    'Неможливо обчислити середній бал для студента % (відсутні оцінки)',
+                    NEW.student_id;
+        END;
+
+        RETURN NEW;
+
+    -- Обробка Delete
+    ELSIF TG_OP = 'DELETE' THEN
+
+        -- 4) Умова - заборонити видаляти записи з високою оцінкою
+        IF OLD.grade IS NOT NULL AND OLD.grade >= 10 THEN
+            RAISE EXCEPTION
+                'Заборонено видаляти записи з високою оцінкою (>=10). student_id=%, journal_id=%',
+                OLD.student_id, OLD.journal_id;
+        END IF;
+
+        -- 5) Курсорний цикл - підрахуємо, скільки записів ще лишається у цього учня
+        cnt := 0;
+        FOR rec IN
+            SELECT journal_id
+            FROM public.journal
+            WHERE student_id = OLD.student_id
+              AND journal_id <> OLD.journal_id
+        LOOP
+            cnt := cnt + 1;
+        END LOOP;
+
+        RAISE NOTICE
+            'Після видалення запису % у студента % залишиться % запис(ів) у журналі',
+            OLD.journal_id, OLD.student_id, cnt;
+
+        RETURN OLD;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Варіант statement: перевірка всіх рядків оператора одним запитом до таблиці переходів,
+-- підсумки по учнях — одним агрегатом через індекс journal_student_date_idx (міграція 004).
+-- AFTER-тригер, що кидає виключення, відкочує весь оператор — як і BEFORE-тригер рядка.
+CREATE OR REPLACE FUNCTION public.journal_guard_statement()
+RETURNS trigger AS $$
+DECLARE
+    bad record;
+    rec record;
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        SELECT n.grade INTO bad
+        FROM new_rows n
+        WHERE n.grade IS NOT NULL AND (n.grade < 1 OR n.grade > 12)
+        LIMIT 1;
+        IF FOUND THEN
+            RAISE EXCEPTION 'Недопустима оцінка: %, дозволено 1..12', bad.grade;
+        END IF;
+
+        -- середній бал до оновлення = поточні записи учня - нові значення + старі значення
+        FOR rec IN
+            SELECT d.student_id, SUM(d.sign * d.grade) AS total_grade,
+                   SUM(d.sign * (d.grade IS NOT NULL)::int) AS cnt
+            FROM (
+                SELECT 1 AS sign, j.student_id, j.grade
+                FROM public.journal j
+                WHERE j.student_id IN (SELECT student_id FROM old_rows UNION SELECT student_id FROM new_rows)
+                UNION ALL
+                SELECT -1, n.student_id, n.grade FROM new_rows n
+                UNION ALL
+                SELECT 1, o.student_id, o.grade FROM old_rows o
+            ) d
+            GROUP BY d.student_id
+            ORDER BY d.student_id
+        LOOP
+            IF rec.cnt > 0 THEN
+                RAISE NOTICE 'Середній бал студента % до оновлення: %',
+                             rec.student_id, rec.total_grade::numeric / rec.cnt;
+            ELSE
+                RAISE NOTICE 'Неможливо обчислити середній бал для студента % (відсутні оцінки)',
+                             rec.student_id;
+            END IF;
+        END LOOP;
+    ELSE
+        SELECT o.student_id, o.journal_id INTO bad
+        FROM old_rows o
+        WHERE o.grade IS NOT NULL AND o.grade >= 10
+        LIMIT 1;
+        IF FOUND THEN
+            RAISE EXCEPTION
+                'Заборонено видаляти записи з високою оцінкою (>=10). student_id=%, journal_id=%',
+                bad.student_id, bad.journal_id;
+        END IF;
+
+        -- AFTER-тригер бачить таблицю вже без видалених рядків
+        FOR rec IN
+            SELECT s.student_id, s.deleted,
+                   (SELECT COUNT(*) FROM public.journal j WHERE j.student_id = s.student_id) AS remaining
+            FROM (SELECT student_id, COUNT(*) AS deleted FROM old_rows GROUP BY student_id) s
+            ORDER BY s.student_id
+        LOOP
+            RAISE NOTICE
+                'Після видалення % запис(ів) у студента % залишиться % запис(ів) у журналі',
+                rec.deleted, rec.student_id, rec.remaining;
+        END LOOP;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Встановлений варіант охоронця: 'row', 'statement' або 'none'
+CREATE OR REPLACE FUNCTION public.journal_guard_variant()
+RETURNS text AS $$
+    SELECT CASE
+        WHEN EXISTS (SELECT 1 FROM pg_trigger WHERE tgrelid = 'public.journal'::regclass
+                     AND tgname = 'trg_journal_before_ud') THEN 'row'
+        WHEN EXISTS (SELECT 1 FROM pg_trigger WHERE tgrelid = 'public.journal'::regclass
+                     AND tgname = 'journal_guard_upd') THEN 'statement'
+        ELSE 'none'
+    END;
+$$ LANGUAGE sql STABLE;
+
+-- Встановити один варіант охоронця (інші знімаються); повертає встановлений варіант
+CREATE OR REPLACE FUNCTION public.journal_guard_install(variant text)
+RETURNS text AS $$
+BEGIN
+    IF variant NOT IN ('row', 'statement', 'none') THEN
+        RAISE EXCEPTION 'Невідомий варіант тригера: % (row, statement, none)', variant;
+    END IF;
+
+    DROP TRIGGER IF EXISTS trg_journal_before_ud ON public.journal;
+    DROP TRIGGER IF EXISTS journal_guard_upd ON public.journal;
+    DROP TRIGGER IF EXISTS journal_guard_del ON public.journal;
+
+    IF variant = 'row' THEN
+        CREATE TRIGGER trg_journal_before_ud
+            BEFORE UPDATE OR DELETE ON public.journal
+            FOR EACH ROW EXECUTE FUNCTION public.journal_before_update_delete();
+    ELSIF variant = 'statement' THEN
+        CREATE TRIGGER journal_guard_upd
+            AFTER UPDATE ON public.journal
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION public.journal_guard_statement();
+        CREATE TRIGGER journal_guard_del
+            AFTER DELETE ON public.journal
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION public.journal_guard_statement();
+    END IF;
+    RETURN variant;
+END;
+$$ LANGUAGE plpgsql;
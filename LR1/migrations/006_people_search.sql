@@ -0,0 +1,16 @@
+-- Нечіткий пошук людей (Model.search_people): ім'я, прізвище й email у student, parents, teacher
+-- як один рядок "first_name last_name email" з GIN-індексом триграм pg_trgm на кожну таблицю.
+-- Оператор <% (word_similarity) знаходить частину прізвища з помилками, ILIKE '%...%' — підрядок email;
+-- обидва користуються тим самим індексом, тож top-k на мільйонах рядків — без послідовного проходу.
+-- Вираз індексу має збігатися з SEARCH_DOCUMENT у RGR/model.py.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS student_search_trgm_idx
+    ON public.student USING gin ((first_name || ' ' || last_name || ' ' || email) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS parents_search_trgm_idx
+    ON public.parents USING gin ((first_name || ' ' || last_name || ' ' || email) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS teacher_search_trgm_idx
+    ON public.teacher USING gin ((first_name || ' ' || last_name || ' ' || email) gin_trgm_ops);
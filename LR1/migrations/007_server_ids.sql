@@ -0,0 +1,28 @@
+-- Серверні первинні ключі: паралельні генератори й імпорти більше не рахують MAX(pk) + номер рядка
+-- і не конфліктують за ключами. parents, teacher, subject, student — GENERATED BY DEFAULT AS IDENTITY;
+-- у партиціонованій journal identity до PostgreSQL 17 не підтримується, тож journal_id отримує
+-- власну послідовність (OWNED BY) як DEFAULT. Обидва варіанти знаходить pg_get_serial_sequence —
+-- через нього моделі резервують блоки id (nextval пачкою) і пропускають PK при вставці.
+-- BY DEFAULT лишає можливість явних id (імпорт, upsert_many); послідовність стартує після поточного MAX.
+
+DO $$
+DECLARE
+    t record;
+BEGIN
+    FOR t IN
+        SELECT * FROM (VALUES ('parents', 'parents_id'), ('teacher', 'teacher_id'),
+                              ('subject', 'subject_id'), ('student', 'student_id')) v(tbl, col)
+    LOOP
+        IF pg_get_serial_sequence(format('public.%I', t.tbl), t.col) IS NULL THEN
+            EXECUTE format('ALTER TABLE public.%I ALTER COLUMN %I ADD GENERATED BY DEFAULT AS IDENTITY', t.tbl, t.col);
+        END IF;
+        EXECUTE format('SELECT setval(%L, COALESCE((SELECT max(%I) FROM public.%I), 0) + 1, false)',
+                       pg_get_serial_sequence(format('public.%I', t.tbl), t.col), t.col, t.tbl);
+    END LOOP;
+END $$;
+
+CREATE SEQUENCE IF NOT EXISTS public.journal_journal_id_seq AS integer OWNED BY public.journal.journal_id;
+
+ALTER TABLE public.journal ALTER COLUMN journal_id SET DEFAULT nextval('public.journal_journal_id_seq');
+
+SELECT setval('public.journal_journal_id_seq', COALESCE((SELECT max(journal_id) FROM public.journal), 0) + 1, false);
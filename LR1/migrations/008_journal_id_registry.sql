@@ -0,0 +1,89 @@
+-- Глобальна унікальність journal_id у партиціонованій journal. PK партиціонованої таблиці мусить містити
+-- ключ партиціювання, тож після міграції 002 PK = (journal_id, entry_date) і той самий journal_id з іншою
+-- датою БД не відхиляла. Реєстр journal_id_registry — звичайна таблиця з PK за journal_id; її ведуть
+-- тригери рівня оператора на journal. INSERT або UPDATE, що дає вже наявний journal_id, падає з unique_violation
+-- (journal_id_registry_pkey) у тій самій транзакції — без перевірок на клієнті і без гонок між ними.
+-- Від'єднані роки (DETACH PARTITION) лишають свої id у реєстрі: повернення року не створить дублікатів.
+
+CREATE TABLE IF NOT EXISTS public.journal_id_registry
+(
+    journal_id integer NOT NULL,
+    CONSTRAINT journal_id_registry_pkey PRIMARY KEY (journal_id)
+);
+
+DO $$
+DECLARE
+    dups text;
+BEGIN
+    SELECT string_agg(journal_id::text, ', ') INTO dups
+    FROM (SELECT journal_id FROM public.journal GROUP BY journal_id HAVING count(*) > 1 ORDER BY 1 LIMIT 20) d;
+    IF dups IS NOT NULL THEN
+        RAISE EXCEPTION 'journal_id повторюються в journal: %', dups
+            USING HINT = 'Змініть або видаліть дублікати і повторіть python main.py migrate.';
+    END IF;
+END;
+$$;
+
+INSERT INTO public.journal_id_registry(journal_id)
+SELECT journal_id FROM public.journal
+ON CONFLICT (journal_id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION public.journal_registry_insert()
+RETURNS trigger AS $$
+BEGIN
+    INSERT INTO public.journal_id_registry(journal_id) SELECT n.journal_id FROM new_rows n;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.journal_registry_update()
+RETURNS trigger AS $$
+BEGIN
+    -- набір id не змінився (оновлено інші стовпці або дату) — реєстр не чіпається
+    IF NOT EXISTS (SELECT n.journal_id FROM new_rows n EXCEPT ALL SELECT o.journal_id FROM old_rows o) THEN
+        RETURN NULL;
+    END IF;
+    DELETE FROM public.journal_id_registry r USING old_rows o WHERE r.journal_id = o.journal_id;
+    INSERT INTO public.journal_id_registry(journal_id) SELECT n.journal_id FROM new_rows n;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.journal_registry_delete()
+RETURNS trigger AS $$
+BEGIN
+    DELETE FROM public.journal_id_registry r USING old_rows o WHERE r.journal_id = o.journal_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.journal_registry_truncate()
+RETURNS trigger AS $$
+BEGIN
+    TRUNCATE public.journal_id_registry;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS journal_registry_ins ON public.journal;
+CREATE TRIGGER journal_registry_ins
+    AFTER INSERT ON public.journal
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.journal_registry_insert();
+
+DROP TRIGGER IF EXISTS journal_registry_upd ON public.journal;
+CREATE TRIGGER journal_registry_upd
+    AFTER UPDATE ON public.journal
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.journal_registry_update();
+
+DROP TRIGGER IF EXISTS journal_registry_del ON public.journal;
+CREATE TRIGGER journal_registry_del
+    AFTER DELETE ON public.journal
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.journal_registry_delete();
+
+DROP TRIGGER IF EXISTS journal_registry_trunc ON public.journal;
+CREATE TRIGGER journal_registry_trunc
+    AFTER TRUNCATE ON public.journal
+    FOR EACH STATEMENT EXECUTE FUNCTION public.journal_registry_truncate();
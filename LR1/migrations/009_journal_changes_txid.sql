@@ -0,0 +1,30 @@
+-- Синхронізація знімків journal за позицією транзакцій замість верхньої межі journal_id.
+-- Міграція 001 фіксувала лише UPDATE/DELETE, а нові рядки клієнт шукав як journal_id > найбільшого
+-- завантаженого; рядок із меншим id (пізніша фіксація, блоки IdAllocator, upsert_many) пропадав зі знімка.
+-- Тепер INSERT теж пишеться в journal_changes (op 'I'), а кожен запис несе txid — xid8 своєї транзакції.
+-- Позначка знімка — xmin знімка БД (pg_snapshot_xmin(pg_current_snapshot())): усі транзакції з меншим xid
+-- на той момент уже завершені, тож дельта наступної синхронізації — записи з txid >= позначки,
+-- незалежно від порядку фіксацій (change_id видається при вставці, а не при COMMIT).
+
+ALTER TABLE public.journal_changes DROP CONSTRAINT IF EXISTS journal_changes_op_check;
+ALTER TABLE public.journal_changes
+    ADD CONSTRAINT journal_changes_op_check CHECK (op IN ('I', 'U', 'D'));
+
+ALTER TABLE public.journal_changes ADD COLUMN IF NOT EXISTS txid xid8 NOT NULL DEFAULT pg_current_xact_id();
+
+CREATE INDEX IF NOT EXISTS journal_changes_txid_idx ON public.journal_changes (txid);
+
+CREATE OR REPLACE FUNCTION public.journal_log_insert()
+RETURNS trigger AS $$
+BEGIN
+    INSERT INTO public.journal_changes(journal_id, op)
+    SELECT n.journal_id, 'I' FROM new_rows n;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS journal_changes_ins ON public.journal;
+CREATE TRIGGER journal_changes_ins
+    AFTER INSERT ON public.journal
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.journal_log_insert();
@@ -0,0 +1,356 @@
+import asyncio
+
+import common_path  # noqa: F401 — корінь репозиторію в sys.path (пакет common)
+from common.instrumentation import STATEMENT_STATS, instrument_engine
+from common.metrics import meter_engine, timed_methods
+from common.tracing import TRACER, traced_methods
+from model import COMPACT_MARKER, DB, Model, ValidationError, check_journal_fields, year_of
+
+# SQLAlchemy, драйвер і ORM-класи (orm.py) імпортуються ліниво — при першій операції з даними, як у Model
+
+
+# Асинхронний варіант Model (AsyncEngine + AsyncSession, драйвер psycopg).
+# Кожна операція бере власну сесію з пулу, тому методи можна запускати
+# конкурентно (asyncio.gather) — сотні операцій ділять кілька з'єднань.
+class AsyncModel:
+
+    PK_MAP = Model.PK_MAP
+
+    # Ініціалізація (async engine і фабрика сесій створюються при першій операції з даними)
+    def __init__(self, pool_size=5, max_overflow=5):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.statement_stats = STATEMENT_STATS
+        self.statement_listeners = [STATEMENT_STATS, TRACER]
+        self._engine = None
+        self._sessions = None
+        # ORM-класи під кодування БД (orm.orm_schema); визначаються перед першою операцією з БД
+        self.orm = None
+        # партиціонованість journal (міграція 002) і роки, для яких партиції вже є
+        self._journal_partitioned = None
+        self._journal_years = set()
+
+    # Async engine + фабрика сесій
+    def _connect(self):
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        conn_str = (
+            f"postgresql+psycopg://{DB['user']}:{DB['password']}"
+            f"@{DB['host']}:{DB['port']}/{DB['dbname']}"
+        )
+        self._engine = create_async_engine(
+            conn_str,
+            echo=False,
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+        )
+        # події SQLAlchemy реєструються на синхронному engine, що стоїть за AsyncEngine
+        instrument_engine(self._engine.sync_engine, self.statement_listeners)
+        meter_engine(self._engine.sync_engine, "AsyncModel")
+        self._sessions = async_sessionmaker(
+            bind=self._engine, autoflush=False, expire_on_commit=False
+        )
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._connect()
+        return self._engine
+
+    @property
+    def SessionLocal(self):
+        if self._sessions is None:
+            self._connect()
+        return self._sessions
+
+    # Визначити кодування БД (представлення journal_decoded з міграції 003), як Model._check_schema
+    async def _detect_schema(self):
+        if self.orm is None:
+            from sqlalchemy import text
+            from orm import orm_schema
+
+            async with self.engine.connect() as conn:
+                compact = (await conn.execute(
+                    text("SELECT to_regclass(:name) IS NOT NULL"), {"name": f"public.{COMPACT_MARKER}"}
+                )).scalar()
+            self.orm = orm_schema(bool(compact))
+        return self.orm
+
+    # Закрити пул з'єднань
+    async def close(self):
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+            self._sessions = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # Допоміжні методи (без звернень до БД) — спільні з Model
+    _validate_table = Model._validate_table
+    _orm_class = Model._orm_class
+    _obj_to_dict = Model._obj_to_dict
+    _get_columns_list = Model._get_columns_list
+    _write_attrs = Model._write_attrs
+    get_tables = Model.get_tables
+    get_columns = Model.get_columns
+
+    async def _commit(self, session):
+        from sqlalchemy.exc import IntegrityError
+
+        try:
+            await session.commit()
+        except IntegrityError as e:
+            await session.rollback()
+            raise e.orig
+
+    async def _row_exists(self, session, table, pk_col, value):
+        from sqlalchemy import select
+
+        cls = self._orm_class(table)
+        col = getattr(cls, pk_col)
+        res = await session.execute(select(col).where(col == value).limit(1))
+        return res.first() is not None
+
+    async def _insert(self, obj, pk_attr, checks=()):
+        async with self.SessionLocal() as session:
+            for table, pk_col, value, message in checks:
+                if not await self._row_exists(session, table, pk_col, value):
+                    raise ValidationError(message)
+            session.add(obj)
+            await self._commit(session)
+            return getattr(obj, pk_attr)
+
+    # Перегляд даних таблиці
+    async def list_table(self, table, limit=200):
+        from sqlalchemy import select
+
+        await self._detect_schema()
+        cls = self._orm_class(table)
+        stmt = select(cls)
+        pk_col = self.PK_MAP.get(table)
+        if pk_col is not None:
+            stmt = stmt.order_by(getattr(cls, pk_col))
+        async with self.SessionLocal() as session:
+            res = await session.execute(stmt.limit(limit))
+            return [self._obj_to_dict(o) for o in res.scalars()]
+
+    # Перевірка наявності рядка за PK
+    async def row_exists(self, table, pk_col, value):
+        await self._detect_schema()
+        async with self.SessionLocal() as session:
+            return await self._row_exists(session, table, pk_col, value)
+
+    # Insert-и
+    async def insert_parent(self, parents_id, first_name, last_name, phone, email):
+        if parents_id is None:
+            raise ValidationError(
+                "parents_id обов'язковий для вставки (не можна автогенерувати)."
+            )
+        orm = await self._detect_schema()
+        obj = orm.Parents(
+            parents_id=parents_id,
+            first_name=first_name,
+            last_name=last_name,
+            phone=phone,
+            email=email,
+        )
+        return await self._insert(obj, "parents_id")
+
+    async def insert_student(
+        self,
+        student_id,
+        parents_id,
+        first_name,
+        last_name,
+        birth_date,
+        class_,
+        email,
+    ):
+        if student_id is None:
+            raise ValidationError(
+                "student_id обов'язковий для вставки (не можна автогенерувати)."
+            )
+        checks = []
+        if parents_id is not None:
+            checks.append(
+                ("parents", "parents_id", parents_id,
+                 "Parent with given parents_id not found.")
+            )
+        orm = await self._detect_schema()
+        obj = orm.Student(**self._write_attrs("student", dict(
+            student_id=student_id,
+            parents_id=parents_id,
+            first_name=first_name,
+            last_name=last_name,
+            birth_date=birth_date,
+            class_=class_,
+            email=email,
+        )))
+        return await self._insert(obj, "student_id", checks)
+
+    async def insert_teacher(self, teacher_id, first_name, last_name, email):
+        if teacher_id is None:
+            raise ValidationError(
+                "teacher_id обов'язковий для вставки (не можна автогенерувати)."
+            )
+        orm = await self._detect_schema()
+        obj = orm.Teacher(
+            teacher_id=teacher_id,
+            first_name=first_name,
+            last_name=last_name,
+            email=email,
+        )
+        return await self._insert(obj, "teacher_id")
+
+    async def insert_subject(self, subject_id, name):
+        if subject_id is None:
+            raise ValidationError(
+                "subject_id обов'язковий для вставки (не можна автогенерувати)."
+            )
+        orm = await self._detect_schema()
+        obj = orm.Subject(subject_id=subject_id, name=name)
+        return await self._insert(obj, "subject_id")
+
+    async def insert_journal(
+        self,
+        journal_id,
+        student_id,
+        teacher_id,
+        subject_id,
+        entry_date,
+        grade,
+        attendance_status,
+    ):
+        if journal_id is None:
+            raise ValidationError(
+                "journal_id обов'язковий для вставки (не можна автогенерувати)."
+            )
+        check_journal_fields(grade, attendance_status)
+
+        checks = [("student", "student_id", student_id, "Student not found.")]
+        if teacher_id is not None:
+            checks.append(("teacher", "teacher_id", teacher_id, "Teacher not found."))
+        if subject_id is not None:
+            checks.append(("subject", "subject_id", subject_id, "Subject not found."))
+        if entry_date is not None:
+            await self.ensure_journal_partitions(entry_date, entry_date)
+
+        orm = await self._detect_schema()
+        obj = orm.Journal(
+            journal_id=journal_id,
+            student_id=student_id,
+            teacher_id=teacher_id,
+            subject_id=subject_id,
+            entry_date=entry_date,
+            grade=grade,
+            attendance_status=attendance_status,
+        )
+        # повтор journal_id відхиляє БД (реєстр journal_id_registry, міграція 008) — без окремого запиту
+        # перед вставкою і без гонки між перевіркою та вставкою
+        from psycopg import errors
+
+        try:
+            return await self._insert(obj, "journal_id", checks)
+        except errors.UniqueViolation:
+            raise ValidationError("journal_id вже існує.")
+
+    # Створити річні партиції journal для діапазону дат (як Model.ensure_journal_partitions)
+    async def ensure_journal_partitions(self, date_from, date_to):
+        from sqlalchemy import text
+
+        years = set(range(year_of(date_from), year_of(date_to) + 1))
+        if self._journal_partitioned is False or years <= self._journal_years:
+            return 0
+        async with self.SessionLocal() as session:
+            if self._journal_partitioned is None:
+                relkind = (await session.execute(
+                    text("SELECT relkind FROM pg_class WHERE oid = 'public.journal'::regclass")
+                )).scalar()
+                self._journal_partitioned = relkind == "p"
+                if not self._journal_partitioned:
+                    return 0
+            created = (await session.execute(
+                text("SELECT journal_ensure_partitions(CAST(:d1 AS date), CAST(:d2 AS date))"),
+                {"d1": date_from, "d2": date_to},
+            )).scalar()
+            await session.commit()
+        self._journal_years |= years
+        return created
+
+    # Update
+    async def update_by_pk(self, table, pk_col, pk_val, updates: dict):
+        from sqlalchemy import select
+        from orm import COLUMN_ATTRS
+
+        await self._detect_schema()
+        cls = self._orm_class(table)
+        if not updates:
+            return None
+
+        cols = self._get_columns_list(table)
+        async with self.SessionLocal() as session:
+            res = await session.execute(
+                select(cls).where(getattr(cls, pk_col) == pk_val)
+            )
+            obj = res.scalar_one_or_none()
+            if obj is None:
+                return None
+
+            attrs = {}
+            for col_name, value in updates.items():
+                if col_name not in cols:
+                    raise ValueError(f"Невідомий стовпець: {col_name}")
+                attr_name = COLUMN_ATTRS.get(col_name, col_name)
+                if not hasattr(obj, attr_name):
+                    raise ValueError(f"Невідомий атрибут: {attr_name}")
+                attrs[attr_name] = value
+            for attr_name, value in self._write_attrs(table, attrs).items():
+                setattr(obj, attr_name, value)
+
+            await self._commit(session)
+            if self.orm.compact and table == "student":
+                # class_id був SQL-виразом, а class_ — підзапит: перечитати рядок (лінивого завантаження в async немає)
+                await session.refresh(obj)
+            return self._obj_to_dict(obj)
+
+    # Delete
+    async def delete_by_pk(self, table, pk_col, pk_val):
+        from sqlalchemy import select
+
+        await self._detect_schema()
+        cls = self._orm_class(table)
+        async with self.SessionLocal() as session:
+            res = await session.execute(
+                select(cls).where(getattr(cls, pk_col) == pk_val)
+            )
+            obj = res.scalar_one_or_none()
+            if obj is None:
+                return None
+
+            data = self._obj_to_dict(obj)
+            await session.delete(obj)
+            await self._commit(session)
+            return data
+
+
+# Гістограми затримок методів (metrics.py); спільні з Model методи вже обгорнуті там
+timed_methods(AsyncModel, exclude=("get_tables", "close"))
+traced_methods(AsyncModel, exclude=("get_tables", "close"))
+
+
+# Приклад: конкурентне читання кількох таблиць через спільний пул
+async def _demo():
+    async with AsyncModel() as model:
+        results = await asyncio.gather(
+            *(model.list_table(t, limit=5) for t in model.get_tables())
+        )
+        for table, rows in zip(model.get_tables(), results):
+            print(table, len(rows))
+
+
+if __name__ == "__main__":
+    asyncio.run(_demo())
@@ -1,8 +1,9 @@
 import re
 from datetime import datetime
-import psycopg2
-from psycopg2 import errors
 
+import common_path  # noqa: F401 — корінь репозиторію в sys.path (пакет common)
+from common.profiling import PROFILER
+from common.tracing import traced_methods
 from model import Model, ValidationError
 from view import View
 
@@ -23,27 +24,29 @@ class Controller:
     def run(self):
         while True:
             cmd = self.view.show_menu()
-            if cmd == "1":
-                # Показати список таблиць
-                self.view.show_rows([{"table": t} for t in self.model.get_tables()])
-            elif cmd == "2":
-                # Перегляд даних таблиці
-                self.handle_list_table()
-            elif cmd == "3":
-                # Вставка
-                self.handle_insert()
-            elif cmd == "4":
-                # Оновлення
-                self.handle_update()
-            elif cmd == "5":
-                # Видалення
-                self.handle_delete()
-            elif cmd == "6":
-                self.view.show_message("Вихід...")
-                self.model.close()
-                break
-            else:
-                self.view.show_message("Невідома команда.")
+            # кожна команда меню — окремий профіль при --profile (profiling.py)
+            with PROFILER.command(f"menu {cmd}"):
+                if cmd == "1":
+                    # Показати список таблиць
+                    self.view.show_rows([{"table": t} for t in self.model.get_tables()])
+                elif cmd == "2":
+                    # Перегляд даних таблиці
+                    self.handle_list_table()
+                elif cmd == "3":
+                    # Вставка
+                    self.handle_insert()
+                elif cmd == "4":
+                    # Оновлення
+                    self.handle_update()
+                elif cmd == "5":
+                    # Видалення
+                    self.handle_delete()
+                elif cmd == "6":
+                    self.view.show_message("Вихід...")
+                    self.model.close()
+                    break
+                else:
+                    self.view.show_message("Невідома команда.")
 
     # Перегляд даних таблиці
     def handle_list_table(self):
@@ -55,6 +58,8 @@ class Controller:
 
     # Обробка вставки записів
     def handle_insert(self):
+        from psycopg2 import errors
+
         table = self.view.choose_table(self.model.get_tables())
         if not table:
             return
@@ -240,6 +245,8 @@ class Controller:
 
     # Видалення по PK
     def handle_delete(self):
+        from psycopg2 import errors
+
         table = self.view.choose_table(self.model.get_tables())
         if not table:
             return
@@ -330,3 +337,7 @@ class Controller:
                 print("Невірний формат class (наприклад 10A).")
                 continue
             return v
+
+
+# Відрізки трасування (tracing.py) для обробників handle_*; run — цикл меню
+traced_methods(Controller, exclude=("run",))
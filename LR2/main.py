@@ -1,5 +1,12 @@
+import sys
+
+import common_path  # noqa: F401 — корінь репозиторію в sys.path (пакет common)
+from common.profiling import PROFILER
 from controller import Controller
 
 if __name__ == "__main__":
+    # python main.py --profile DIR — профілювання кожної команди меню (див. profiling.py)
+    if len(sys.argv) == 3 and sys.argv[1] == "--profile":
+        PROFILER.start(sys.argv[2])
     controller = Controller()
     controller.run()
\ No newline at end of file
@@ -1,13 +1,15 @@
 import os
+from datetime import date
 
-from sqlalchemy import (
-    create_engine, Column, Integer, String, Date, ForeignKey
-)
-from sqlalchemy.orm import (
-    declarative_base, relationship, sessionmaker
-)
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy.inspection import inspect
+import common_path  # noqa: F401 — корінь репозиторію в sys.path (пакет common)
+from common.instrumentation import STATEMENT_STATS, instrument_engine
+from common.metrics import METRICS, meter_engine, timed_methods
+from common.retry import CONNECTION, RETRY_ATTEMPTS, new_retry_stats, retrying
+from common.routing import PRIMARY, ReplicaRouter, read_only
+from common.slowlog import SlowQueryLog
+from common.tracing import TRACER, traced_methods
+
+# SQLAlchemy та ORM-класи (orm.py) імпортуються ліниво — при першій операції з даними
 
 # Налаштування підключення до БД
 DB = {
@@ -20,77 +22,61 @@ DB = {
 
 ALLOWED_TABLES = ["parents", "student", "teacher", "subject", "journal"]
 ATTENDANCE_STATUSES = ("present", "absent", "late")
+# Рівні ізоляції транзакцій (None — за замовчуванням сервера, READ COMMITTED)
+ISOLATION_LEVELS = ("READ COMMITTED", "REPEATABLE READ", "SERIALIZABLE")
+
+# Представлення, яке створює міграція 003: його наявність означає компактне кодування (як у RGR)
+COMPACT_MARKER = "journal_decoded"
+# Стовпці таблиць ORM у каталогі БД — один запит замість create_all з перевіркою кожної таблиці
+SCHEMA_CATALOG_QUERY = """
+SELECT c.relname AS table_name, a.attname AS column_name, format_type(a.atttypid, a.atttypmod) AS data_type
+FROM pg_attribute a
+JOIN pg_class c ON c.oid = a.attrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = 'public' AND c.relname = ANY(:tables) AND c.relkind IN ('r', 'p', 'v')
+  AND a.attnum > 0 AND NOT a.attisdropped
+"""
+
+
+# URL SQLAlchemy для параметрів з'єднання (основний сервер або репліка)
+def _engine_url(params):
+    return (
+        f"postgresql+psycopg2://{params['user']}:{params['password']}"
+        f"@{params['host']}:{params['port']}/{params['dbname']}"
+    )
 
-Base = declarative_base()
-
-# ORM-класи сутностей
-class Parents(Base):
-    __tablename__ = "parents"
-
-    parents_id = Column(Integer, primary_key=True)
-    first_name = Column(String, nullable=False)
-    last_name = Column(String, nullable=False)
-    phone = Column(String, nullable=False)
-    email = Column(String, nullable=False)
-
-    students = relationship("Student", back_populates="parent")
-
-
-class Teacher(Base):
-    __tablename__ = "teacher"
-
-    teacher_id = Column(Integer, primary_key=True)
-    first_name = Column(String, nullable=False)
-    last_name = Column(String, nullable=False)
-    email = Column(String, nullable=False)
-
-    journals = relationship("Journal", back_populates="teacher")
-
-
-class Subject(Base):
-    __tablename__ = "subject"
-
-    subject_id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
-
-    journals = relationship("Journal", back_populates="subject")
-
-
-class Student(Base):
-    __tablename__ = "student"
-
-    student_id = Column(Integer, primary_key=True)
-    parents_id = Column(Integer, ForeignKey("parents.parents_id"))
-    first_name = Column(String, nullable=False)
-    last_name = Column(String, nullable=False)
-    birth_date = Column(Date, nullable=False)
-    # назва стовпця в БД "class", але в Python не можна мати змінну class
-    class_ = Column("class", String, nullable=False)
-    email = Column(String, nullable=False)
-
-    parent = relationship("Parents", back_populates="students")
-    journals = relationship("Journal", back_populates="student")
 
+# Виняток (помилка валідації)
+class ValidationError(Exception):
+    pass
 
-class Journal(Base):
-    __tablename__ = "journal"
 
-    journal_id = Column(Integer, primary_key=True)
-    student_id = Column(Integer, ForeignKey("student.student_id"))
-    teacher_id = Column(Integer, ForeignKey("teacher.teacher_id"))
-    subject_id = Column(Integer, ForeignKey("subject.subject_id"))
-    entry_date = Column(Date, nullable=False)
-    grade = Column(Integer, nullable=True)
-    attendance_status = Column(String, nullable=False)
+# Виняток (схема БД не відповідає ORM-моделі)
+class SchemaMismatchError(Exception):
+    pass
 
-    student = relationship("Student", back_populates="journals")
-    teacher = relationship("Teacher", back_populates="journals")
-    subject = relationship("Subject", back_populates="journals")
 
+# Перевірка узгодженості оцінки та відвідуваності (спільна для Model і AsyncModel)
+def check_journal_fields(grade, attendance_status):
+    if attendance_status is not None and attendance_status not in ATTENDANCE_STATUSES:
+        raise ValidationError("Invalid attendance_status.")
 
-# Виняток (помилка валідації)
-class ValidationError(Exception):
-    pass
+    if attendance_status == "absent":
+        if grade is not None:
+            raise ValidationError(
+                "If attendance is 'absent', grade must be NULL / not provided."
+            )
+    else:
+        if grade is None:
+            raise ValidationError(
+                "For present/late attendance grade must be provided (1..12)."
+            )
+        try:
+            g = int(grade)
+        except Exception:
+            raise ValidationError("Grade must be integer.")
+        if g < 1 or g > 12:
+            raise ValidationError("Grade out of allowed range (1-12).")
 
 
 class Model:
@@ -102,65 +88,264 @@ class Model:
         "journal": "journal_id",
     }
 
-    ORM_CLASS_MAP = {
-        "parents": Parents,
-        "teacher": Teacher,
-        "subject": Subject,
-        "student": Student,
-        "journal": Journal,
-    }
+    # Ініціалізація (з'єднання відкривається при першій операції з даними)
+    # retry_attempts — повтори при тимчасових помилках БД (retry.py); 0 — без повторів
+    def __init__(self, isolation_level=None, retry_attempts=None):
+        if isolation_level is not None and isolation_level not in ISOLATION_LEVELS:
+            raise ValueError(f"Невідомий рівень ізоляції: {isolation_level}")
+        self.isolation_level = isolation_level
+        self.retry_attempts = RETRY_ATTEMPTS if retry_attempts is None else retry_attempts
+        self.retry_stats = new_retry_stats()
+        self._retry_depth = 0
+        # слухачі кожного SQL-оператора (instrumentation.py); статистика спільна для процесу
+        self.statement_stats = STATEMENT_STATS
+        self.statement_listeners = [STATEMENT_STATS, TRACER]
+        self.slow_log = SlowQueryLog.from_env()
+        if self.slow_log is not None:
+            self.statement_listeners.append(self.slow_log)
+        self._engine = None
+        self._session = None
+        # ORM-класи під кодування БД (orm.orm_schema); визначаються при підключенні
+        self._orm = None
+        # репліки для читань (routing.py, DB_REPLICAS): індекс -> (engine, session)
+        self.router = ReplicaRouter.from_env(DB)
+        self._read_route = None
+        self._replicas = {}
+        # партиціонованість journal (міграція 002) і роки, для яких партиції вже є
+        self._journal_partitioned = None
+        self._journal_years = set()
+        # метрики (metrics.py): DB_METRICS_PORT — HTTP-ендпоінт Prometheus
+        METRICS.serve_from_env()
+
+    # Відкрити engine + session (ORM) та перевірити схему
+    def _connect(self):
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+
+        options = {"isolation_level": self.isolation_level} if self.isolation_level else {}
+        self._engine = create_engine(_engine_url(DB), echo=False, future=True, **options)
+        instrument_engine(self._engine, self.statement_listeners)
+        meter_engine(self._engine, "Model")
+        SessionLocal = sessionmaker(bind=self._engine, autoflush=False, autocommit=False)
+        self._session = SessionLocal()
+        self._check_schema()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with TRACER.span("connect", "db", host=DB["host"], dbname=DB["dbname"]):
+                self._connect()
+        return self._engine
+
+    # У методі читання, направленому на репліку, — сесія репліки
+    @property
+    def session(self):
+        if self._read_route is not None and self._read_route != PRIMARY:
+            return self._replica(self._read_route)[1]
+        if self._session is None:
+            with TRACER.span("connect", "db", host=DB["host"], dbname=DB["dbname"]):
+                self._connect()
+        return self._session
+
+    # ORM-класи під кодування БД: підключення до основного сервера визначає їх у _check_schema
+    @property
+    def orm(self):
+        if self._orm is None:
+            self.engine
+        return self._orm
+
+    # Engine і сесія репліки (схема не перевіряється: вона та сама, що на основному сервері)
+    def _replica(self, index):
+        replica = self._replicas.get(index)
+        if replica is None:
+            from sqlalchemy import create_engine
+            from sqlalchemy.orm import sessionmaker
+
+            params = self.router.replicas[index]
+            options = {"isolation_level": self.isolation_level} if self.isolation_level else {}
+            with TRACER.span("connect", "db", host=params["host"], dbname=params["dbname"]):
+                engine = create_engine(
+                    _engine_url(params), echo=False, future=True,
+                    connect_args={"options": "-c default_transaction_read_only=on"}, **options,
+                )
+            instrument_engine(engine, self.statement_listeners)
+            meter_engine(engine, "Model")
+            session = sessionmaker(bind=engine, autoflush=False, autocommit=False)()
+            replica = self._replicas[index] = (engine, session)
+        return replica
+
+    # Позиція WAL основного сервера (викликається до вибору маршруту)
+    def _primary_lsn(self):
+        from sqlalchemy import text
+
+        with self.engine.connect() as conn:
+            return conn.execute(text("SELECT pg_current_wal_lsn()::text")).scalar()
+
+    # Чи відтворила репліка WAL до позиції lsn
+    def _replica_replayed(self, index, lsn):
+        from sqlalchemy import text
+
+        with self._replica(index)[0].connect() as conn:
+            return bool(conn.execute(
+                text("SELECT pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn)"), {"lsn": lsn}
+            ).scalar())
+
+    def _drop_replica(self, index):
+        replica = self._replicas.pop(index, None)
+        if replica is not None:
+            engine, session = replica
+            try:
+                session.close()
+            except Exception:
+                pass
+            engine.dispose()
+
+    # Перевірка схеми одним запитом до каталогу. Той самий запит визначає кодування: є представлення
+    # journal_decoded (міграція 003) — ORM-класи компактного варіанта, інакше — початкової схеми.
+    # Стовпці таблиць ORM у БД (назви й родини типів) порівнюються з обраним варіантом. Схему модель
+    # не створює (create_all не виконується): порожня БД чи розбіжність дають SchemaMismatchError
+    def _check_schema(self):
+        from sqlalchemy import text
+        from orm import expected_columns, orm_schema, type_family
+
+        # таблиці компактного варіанта — надмножина таблиць початкового
+        tables = {table for table, _ in expected_columns(orm_schema(True))}
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text(SCHEMA_CATALOG_QUERY), {"tables": sorted(tables | {COMPACT_MARKER})}
+            ).all()
+        self._orm = orm_schema(any(r.table_name == COMPACT_MARKER for r in rows))
+        expected = expected_columns(self._orm)
+        tables = {table for table, _ in expected}
+        actual = {
+            (r.table_name, r.column_name): type_family(r.data_type)
+            for r in rows if r.table_name in tables
+        }
+
+        if not actual:
+            raise SchemaMismatchError(
+                "У БД немає таблиць ORM-моделі.\nСтворіть схему з LR1/electronic_journal.sql "
+                "і застосуйте міграції: cd RGR && python main.py migrate."
+            )
 
-    # Ініціалізація engine + session (ORM)
-    def __init__(self):
-        conn_str = (
-            f"postgresql+psycopg2://{DB['user']}:{DB['password']}"
-            f"@{DB['host']}:{DB['port']}/{DB['dbname']}"
-        )
-        self.engine = create_engine(conn_str, echo=False, future=True)
-        SessionLocal = sessionmaker(bind=self.engine, autoflush=False, autocommit=False)
-        self.session = SessionLocal()
-        Base.metadata.create_all(self.engine)
+        problems = schema_diff(expected, actual)
+        if problems:
+            raise SchemaMismatchError(
+                "Схема БД не відповідає ORM-моделі:\n  " + "\n  ".join(problems)
+                + "\nЗастосуйте міграції: cd RGR && python main.py migrate."
+            )
 
     # Закрити з'єднання
     def close(self):
-        if self.session:
-            self.session.close()
-        if self.engine:
-            self.engine.dispose()
+        if self._session:
+            self._session.close()
+            self._session = None
+        if self._engine:
+            self._engine.dispose()
+            self._engine = None
+        for index in list(self._replicas):
+            self._drop_replica(index)
+        self._orm = None
+        self._journal_partitioned = None
+        self._journal_years = set()
+
+    # Відновлення після помилки БД: відкат сесії (розірване з'єднання SQLAlchemy інвалідує сам),
+    # при втраті з'єднання — ще й скидання пулу, щоб не отримати інше «мертве» з'єднання
+    def _recover(self, kind):
+        if self._read_route is not None and self._read_route != PRIMARY:
+            if kind == CONNECTION:
+                self._drop_replica(self._read_route)
+            elif self._read_route in self._replicas:
+                self._replicas[self._read_route][1].rollback()
+            return
+        if self._session is None:
+            return
+        try:
+            self._session.rollback()
+        except Exception:
+            self._session.close()
+        if kind == CONNECTION and self._engine is not None:
+            self._engine.dispose()
+
+    # Увімкнути журнал повільних запитів (slowlog.py): оператори й виклики довші за threshold_ms
+    def enable_slow_log(self, threshold_ms, path=None, analyze_writes=None):
+        kwargs = {}
+        if path is not None:
+            kwargs["path"] = path
+        if analyze_writes is not None:
+            kwargs["analyze_writes"] = analyze_writes
+        if self.slow_log is not None:
+            self.statement_listeners.remove(self.slow_log)
+        self.slow_log = SlowQueryLog(threshold_ms, **kwargs)
+        self.statement_listeners.append(self.slow_log)
+        return self.slow_log
 
     # Допоміжні методи
     def _validate_table(self, table):
         if table not in ALLOWED_TABLES:
             raise ValueError("Невідома таблиця")
 
+    def _orm_class(self, table):
+        self._validate_table(table)
+        cls = self.orm.ORM_CLASS_MAP.get(table)
+        if cls is None:
+            raise ValueError("Невідомий ORM-клас для таблиці")
+        return cls
+
+    # Commit з розгортанням IntegrityError у виняток драйвера (psycopg2.errors.*)
+    def _commit(self):
+        from sqlalchemy.exc import IntegrityError
+
+        try:
+            self.session.commit()
+        except IntegrityError as e:
+            self.session.rollback()
+            raise e.orig
+        if self.router is not None:
+            self.router.wrote()
+
+    # Рядок у стовпцях початкової схеми (class, attendance_status) незалежно від кодування в БД
     def _obj_to_dict(self, obj):
-        mapper = inspect(obj).mapper
-        res = {}
-        for attr in mapper.column_attrs:
-            col_name = attr.expression.name  # ім'я колонки в БД
-            res[col_name] = getattr(obj, attr.key)
-        return res
+        from orm import TABLE_COLUMNS, COLUMN_ATTRS
+
+        return {
+            col_name: getattr(obj, COLUMN_ATTRS.get(col_name, col_name))
+            for col_name in TABLE_COLUMNS[obj.__tablename__]
+        }
 
     def _get_columns_list(self, table):
+        from orm import TABLE_COLUMNS
+
         self._validate_table(table)
-        cls = self.ORM_CLASS_MAP[table]
-        mapper = inspect(cls)
-        return [col.name for col in mapper.columns]
+        return list(TABLE_COLUMNS[table])
+
+    # Значення атрибутів для запису: при компактному кодуванні назва класу -> class_id через class_id_of()
+    def _write_attrs(self, table, attrs):
+        if self.orm.compact and table == "student" and "class_" in attrs:
+            from sqlalchemy import func
+
+            attrs = dict(attrs)
+            attrs["class_id"] = func.class_id_of(attrs.pop("class_"))
+        return attrs
 
     # Повернути список таблиць
     def get_tables(self):
         return ALLOWED_TABLES.copy()
 
-    # Інформація про стовпці (для визначення типу PK у Controller)
+    # Інформація про стовпці (для визначення типу PK у Controller).
+    # Лише інспекція ORM, без звернень до БД, тож без retrying — метод позичає і AsyncModel.
+    # Контролер бачить стовпці початкової схеми в будь-якому кодуванні, тож і типи — за нею
     def get_columns(self, table):
+        from sqlalchemy import Integer, String, Date
+        from sqlalchemy.inspection import inspect
+        from orm import TABLE_COLUMNS, COLUMN_ATTRS, orm_schema
 
         self._validate_table(table)
-        cls = self.ORM_CLASS_MAP[table]
-        mapper = inspect(cls)
+        mapper = inspect(orm_schema(False).ORM_CLASS_MAP[table])
 
         rows = []
-        for col in mapper.columns:
-            col_name = col.name
+        for col_name in TABLE_COLUMNS[table]:
+            col = mapper.column_attrs[COLUMN_ATTRS.get(col_name, col_name)].columns[0]
             col_type = col.type
             if isinstance(col_type, Integer):
                 type_name = "integer"
@@ -171,7 +356,7 @@ class Model:
             else:
                 type_name = type(col_type).__name__.lower()
 
-            is_nullable = "YES" if col.nullable else "NO"
+            is_nullable = "YES" if getattr(col, "nullable", False) else "NO"
 
             rows.append(
                 {
@@ -183,9 +368,10 @@ class Model:
         return rows
 
     # Перегляд даних таблиці (через ORM)
+    @read_only
+    @retrying()
     def list_table(self, table, limit=200):
-        self._validate_table(table)
-        cls = self.ORM_CLASS_MAP[table]
+        cls = self._orm_class(table)
         pk_col = self.PK_MAP.get(table)
 
         query = self.session.query(cls)
@@ -196,11 +382,10 @@ class Model:
         return [self._obj_to_dict(o) for o in objs]
 
     # Перевірка наявності рядка за PK (через ORM)
+    @read_only
+    @retrying()
     def row_exists(self, table, pk_col, value):
-        self._validate_table(table)
-        cls = self.ORM_CLASS_MAP.get(table)
-        if cls is None:
-            raise ValueError("Невідомий ORM-клас для таблиці")
+        cls = self._orm_class(table)
         obj = (
             self.session.query(cls)
             .filter(getattr(cls, pk_col) == value)
@@ -209,12 +394,13 @@ class Model:
         return obj is not None
 
     # Insert-и через ORM
+    @retrying(idempotent=False)
     def insert_parent(self, parents_id, first_name, last_name, phone, email):
         if parents_id is None:
             raise ValidationError(
                 "parents_id обов'язковий для вставки (не можна автогенерувати)."
             )
-        obj = Parents(
+        obj = self.orm.Parents(
             parents_id=parents_id,
             first_name=first_name,
             last_name=last_name,
@@ -222,13 +408,10 @@ class Model:
             email=email,
         )
         self.session.add(obj)
-        try:
-            self.session.commit()
-        except IntegrityError as e:
-            self.session.rollback()
-            raise e.orig
+        self._commit()
         return obj.parents_id
 
+    @retrying(idempotent=False)
     def insert_student(
         self,
         student_id,
@@ -248,7 +431,7 @@ class Model:
         ):
             raise ValidationError("Parent with given parents_id not found.")
 
-        obj = Student(
+        obj = self.orm.Student(**self._write_attrs("student", dict(
             student_id=student_id,
             parents_id=parents_id,
             first_name=first_name,
@@ -256,48 +439,39 @@ class Model:
             birth_date=birth_date,
             class_=class_,
             email=email,
-        )
+        )))
         self.session.add(obj)
-        try:
-            self.session.commit()
-        except IntegrityError as e:
-            self.session.rollback()
-            raise e.orig
+        self._commit()
         return obj.student_id
 
+    @retrying(idempotent=False)
     def insert_teacher(self, teacher_id, first_name, last_name, email):
         if teacher_id is None:
             raise ValidationError(
                 "teacher_id обов'язковий для вставки (не можна автогенерувати)."
             )
-        obj = Teacher(
+        obj = self.orm.Teacher(
             teacher_id=teacher_id,
             first_name=first_name,
             last_name=last_name,
             email=email,
         )
         self.session.add(obj)
-        try:
-            self.session.commit()
-        except IntegrityError as e:
-            self.session.rollback()
-            raise e.orig
+        self._commit()
         return obj.teacher_id
 
+    @retrying(idempotent=False)
     def insert_subject(self, subject_id, name):
         if subject_id is None:
             raise ValidationError(
                 "subject_id обов'язковий для вставки (не можна автогенерувати)."
             )
-        obj = Subject(subject_id=subject_id, name=name)
+        obj = self.orm.Subject(subject_id=subject_id, name=name)
         self.session.add(obj)
-        try:
-            self.session.commit()
-        except IntegrityError as e:
-            self.session.rollback()
-            raise e.orig
+        self._commit()
         return obj.subject_id
 
+    @retrying(idempotent=False)
     def insert_journal(
         self,
         journal_id,
@@ -323,27 +497,11 @@ class Model:
         ):
             raise ValidationError("Subject not found.")
 
-        if attendance_status is not None and attendance_status not in ATTENDANCE_STATUSES:
-            raise ValidationError("Invalid attendance_status.")
-
-        if attendance_status == "absent":
-            if grade is not None:
-                raise ValidationError(
-                    "If attendance is 'absent', grade must be NULL / not provided."
-                )
-        else:
-            if grade is None:
-                raise ValidationError(
-                    "For present/late attendance grade must be provided (1..12)."
-                )
-            try:
-                g = int(grade)
-            except Exception:
-                raise ValidationError("Grade must be integer.")
-            if g < 1 or g > 12:
-                raise ValidationError("Grade out of allowed range (1-12).")
+        check_journal_fields(grade, attendance_status)
+        if entry_date is not None:
+            self.ensure_journal_partitions(entry_date, entry_date)
 
-        obj = Journal(
+        obj = self.orm.Journal(
             journal_id=journal_id,
             student_id=student_id,
             teacher_id=teacher_id,
@@ -352,24 +510,55 @@ class Model:
             grade=grade,
             attendance_status=attendance_status,
         )
+        # повтор journal_id відхиляє БД (реєстр journal_id_registry, міграція 008) — як і в AsyncModel,
+        # UniqueViolation стає ValidationError
+        from psycopg2 import errors
+
         self.session.add(obj)
         try:
-            self.session.commit()
-        except IntegrityError as e:
-            self.session.rollback()
-            raise e.orig
+            self._commit()
+        except errors.UniqueViolation:
+            raise ValidationError("journal_id вже існує.")
         return obj.journal_id
 
+    # Чи партиціонована journal (міграція 002); визначається один раз на з'єднання
+    def journal_is_partitioned(self):
+        from sqlalchemy import text
+
+        if self._journal_partitioned is None:
+            relkind = self.session.execute(
+                text("SELECT relkind FROM pg_class WHERE oid = 'public.journal'::regclass")
+            ).scalar()
+            self._journal_partitioned = relkind == "p"
+        return self._journal_partitioned
+
+    # Створити річні партиції journal для діапазону дат (та сама функція journal_ensure_partitions, що й у RGR;
+    # відомі роки кешуються — без зайвих запитів)
+    @retrying()
+    def ensure_journal_partitions(self, date_from, date_to):
+        from sqlalchemy import text
+
+        if not self.journal_is_partitioned():
+            return 0
+        years = set(range(year_of(date_from), year_of(date_to) + 1))
+        METRICS.cache_access("journal_partitions", years <= self._journal_years)
+        if years <= self._journal_years:
+            return 0
+        created = self.session.execute(
+            text("SELECT journal_ensure_partitions(CAST(:d1 AS date), CAST(:d2 AS date))"),
+            {"d1": date_from, "d2": date_to},
+        ).scalar()
+        self._commit()
+        self._journal_years |= years
+        return created
+
     # Update через ORM
+    @retrying()
     def update_by_pk(self, table, pk_col, pk_val, updates: dict):
-        self._validate_table(table)
+        cls = self._orm_class(table)
         if not updates:
             return None
 
-        cls = self.ORM_CLASS_MAP.get(table)
-        if cls is None:
-            raise ValueError("Невідомий ORM-клас для таблиці")
-
         obj = (
             self.session.query(cls)
             .filter(getattr(cls, pk_col) == pk_val)
@@ -378,34 +567,32 @@ class Model:
         if obj is None:
             return None
 
+        from orm import COLUMN_ATTRS
+
         cols = self._get_columns_list(table)
 
+        attrs = {}
         for col_name, value in updates.items():
             if col_name not in cols:
                 raise ValueError(f"Невідомий стовпець: {col_name}")
-            attr_name = col_name
-            if table == "student" and col_name == "class":
-                attr_name = "class_"
+            attr_name = COLUMN_ATTRS.get(col_name, col_name)
 
             if not hasattr(obj, attr_name):
                 raise ValueError(f"Невідомий атрибут: {attr_name}")
 
+            attrs[attr_name] = value
+
+        for attr_name, value in self._write_attrs(table, attrs).items():
             setattr(obj, attr_name, value)
 
-        try:
-            self.session.commit()
-        except IntegrityError as e:
-            self.session.rollback()
-            raise e.orig
+        self._commit()
 
         return self._obj_to_dict(obj)
 
     # Delete через ORM
+    @retrying()
     def delete_by_pk(self, table, pk_col, pk_val):
-        self._validate_table(table)
-        cls = self.ORM_CLASS_MAP.get(table)
-        if cls is None:
-            raise ValueError("Невідомий ORM-клас для таблиці")
+        cls = self._orm_class(table)
 
         obj = (
             self.session.query(cls)
@@ -417,10 +604,39 @@ class Model:
 
         data = self._obj_to_dict(obj)
         self.session.delete(obj)
-        try:
-            self.session.commit()
-        except IntegrityError as e:
-            self.session.rollback()
-            raise e.orig
-
-        return data
\ No newline at end of file
+        self._commit()
+
+        return data
+
+
+# Розбіжності схеми: expected і actual — {(таблиця, стовпець): родина типу}
+def schema_diff(expected, actual):
+    tables = {table for table, _ in actual}
+    problems = []
+    for table in sorted({table for table, _ in expected} - tables):
+        problems.append(f"немає таблиці {table}")
+    for (table, column), family in sorted(expected.items()):
+        if table not in tables:
+            continue
+        found = actual.get((table, column))
+        if found is None:
+            problems.append(f"{table}.{column}: немає стовпця")
+        elif found != family:
+            problems.append(f"{table}.{column}: у БД {found}, в ORM {family}")
+    return problems
+
+
+# Рік дати (date або рядок 'YYYY-MM-DD')
+def year_of(value):
+    if isinstance(value, date):
+        return value.year
+    try:
+        return int(str(value).strip()[:4])
+    except ValueError:
+        raise ValidationError(f"Некоректна дата: {value}")
+
+
+# Гістограми затримок публічних методів (metrics.py); без методів, що не звертаються до БД
+timed_methods(Model, exclude=("get_tables", "enable_slow_log", "close"))
+# Відрізки трасування (tracing.py) для тих самих методів
+traced_methods(Model, exclude=("get_tables", "enable_slow_log", "close"))
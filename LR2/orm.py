@@ -0,0 +1,171 @@
+from functools import lru_cache
+from types import SimpleNamespace
+
+from sqlalchemy import Column, Integer, SmallInteger, String, Date, ForeignKey, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import declarative_base, relationship, column_property
+from sqlalchemy.types import TypeDecorator
+
+from model import ATTENDANCE_STATUSES
+
+# Стовпці таблиць у порядку початкової схеми (LR1) — незалежно від кодування в БД
+TABLE_COLUMNS = {
+    "parents": ("parents_id", "first_name", "last_name", "phone", "email"),
+    "teacher": ("teacher_id", "first_name", "last_name", "email"),
+    "subject": ("subject_id", "name"),
+    "student": ("student_id", "parents_id", "first_name", "last_name", "birth_date", "class", "email"),
+    "journal": ("journal_id", "student_id", "teacher_id", "subject_id", "entry_date", "grade", "attendance_status"),
+}
+# Атрибут ORM для стовпця, якщо імена відрізняються
+COLUMN_ATTRS = {"class": "class_"}
+
+
+# attendance_status у Python <-> smallint-код у БД (індекс у ATTENDANCE_STATUSES)
+class AttendanceCode(TypeDecorator):
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return ATTENDANCE_STATUSES.index(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return ATTENDANCE_STATUSES[value]
+
+
+# ORM-класи для кодування БД: початкова схема (LR1) або компактна (міграція LR1/migrations/003:
+# journal.attendance smallint, student.class_id -> school_class). Кодування визначає модель при підключенні;
+# атрибути ORM (attendance_status, class_) і стовпці, які бачать контролер і View, однакові в обох варіантах.
+# Кожен варіант має власну declarative_base, тож обидва можуть існувати в одному процесі
+@lru_cache(maxsize=None)
+def orm_schema(compact):
+    Base = declarative_base()
+    schema = SimpleNamespace(compact=compact, Base=Base)
+
+    if compact:
+        # Довідники компактного кодування
+        class SchoolClass(Base):
+            __tablename__ = "school_class"
+
+            class_id = Column(SmallInteger, primary_key=True)
+            name = Column(String(20), nullable=False, unique=True)
+
+        class AttendanceCodeRow(Base):
+            __tablename__ = "attendance_code"
+
+            code = Column(SmallInteger, primary_key=True)
+            status = Column(String(30), nullable=False, unique=True)
+
+        schema.SchoolClass = SchoolClass
+        schema.AttendanceCodeRow = AttendanceCodeRow
+
+    # ORM-класи сутностей
+    class Parents(Base):
+        __tablename__ = "parents"
+
+        parents_id = Column(Integer, primary_key=True)
+        first_name = Column(String, nullable=False)
+        last_name = Column(String, nullable=False)
+        phone = Column(String, nullable=False)
+        email = Column(String, nullable=False)
+
+        students = relationship("Student", back_populates="parent")
+
+    class Teacher(Base):
+        __tablename__ = "teacher"
+
+        teacher_id = Column(Integer, primary_key=True)
+        first_name = Column(String, nullable=False)
+        last_name = Column(String, nullable=False)
+        email = Column(String, nullable=False)
+
+        journals = relationship("Journal", back_populates="teacher")
+
+    class Subject(Base):
+        __tablename__ = "subject"
+
+        subject_id = Column(Integer, primary_key=True)
+        name = Column(String, nullable=False)
+
+        journals = relationship("Journal", back_populates="subject")
+
+    class Student(Base):
+        __tablename__ = "student"
+
+        student_id = Column(Integer, primary_key=True)
+        parents_id = Column(Integer, ForeignKey("parents.parents_id"))
+        first_name = Column(String, nullable=False)
+        last_name = Column(String, nullable=False)
+        birth_date = Column(Date, nullable=False)
+        if compact:
+            # у БД — class_id; назва класу читається підзапитом, а записується через class_id_of()
+            class_id = Column(SmallInteger, ForeignKey("school_class.class_id"), nullable=False)
+            class_ = column_property(
+                select(SchoolClass.name).where(SchoolClass.class_id == class_id).scalar_subquery()
+            )
+        else:
+            # назва стовпця в БД "class", але в Python не можна мати змінну class
+            class_ = Column("class", String, nullable=False)
+        email = Column(String, nullable=False)
+
+        parent = relationship("Parents", back_populates="students")
+        journals = relationship("Journal", back_populates="student")
+
+    class Journal(Base):
+        __tablename__ = "journal"
+
+        journal_id = Column(Integer, primary_key=True)
+        student_id = Column(Integer, ForeignKey("student.student_id"))
+        teacher_id = Column(Integer, ForeignKey("teacher.teacher_id"))
+        subject_id = Column(Integer, ForeignKey("subject.subject_id"))
+        entry_date = Column(Date, nullable=False)
+        grade = Column(Integer, nullable=True)
+        if compact:
+            attendance_status = Column(
+                "attendance", AttendanceCode, ForeignKey("attendance_code.code"), nullable=False
+            )
+        else:
+            attendance_status = Column(String, nullable=False)
+
+        student = relationship("Student", back_populates="journals")
+        teacher = relationship("Teacher", back_populates="journals")
+        subject = relationship("Subject", back_populates="journals")
+
+    schema.Parents = Parents
+    schema.Teacher = Teacher
+    schema.Subject = Subject
+    schema.Student = Student
+    schema.Journal = Journal
+    schema.ORM_CLASS_MAP = {
+        "parents": Parents,
+        "teacher": Teacher,
+        "subject": Subject,
+        "student": Student,
+        "journal": Journal,
+    }
+    return schema
+
+
+# Родина типу для порівняння з каталогом БД: довжина varchar і розрядність цілих не важливі
+def type_family(type_name):
+    t = type_name.lower()
+    if t in ("smallint", "integer", "bigint"):
+        return "integer"
+    if t.startswith(("character", "varchar", "text")):
+        return "text"
+    if t.startswith("timestamp"):
+        return "timestamp"
+    return t
+
+
+# Очікувані стовпці таблиць ORM: {(таблиця, стовпець): родина типу}
+def expected_columns(schema):
+    dialect = postgresql.dialect()
+    return {
+        (table.name, col.name): type_family(col.type.compile(dialect=dialect))
+        for table in schema.Base.metadata.tables.values()
+        for col in table.columns
+    }
@@ -0,0 +1,69 @@
+import os
+import sys
+
+# Модулі лабораторної імпортуються як верхньорівневі (model, orm, ...), як у main.py.
+# Запуск: cd LR2 && python -m pytest tests
+LAB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if LAB_DIR not in sys.path:
+    sys.path.insert(0, LAB_DIR)
+
+
+import pytest  # noqa: E402
+
+from model import DB  # noqa: E402
+
+# Тимчасова БД на сервері з параметрами DB_* (model.DB): фікстура підміняє DB["dbname"], тож Model і AsyncModel
+# підключаються до неї. Потрібне право CREATE DATABASE; якщо сервер недоступний — тести пропускаються
+MIGRATIONS_DIR = os.path.join(os.path.dirname(LAB_DIR), "LR1", "migrations")
+SCHEMA_SQL = os.path.join(os.path.dirname(MIGRATIONS_DIR), "electronic_journal.sql")
+JOURNAL = [
+    (1, 1, 1, 1, "2021-09-01", 10, "present"),
+    (2, 2, 1, 1, "2022-01-10", None, "absent"),
+]
+
+
+def admin_connect():
+    psycopg = pytest.importorskip("psycopg")
+    try:
+        return psycopg.connect(**DB, autocommit=True, connect_timeout=3)
+    except psycopg.OperationalError as e:
+        pytest.skip(f"PostgreSQL недоступний: {e}")
+
+
+@pytest.fixture
+def empty_db(monkeypatch):
+    name = f"lr2_test_{os.getpid()}"
+    with admin_connect() as admin:
+        admin.execute(f'DROP DATABASE IF EXISTS "{name}";')
+        admin.execute(f'CREATE DATABASE "{name}";')
+    monkeypatch.setitem(DB, "dbname", name)
+    try:
+        yield dict(DB)
+    finally:
+        monkeypatch.undo()
+        with admin_connect() as admin:
+            admin.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE);')
+
+
+# Порожня БД + початкова схема LR1, кілька рядків і міграції з номерами request.param (SQL-файли виконуються
+# напряму, без RGR/migrate.py: його model не та, що в LR2)
+@pytest.fixture
+def scratch_db(empty_db, request):
+    import psycopg
+
+    versions = getattr(request, "param", ())
+    with psycopg.connect(**empty_db, autocommit=True) as conn:
+        with open(SCHEMA_SQL, encoding="utf-8") as f:
+            conn.execute(f.read())
+        conn.execute("INSERT INTO parents VALUES (1, 'Maria', 'Petrenko', '+380000000000', 'maria@example.com');")
+        conn.execute("INSERT INTO teacher VALUES (1, 'Olena', 'Shevchenko', 'olena@example.com');")
+        conn.execute("INSERT INTO subject VALUES (1, 'Math');")
+        conn.execute("INSERT INTO student VALUES (1, 1, 'Ivan', 'Petrenko', '2010-01-05', '5-A', 'ivan@example.com'), "
+                     "(2, 1, 'Olha', 'Petrenko', '2011-03-07', '4-B', 'olha@example.com');")
+        with conn.cursor() as cur:
+            cur.executemany("INSERT INTO journal VALUES (%s, %s, %s, %s, %s, %s, %s);", JOURNAL)
+        for name in sorted(os.listdir(MIGRATIONS_DIR)):
+            if name[:3].isdigit() and int(name[:3]) in versions:
+                with open(os.path.join(MIGRATIONS_DIR, name), encoding="utf-8") as f:
+                    conn.execute(f.read())
+    yield empty_db
@@ -0,0 +1,83 @@
+import asyncio
+import subprocess
+import sys
+from datetime import date
+
+import pytest
+
+from async_model import AsyncModel
+from conftest import LAB_DIR
+from model import Model, ValidationError
+from orm import orm_schema
+
+# Аргументи для кожного методу, який AsyncModel позичає в Model (методи без звернень до БД)
+BORROWED_CALLS = {
+    "_validate_table": lambda orm: ("journal",),
+    "_orm_class": lambda orm: ("student",),
+    "_get_columns_list": lambda orm: ("journal",),
+    "_write_attrs": lambda orm: ("student", {"student_id": 1, "class_": "5-A"}),
+    "_obj_to_dict": lambda orm: (orm.Subject(subject_id=1, name="Math"),),
+    "get_tables": lambda orm: (),
+    "get_columns": lambda orm: ("student",),
+}
+
+
+# AsyncModel з уже визначеним кодуванням БД (початкова схема або компактна, міграція 003)
+@pytest.fixture(params=[False, True], ids=["plain", "compact"])
+def model(request):
+    m = AsyncModel()
+    m.orm = orm_schema(request.param)
+    yield m
+    asyncio.run(m.close())
+
+
+@pytest.mark.parametrize("name", sorted(BORROWED_CALLS))
+def test_borrowed_method_runs_on_async_model(model, name):
+    getattr(model, name)(*BORROWED_CALLS[name](model.orm))
+
+
+def test_orm_class_follows_detected_encoding(model):
+    assert model._orm_class("journal") is model.orm.Journal
+
+
+# Повтор journal_id (тут — з іншою датою) відхиляє БД: PK початкової схеми або реєстр міграції 008.
+# Model і AsyncModel відповідають однаково — ValidationError
+@pytest.mark.parametrize("scratch_db", [(), (1, 2, 8)], ids=["plain", "partitioned"], indirect=True)
+def test_insert_journal_rejects_duplicate_id(scratch_db):
+    row = (1, 2, 1, 1, date(2022, 3, 1), 9, "present")
+
+    async def run():
+        async with AsyncModel() as m:
+            with pytest.raises(ValidationError, match="journal_id вже існує"):
+                await m.insert_journal(*row)
+            return await m.insert_journal(3, *row[1:])
+
+    assert asyncio.run(run()) == 3
+
+    model = Model()
+    try:
+        with pytest.raises(ValidationError, match="journal_id вже існує"):
+            model.insert_journal(*row)
+        assert model.insert_journal(4, *row[1:]) == 4
+    finally:
+        model.close()
+
+
+# Кожна операція бере власну сесію: 20 конкурентних перевірок ділять пул із двох з'єднань
+def test_row_exists_runs_concurrently(scratch_db):
+    async def run():
+        async with AsyncModel(pool_size=2, max_overflow=0) as m:
+            return await asyncio.gather(*(m.row_exists("student", "student_id", i) for i in range(1, 21)))
+
+    assert asyncio.run(run()) == [True, True] + [False] * 18
+
+
+def test_async_model_imports_lazily():
+    code = (
+        "import sys, async_model; async_model.AsyncModel(); "
+        "print(sorted(m for m in ('sqlalchemy', 'psycopg', 'psycopg2') if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=LAB_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    assert out.strip() == "[]"
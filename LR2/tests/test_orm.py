@@ -0,0 +1,35 @@
+from orm import COLUMN_ATTRS, TABLE_COLUMNS, expected_columns, orm_schema
+from model import Model
+
+
+def test_variants_are_cached_and_separate():
+    assert orm_schema(False) is orm_schema(False)
+    assert orm_schema(False).Base is not orm_schema(True).Base
+
+
+def test_variants_expose_the_same_attributes():
+    for compact in (False, True):
+        classes = orm_schema(compact).ORM_CLASS_MAP
+        for table, columns in TABLE_COLUMNS.items():
+            for col_name in columns:
+                assert hasattr(classes[table], COLUMN_ATTRS.get(col_name, col_name)), (compact, table, col_name)
+
+
+def test_expected_columns_follow_encoding():
+    plain = expected_columns(orm_schema(False))
+    compact = expected_columns(orm_schema(True))
+    assert plain[("journal", "attendance_status")] == "text"
+    assert plain[("student", "class")] == "text"
+    assert compact[("journal", "attendance")] == "integer"
+    assert compact[("student", "class_id")] == "integer"
+    assert ("journal", "attendance_status") not in compact
+
+
+def test_write_attrs_maps_class_name_only_for_compact_encoding():
+    model = Model()
+    model._orm = orm_schema(False)
+    assert model._write_attrs("student", {"class_": "5-A"}) == {"class_": "5-A"}
+    model._orm = orm_schema(True)
+    attrs = model._write_attrs("student", {"class_": "5-A"})
+    assert "class_" not in attrs
+    assert "class_id_of" in str(attrs["class_id"])
@@ -0,0 +1,17 @@
+import pytest
+
+from model import Model, SchemaMismatchError
+
+
+# На порожній БД модель не створює схему (create_all), а відсилає до міграцій
+def test_empty_database_asks_for_migrations(empty_db):
+    model = Model()
+    try:
+        with pytest.raises(SchemaMismatchError, match="застосуйте міграції"):
+            model.row_exists("student", "student_id", 1)
+    finally:
+        model.close()
+    import psycopg
+
+    with psycopg.connect(**empty_db) as conn:
+        assert conn.execute("SELECT count(*) FROM pg_tables WHERE schemaname = 'public';").fetchone()[0] == 0
@@ -0,0 +1,225 @@
+from model import ATTENDANCE_STATUSES
+
+# Локальний стовпчиковий аналітичний режим: journal завантажується один раз у масиви NumPy
+# (student_id, teacher_id, subject_id, entry_date, grade, код відвідуваності) разом із
+# масивами-довідниками вимірів, а complex_query_1/2/3 рахуються векторизованим group-by
+# (np.bincount) без звернень до PostgreSQL.
+# Знімок можна зберегти на диск і потім дотягувати лише дельту: вставлені, змінені та видалені рядки
+# з таблиці journal_changes (тригери міграцій LR1/migrations/001 і 009) за позиціями транзакцій —
+# рядок, зафіксований пізніше за синхронізацію, потрапить у наступну навіть з меншим journal_id.
+
+def _require_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("Для локального аналітичного режиму потрібен пакет numpy (pip install numpy).")
+    return numpy
+
+
+class JournalAnalytics:
+    def __init__(self):
+        self.np = _require_numpy()
+        self.rows = 0
+
+    def _journal_query(self, model, where=""):
+        if model.compact_encoding():
+            # код у БД уже дорівнює індексу в ATTENDANCE_STATUSES
+            att = "attendance"
+        else:
+            att_case = " ".join(f"WHEN '{s}' THEN {i}" for i, s in enumerate(ATTENDANCE_STATUSES))
+            att = f"CASE attendance_status {att_case} ELSE -1 END"
+        return f"""
+        SELECT journal_id, student_id, teacher_id, subject_id,
+               (entry_date - DATE '1970-01-01') AS day,
+               COALESCE(grade, 0) AS grade,
+               {att} AS att
+        FROM "journal" {where};
+        """
+
+    def _fetch_journal(self, model, where="", params=None, batch_size=200000):
+        np = self.np
+        chunks = [np.array(rows, dtype=np.int32).reshape(-1, 7)
+                  for rows in model.iter_batches(self._journal_query(model, where), params,
+                                                 batch_size=batch_size, name="analytics_journal")]
+        return np.concatenate(chunks) if chunks else np.empty((0, 7), dtype=np.int32)
+
+    # Розкласти рядки (journal_id, student, teacher, subject, day, grade, att) по масивах, впорядкувавши за journal_id
+    def _set_journal(self, data):
+        np = self.np
+        data = data[np.argsort(data[:, 0], kind="stable")]
+        self.journal_id = data[:, 0].copy()
+        self.student_id = data[:, 1].copy()
+        self.teacher_id = data[:, 2].copy()
+        self.subject_id = data[:, 3].copy()
+        self.entry_date = data[:, 4].astype("datetime64[D]")
+        self.grade = data[:, 5].astype(np.int8)          # 0 = NULL
+        self.attendance = data[:, 6].astype(np.int8)     # індекс у ATTENDANCE_STATUSES
+        self.rows = len(data)
+
+    def _journal_matrix(self):
+        np = self.np
+        return np.column_stack([
+            self.journal_id, self.student_id, self.teacher_id, self.subject_id,
+            self.entry_date.astype(np.int32), self.grade.astype(np.int32), self.attendance.astype(np.int32),
+        ])
+
+    # Завантаження journal та вимірів (один прохід серверним курсором по кожній таблиці)
+    def load(self, model, batch_size=200000, track_changes=False):
+        # позначка береться до читання: зміни, що потраплять між ними, просто застосуються повторно
+        self.change_mark = model.journal_change_mark() if track_changes else None
+        self._set_journal(self._fetch_journal(model, batch_size=batch_size))
+        self._load_dimensions(model)
+        return self
+
+    # Інкрементальна синхронізація: рядки, яких торкалися транзакції з xid >= позначки (journal_changes).
+    # Записи, вже враховані попередньою синхронізацією, можуть прийти ще раз — вони просто перечитуються
+    def sync(self, model, batch_size=200000):
+        np = self.np
+        if self.change_mark is None:
+            raise RuntimeError("Знімок завантажено без відстеження змін — потрібне повне завантаження.")
+        mark = model.journal_change_mark()
+        changed = model.changed_journal_ids(self.change_mark)
+        if changed:
+            # рядки читаються підзапитом: зміни, що з'явилися після списку changed, теж підхопляться
+            fresh = self._fetch_journal(
+                model, "WHERE journal_id IN (SELECT journal_id FROM journal_changes WHERE txid >= %s::text::xid8)",
+                (self.change_mark,), batch_size=batch_size)
+        else:
+            fresh = np.empty((0, 7), dtype=np.int32)
+        old = self._journal_matrix()
+        # змінені рядки замінюються свіжими, видалені (їх немає у fresh) — відкидаються
+        drop = np.isin(old[:, 0], np.concatenate([np.array(changed, dtype=np.int32), fresh[:, 0]]))
+        before = self.rows
+        self._set_journal(np.concatenate([old[~drop], fresh]))
+        self.change_mark = mark
+        # виміри невеликі — перечитуються повністю
+        self._load_dimensions(model)
+        return {"changed": len(changed), "fetched": len(fresh), "rows_before": before, "rows": self.rows}
+
+    # Збереження знімка на диск (.npz) разом із позначками синхронізації
+    def save(self, path):
+        np = self.np
+        np.savez_compressed(
+            path, journal=self._journal_matrix(),
+            sync_xmin=np.array(-1 if self.change_mark is None else self.change_mark, dtype=np.int64),
+        )
+
+    @classmethod
+    def open(cls, path, model):
+        self = cls()
+        with self.np.load(path) as f:
+            self._set_journal(f["journal"])
+            # знімки старого формату (change_mark за change_id і межа journal_id) — лише повне перезавантаження
+            mark = int(f["sync_xmin"]) if "sync_xmin" in f.files else -1
+        self.change_mark = None if mark < 0 else mark
+        self._load_dimensions(model)
+        return self
+
+    def _load_dimension(self, model, q, name):
+        np = self.np
+        rows = [r for batch in model.iter_batches(q, name=name) for r in batch]
+        ids = np.array([r[0] for r in rows], dtype=np.int32)
+        labels = [r[1] for r in rows]
+        order = np.argsort(ids)
+        ids = ids[order]
+        labels = [labels[i] for i in order]
+        # однакові назви (напр. два предмети з одним ім'ям) групуються разом, як GROUP BY name
+        names = sorted(set(labels))
+        code_of = {n: i for i, n in enumerate(names)}
+        codes = np.array([code_of[n] for n in labels], dtype=np.int32)
+        return ids, codes, names
+
+    # Код виміру для кожного рядка journal (-1 — немає пари, аналог INNER JOIN)
+    def _codes_for(self, fk, ids, codes):
+        np = self.np
+        if len(ids) == 0:
+            return np.full(len(fk), -1, dtype=np.int32)
+        pos = np.clip(np.searchsorted(ids, fk), 0, len(ids) - 1)
+        return np.where(ids[pos] == fk, codes[pos], -1).astype(np.int32)
+
+    def _load_dimensions(self, model):
+        s_ids, s_codes, self.class_names = self._load_dimension(
+            model, f'SELECT student_id, class FROM "{model.read_relation("student")}";', "analytics_student")
+        t_ids, t_codes, self.teacher_names = self._load_dimension(
+            model, "SELECT teacher_id, first_name || ' ' || last_name FROM \"teacher\";", "analytics_teacher")
+        sb_ids, sb_codes, self.subject_names = self._load_dimension(
+            model, 'SELECT subject_id, name FROM "subject";', "analytics_subject")
+        self.class_code = self._codes_for(self.student_id, s_ids, s_codes)
+        self.teacher_code = self._codes_for(self.teacher_id, t_ids, t_codes)
+        self.subject_code = self._codes_for(self.subject_id, sb_ids, sb_codes)
+
+    def _code(self, names, value):
+        try:
+            return names.index(value)
+        except ValueError:
+            return None
+
+    # Маска рядків за фільтрами (для довільного перерізу: клас, предмет, період)
+    def mask(self, class_value=None, subject=None, date_from=None, date_to=None):
+        np = self.np
+        m = np.ones(self.rows, dtype=bool)
+        if class_value is not None:
+            code = self._code(self.class_names, class_value)
+            m &= self.class_code == (-2 if code is None else code)
+        if subject is not None:
+            code = self._code(self.subject_names, subject)
+            m &= self.subject_code == (-2 if code is None else code)
+        if date_from is not None:
+            m &= self.entry_date >= np.datetime64(str(date_from), "D")
+        if date_to is not None:
+            m &= self.entry_date <= np.datetime64(str(date_to), "D")
+        return m
+
+    # Кількість оцінок і середній бал у групах (group_codes — коди виміру по рядках)
+    def _grade_stats(self, group_codes, names, m):
+        np = self.np
+        m = m & (group_codes >= 0)
+        g = group_codes[m]
+        grade = self.grade[m]
+        n = len(names)
+        counts = np.bincount(g, minlength=n)
+        graded = grade > 0
+        gsum = np.bincount(g[graded], weights=grade[graded], minlength=n)
+        gcnt = np.bincount(g[graded], minlength=n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg = gsum / gcnt
+        return counts, gcnt, avg
+
+    # Середній бал по предметах для класу (як Model.complex_query_1)
+    def complex_query_1(self, class_value, **filters):
+        np = self.np
+        m = self.mask(class_value=class_value, **filters)
+        counts, gcnt, avg = self._grade_stats(self.subject_code, self.subject_names, m)
+        idx = np.nonzero(counts)[0]
+        # ORDER BY avg_grade DESC (NULL першими, як у PostgreSQL)
+        idx = sorted(idx, key=lambda i: (gcnt[i] > 0, -avg[i] if gcnt[i] else 0))
+        return [
+            {"subject": self.subject_names[i], "marks_count": int(counts[i]),
+             "avg_grade": float(avg[i]) if gcnt[i] else None}
+            for i in idx
+        ]
+
+    # Кількість оцінок по вчителях за період (як Model.complex_query_2)
+    def complex_query_2(self, date_from, date_to, limit=50, **filters):
+        np = self.np
+        m = self.mask(date_from=date_from, date_to=date_to, **filters) & (self.teacher_code >= 0)
+        counts = np.bincount(self.teacher_code[m], minlength=len(self.teacher_names))
+        idx = np.nonzero(counts)[0]
+        idx = idx[np.argsort(-counts[idx], kind="stable")][:limit]
+        return [{"teacher": self.teacher_names[i], "marks_count": int(counts[i])} for i in idx]
+
+    # Розподіл відвідуваності по класам для предмета (як Model.complex_query_3)
+    def complex_query_3(self, subject_name, **filters):
+        np = self.np
+        m = self.mask(subject=subject_name, **filters) & (self.class_code >= 0) & (self.attendance >= 0)
+        n_att = len(ATTENDANCE_STATUSES)
+        combined = self.class_code[m].astype(np.int64) * n_att + self.attendance[m]
+        counts = np.bincount(combined, minlength=len(self.class_names) * n_att)
+        rows = []
+        for i in np.nonzero(counts)[0]:
+            cls, att = divmod(int(i), n_att)
+            rows.append({"class": self.class_names[cls], "attendance_status": ATTENDANCE_STATUSES[att],
+                         "cnt": int(counts[i])})
+        # ORDER BY s.class, потім за назвою статусу
+        rows.sort(key=lambda r: (r["class"], r["attendance_status"]))
+        return rows
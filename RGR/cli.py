@@ -0,0 +1,440 @@
+import argparse
+import contextlib
+import shlex
+import sys
+import time
+
+import common_path  # noqa: F401 — корінь репозиторію в sys.path (пакет common)
+from common.metrics import METRICS
+from common.profiling import PROFILER
+from common.tracing import TRACER
+from controller import Controller
+from model import JOURNAL_GUARD_VARIANTS, SEARCH_TABLES
+from sharding import ShardedModel
+from view import View
+from writers import FORMATS
+
+# Неінтерактивний (пакетний) режим: ті самі обробники, що й у меню, але як підкоманди.
+# Приклади:
+#   python main.py generate journal 100000
+#   python main.py query 2 2021-01-01 2021-12-31
+#   python main.py @args.txt                      (аргументи з файлу, по одному на рядок)
+#   python main.py batch commands.txt             (по одній команді на рядок, '#' — коментар)
+#   cat commands.txt | python main.py batch       (команди з stdin)
+#   python main.py batch --commit-every 1000 commands.txt   (одна транзакція на 1000 команд)
+#   DB_STATS_FILE=stats.json python main.py batch commands.txt   (статистика SQL-операторів у JSON при виході)
+#   python main.py --metrics-port 9108 batch commands.txt        (метрики Prometheus на http://127.0.0.1:9108/metrics)
+#   python main.py --trace trace.json delete student 5            (відрізки для ui.perfetto.dev / chrome://tracing)
+#   python main.py --profile prof/ batch commands.txt            (профіль кожної команди: .prof, .collapsed, .txt)
+#   python main.py --format jsonl list journal    (формати: table, jsonl, csv, arrow)
+#   python main.py search петрен --table student  (нечіткий пошук за ім'ям, прізвищем, email)
+#   python main.py upsert journal journal.csv     (злиття CSV/JSONL за PK; повторний запуск дописує лише відсутнє)
+#   python main.py snapshot journal.npz           (знімок journal; повторний запуск тягне лише дельту)
+#   DB_SHARDS=db1,db2:5433 python main.py --school 17 generate journal 1000   (шард школи 17, див. sharding.py)
+# В пакетному режимі всі команди виконуються через одне з'єднання з БД.
+
+
+# Розбір пар col=val
+def parse_assignments(items):
+    values = {}
+    for item in items:
+        if "=" not in item:
+            raise argparse.ArgumentTypeError(f"Формат col=val: {item}")
+        col, val = item.split("=", 1)
+        values[col.strip()] = val.strip() or None
+    return values
+
+
+class ArgumentParser(argparse.ArgumentParser):
+    # В пакетному режимі помилка в одній команді не повинна завершувати процес
+    def error(self, message):
+        raise ValueError(message)
+
+
+def build_parser():
+    parser = ArgumentParser(prog="main.py", fromfile_prefix_chars="@",
+                            description="Електронний журнал — пакетний режим")
+    parser.add_argument("--format", choices=FORMATS, default="table",
+                        help="формат виводу рядків (за замовчуванням — текстова таблиця)")
+    parser.add_argument("--output", default=None, help="файл для виводу рядків (за замовчуванням stdout)")
+    parser.add_argument("--slow-ms", type=float, default=None, metavar="MS",
+                        help="журнал повільних запитів з EXPLAIN для операторів і викликів, довших за MS")
+    parser.add_argument("--slow-log", default=None, metavar="FILE", help="файл журналу (slow_queries.log)")
+    parser.add_argument("--metrics-port", type=int, default=None, metavar="PORT",
+                        help="HTTP-ендпоінт метрик Prometheus (/metrics) на 127.0.0.1:PORT на час роботи процесу")
+    parser.add_argument("--trace", default=None, metavar="FILE",
+                        help="трасування (контролер -> модель -> SQL) у FILE у форматі Chrome Trace (Perfetto)")
+    parser.add_argument("--profile", default=None, metavar="DIR",
+                        help="профілювати кожну команду (cProfile, згорнуті стеки, пік tracemalloc) у файли в DIR")
+    parser.add_argument("--school", default=None, metavar="KEY",
+                        help="школа, на шард якої йдуть команди (при DB_SHARDS); складні запити — по всіх шардах")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("tables", help="список таблиць")
+
+    p = sub.add_parser("columns", help="імена та типи стовпців таблиці")
+    p.add_argument("table")
+
+    p = sub.add_parser("list", help="перегляд даних таблиці")
+    p.add_argument("table")
+    p.add_argument("--limit", type=int, default=200)
+
+    p = sub.add_parser("fks", help="зовнішні ключі, що посилаються на таблицю")
+    p.add_argument("table")
+
+    p = sub.add_parser("generate", help="генерація даних (SQL на сервері)")
+    p.add_argument("table")
+    p.add_argument("n", type=int)
+
+    p = sub.add_parser("insert", help="вставка рядка: insert TABLE col=val ...")
+    p.add_argument("table")
+    p.add_argument("values", nargs="+")
+
+    p = sub.add_parser("update", help="оновлення: update TABLE PK_COL PK_VAL col=val ...")
+    p.add_argument("table")
+    p.add_argument("pk_col")
+    p.add_argument("pk_val")
+    p.add_argument("values", nargs="+")
+
+    p = sub.add_parser("delete", help="видалення по PK")
+    p.add_argument("table")
+    p.add_argument("pk_val")
+
+    p = sub.add_parser("delete-all", help="видалення всіх рядків таблиці")
+    p.add_argument("table")
+    p.add_argument("--yes", action="store_true", help="підтвердження (обов'язкове)")
+
+    p = sub.add_parser("query", help="складні запити: query 1 CLASS | query 2 FROM TO | query 3 SUBJECT")
+    p.add_argument("number", choices=["1", "2", "3"])
+    p.add_argument("args", nargs="+")
+    p.add_argument("--local", action="store_true",
+                   help="рахувати в локальному стовпчиковому кеші (NumPy) замість PostgreSQL")
+    p.add_argument("--snapshot", default=None,
+                   help="файл знімка .npz для --local (дотягується лише дельта з моменту збереження)")
+
+    p = sub.add_parser("upsert", help="ідемпотентне завантаження CSV (із заголовком) або JSONL: злиття за PK")
+    p.add_argument("table")
+    p.add_argument("file", help="файл .csv або .jsonl ('-' — stdin)")
+    p.add_argument("--input-format", choices=("csv", "jsonl"), default=None,
+                   help="формат файлу (за замовчуванням — за розширенням, для stdin — csv)")
+    p.add_argument("--batch-size", type=int, default=None, metavar="N",
+                   help="рядків на транзакцію (DB_UPSERT_BATCH, 100000)")
+
+    p = sub.add_parser("report", help="табелі успішності: report FROM TO --class 10A | --student ID")
+    p.add_argument("date_from")
+    p.add_argument("date_to")
+    who = p.add_mutually_exclusive_group(required=True)
+    who.add_argument("--class", dest="class_value")
+    who.add_argument("--student", type=int, dest="student_id")
+
+    p = sub.add_parser("search", help="нечіткий пошук людей за ім'ям, прізвищем або email (pg_trgm)")
+    p.add_argument("text", nargs="+")
+    p.add_argument("--table", action="append", choices=SEARCH_TABLES, default=None, dest="tables",
+                   help="обмежити пошук таблицею (можна кілька разів)")
+    p.add_argument("--limit", type=int, default=20)
+
+    p = sub.add_parser("snapshot", help="створити або інкрементально оновити локальний знімок journal (.npz)")
+    p.add_argument("path")
+    p.add_argument("--prune", action="store_true", help="після синхронізації очистити journal_changes")
+
+    p = sub.add_parser("partitions", help="річні партиції journal: перегляд, створення наперед, від'єднання")
+    p.add_argument("--ensure-ahead", type=int, default=None, metavar="YEARS",
+                   help="створити партиції до кінця поточного року + YEARS")
+    p.add_argument("--detach", type=int, default=None, metavar="YEAR", help="від'єднати партицію року")
+    p.add_argument("--archive", action="store_true", help="разом з --detach: перенести таблицю в схему archive")
+    p.add_argument("--attach", type=int, default=None, metavar="YEAR", help="повернути від'єднаний рік")
+
+    p = sub.add_parser("migrate", help="застосувати SQL-міграції з LR1/migrations")
+    p.add_argument("--target", type=int, default=None, help="застосувати міграції до номера включно")
+
+    p = sub.add_parser("guard", help="тригер-охоронець journal: показати або перемкнути варіант")
+    p.add_argument("--install", choices=JOURNAL_GUARD_VARIANTS, default=None,
+                   help="row — курсорні цикли на кожен рядок, statement — таблиці переходів, none — без тригера")
+
+    p = sub.add_parser("stats", help="статистика SQL-операторів цього процесу (корисно в кінці пакета)")
+    p.add_argument("--top", type=int, default=20)
+    p.add_argument("--json", default=None, metavar="FILE", help="записати повну статистику в JSON")
+    p.add_argument("--reset", action="store_true", help="очистити статистику після виводу")
+
+    sub.add_parser("metrics", help="метрики процесу в текстовому форматі Prometheus")
+
+    p = sub.add_parser("export", help="вивантаження journal + вимірів у партиціоновані Parquet-файли")
+    p.add_argument("out_dir")
+    p.add_argument("--partition-by", default="year,class",
+                   help="ключі партиціювання через кому: year, class (порожньо — без партицій)")
+    p.add_argument("--batch-size", type=int, default=100000)
+    p.add_argument("--no-dimensions", action="store_true", help="не вивантажувати student/teacher/subject/parents")
+
+    p = sub.add_parser("batch", help="виконати команди з файлів або stdin (по одній на рядок)")
+    p.add_argument("files", nargs="*", default=["-"])
+    p.add_argument("--stop-on-error", action="store_true")
+    p.add_argument("--commit-every", type=int, default=None, metavar="N",
+                   help="виконувати команди в транзакції з фіксацією кожні N команд (0 — одна транзакція "
+                        "на весь пакет); кожна команда — у власній точці збереження")
+    return parser
+
+
+# Команди, що самі керують транзакціями, — не виконуються всередині Model.transaction()
+NON_TRANSACTIONAL_COMMANDS = ("migrate",)
+
+
+# Команда завершилась помилкою, яку вже показав контролер, — її зміни треба відкотити до точки збереження
+class _CommandFailed(Exception):
+    pass
+
+
+# np.savez додає розширення .npz сам — шлях нормалізується, щоб знімок знаходився при наступному запуску
+def snapshot_path(path):
+    if path is None or path.endswith(".npz"):
+        return path
+    return path + ".npz"
+
+
+# Рядки файлу імпорту як dict: CSV із заголовком (порожнє поле -> NULL) або JSON Lines
+def iter_import_rows(path, fmt=None):
+    if fmt is None:
+        fmt = "jsonl" if path.endswith((".jsonl", ".json")) else "csv"
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+    try:
+        if fmt == "jsonl":
+            import json
+
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            import csv
+
+            for row in csv.DictReader(f):
+                yield {k: (v if v != "" else None) for k, v in row.items()}
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+# Виконати одну розібрану команду; повертає False, якщо команда завершилась помилкою
+def dispatch(controller, args):
+    # кожна команда — кореневий відрізок трасування (tracing.py) і окремий профіль (profiling.py)
+    name = f"cli {args.command}"
+    with TRACER.span(name, "cli", args=repr(vars(args))), PROFILER.command(name):
+        return _dispatch(controller, args)
+
+
+def _dispatch(controller, args):
+    model, view = controller.model, controller.view
+    if args.school is not None:
+        if not isinstance(model, ShardedModel):
+            view.show_message("--school потребує налаштованих шардів (DB_SHARDS).")
+            return False
+        model.use_school(args.school)
+    cmd = args.command
+    if cmd == "tables":
+        view.show_rows([{"table": t} for t in model.get_tables()])
+    elif cmd == "columns":
+        view.show_rows(model.get_columns(args.table))
+    elif cmd == "list":
+        view.show_rows(model.list_table(args.table, limit=args.limit))
+    elif cmd == "fks":
+        fks = model.get_referencing_fks(args.table)
+        if not fks:
+            view.show_message("Зовнішніх ключів не знайдено.")
+        else:
+            view.show_rows(fks)
+    elif cmd == "generate":
+        return controller.generate(args.table, args.n)
+    elif cmd == "insert":
+        return controller.insert(args.table, parse_assignments(args.values)) is not None
+    elif cmd == "update":
+        pk_val = int(args.pk_val) if args.pk_val.isdigit() else args.pk_val
+        return controller.update(args.table, args.pk_col, pk_val, parse_assignments(args.values)) is not None
+    elif cmd == "delete":
+        return controller.delete(args.table, args.pk_val) is not None
+    elif cmd == "delete-all":
+        if not args.yes:
+            view.show_message("Потрібне підтвердження: додайте --yes.")
+            return False
+        return controller.delete_all(args.table) is not None
+    elif cmd == "query":
+        expected = {"1": 1, "2": 2, "3": 1}[args.number]
+        if len(args.args) != expected:
+            view.show_message(f"Запит {args.number} очікує аргументів: {expected}.")
+            return False
+        if args.local or args.snapshot:
+            controller.enable_local_analytics(snapshot_path(args.snapshot))
+        return controller.complex_query(args.number, *args.args) is not None
+    elif cmd == "upsert":
+        kwargs = {} if args.batch_size is None else {"batch_size": args.batch_size}
+        t0 = time.perf_counter()
+        stats = model.upsert_many(args.table, iter_import_rows(args.file, args.input_format), **kwargs)
+        view.show_message(f"Злиття завершено за {time.perf_counter() - t0:.2f} s: {stats}")
+    elif cmd == "report":
+        return controller.report_cards(args.date_from, args.date_to, class_value=args.class_value,
+                                       student_id=args.student_id) is not None
+    elif cmd == "search":
+        return controller.search(" ".join(args.text), tables=args.tables, limit=args.limit) is not None
+    elif cmd == "snapshot":
+        analytics = controller.enable_local_analytics(snapshot_path(args.path))
+        if args.prune:
+            deleted = model.prune_journal_changes(analytics.change_mark)
+            view.show_message(f"Очищено journal_changes: {deleted} записів")
+    elif cmd == "partitions":
+        if not model.journal_is_partitioned():
+            view.show_message("journal не партиціонована — застосуйте міграції (python main.py migrate).")
+            return False
+        if args.ensure_ahead is not None:
+            created = model.ensure_future_journal_partitions(args.ensure_ahead)
+            view.show_message(f"Створено партицій: {created}")
+        if args.detach is not None:
+            view.show_message(f"Від'єднано: {model.detach_journal_year(args.detach, archive=args.archive)}")
+        if args.attach is not None:
+            view.show_message(f"Приєднано: {model.attach_journal_year(args.attach)}")
+        view.show_rows(model.journal_partitions())
+    elif cmd == "migrate":
+        from migrate import apply_migrations
+
+        applied = apply_migrations(model, target=args.target)
+        view.show_message("Застосовано міграції: " + ", ".join(applied) if applied else "Нових міграцій немає.")
+    elif cmd == "guard":
+        if args.install is not None:
+            model.install_journal_guard(args.install)
+        variant = model.journal_guard_variant()
+        if variant is None:
+            view.show_message("Тригер journal не встановлено — застосуйте міграції (python main.py migrate).")
+            return False
+        view.show_message(f"Тригер journal: {variant}")
+    elif cmd == "stats":
+        stats = model.statement_stats
+        view.show_rows(stats.snapshot(top=args.top))
+        if args.json:
+            stats.dump_json(args.json)
+            view.show_message(f"Статистику записано: {args.json}")
+        if args.reset:
+            stats.reset()
+    elif cmd == "metrics":
+        view.show_message(METRICS.render().rstrip("\n"))
+    elif cmd == "export":
+        from export import export_all
+
+        keys = tuple(k.strip() for k in args.partition_by.split(",") if k.strip())
+        dims = () if args.no_dimensions else ("student", "teacher", "subject", "parents")
+        t0 = time.perf_counter()
+        stats = export_all(model, args.out_dir, partition_by=keys, dimensions=dims, batch_size=args.batch_size)
+        view.show_message(f"Експорт завершено за {time.perf_counter() - t0:.2f} s: {stats}")
+    return True
+
+
+# Рядки команд з файлів ('-' — stdin)
+def iter_commands(files):
+    for name in files:
+        f = sys.stdin if name == "-" else open(name, encoding="utf-8")
+        try:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+# commit_every=None — кожна команда фіксується сама; N — спільна транзакція з COMMIT кожні N команд
+# (0 — один COMMIT у кінці), а команда з помилкою відкочується до своєї точки збереження
+def run_batch(controller, parser, files, stop_on_error=False, commit_every=None):
+    model = controller.model
+    transactional = commit_every is not None
+    done = failed = pending = commits = 0
+    t0 = time.perf_counter()
+    with contextlib.ExitStack() as tx:
+        if transactional:
+            tx.enter_context(model.transaction())
+        for line in iter_commands(files):
+            try:
+                args = parser.parse_args(shlex.split(line))
+                if args.command == "batch":
+                    raise ValueError("вкладений batch не підтримується")
+                if transactional and args.command in NON_TRANSACTIONAL_COMMANDS:
+                    raise ValueError(f"{args.command} не виконується з --commit-every")
+                if transactional:
+                    with model.transaction():
+                        ok = dispatch(controller, args)
+                        if not ok:
+                            raise _CommandFailed()
+                else:
+                    ok = dispatch(controller, args)
+            except _CommandFailed:
+                ok = False
+            except Exception as e:
+                controller.view.show_message(f"Помилка в команді '{line}': {e}")
+                ok = False
+            done += 1
+            pending += 1
+            if not ok:
+                failed += 1
+                if stop_on_error:
+                    break
+            if transactional and commit_every and pending >= commit_every:
+                tx.close()
+                commits += 1
+                pending = 0
+                tx.enter_context(model.transaction())
+    if transactional:
+        commits += 1
+    elapsed = time.perf_counter() - t0
+    rate = done / elapsed if elapsed > 0 else 0.0
+    summary = f"Пакет: виконано {done} команд, з помилками {failed}, {elapsed:.2f} s ({rate:.0f} команд/с)"
+    if transactional:
+        summary += f", фіксацій: {commits}"
+    controller.view.show_message(summary)
+    return failed
+
+
+def main(argv=None):
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+    except ValueError as e:
+        parser.print_usage(sys.stderr)
+        print(f"{parser.prog}: error: {e}", file=sys.stderr)
+        return 2
+    if args.format == "arrow" and args.command == "batch":
+        # кожна команда пакета — окремий набір результатів, а потік Arrow IPC має одну схему
+        print(f"{parser.prog}: error: --format arrow не підтримується в batch (один набір результатів на вихід)",
+              file=sys.stderr)
+        return 2
+
+    out = None
+    if args.output:
+        if args.format == "arrow":
+            out = open(args.output, "wb")
+        else:
+            out = open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        controller = Controller(view=View(args.format, out))
+    except RuntimeError as e:
+        print(f"{parser.prog}: error: {e}", file=sys.stderr)
+        return 2
+    if args.slow_ms is not None:
+        controller.model.enable_slow_log(args.slow_ms, args.slow_log)
+    if args.metrics_port is not None:
+        METRICS.serve(args.metrics_port)
+    if args.trace:
+        TRACER.start(args.trace)
+    if args.profile:
+        PROFILER.start(args.profile)
+    if args.school is not None and isinstance(controller.model, ShardedModel):
+        controller.model.use_school(args.school)
+    try:
+        if args.command == "batch":
+            failed = run_batch(controller, parser, args.files, args.stop_on_error, args.commit_every)
+            return 1 if failed else 0
+        try:
+            ok = dispatch(controller, args)
+        except Exception as e:
+            # помилка БД чи даних (напр. migrate без pg_trgm) — повідомлення і код виходу, без трасування стеку
+            controller.view.show_message(f"Помилка: {e}")
+            return 1
+        return 0 if ok else 1
+    finally:
+        controller.model.close()
+        if out is not None:
+            out.close()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Корінь репозиторію в sys.path: спільний пакет common (instrumentation, metrics, retry, ...) для RGR і LR2.
+# Імпортується першим у модулях лабораторної, що використовують common, — незалежно від точки входу
+# (main.py, тести, бенчмарки з кореня).
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
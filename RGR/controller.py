@@ -1,9 +1,13 @@
+import os
 import re
 import time
 from datetime import datetime
-import psycopg
 
+import common_path  # noqa: F401 — корінь репозиторію в sys.path (пакет common)
+from common.profiling import PROFILER
+from common.tracing import traced_methods
 from model import Model, ChildRowsExistError, ValidationError
+from sharding import ShardedModel
 from view import View
 
 EMAIL_RE = re.compile(r'^[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}$', re.I)
@@ -12,58 +16,81 @@ CLASS_RE = re.compile(r'^[0-9]{1,2}[A-Za-z\-]?$')
 GRADE_MIN, GRADE_MAX = 1, 12
 ATTENDANCE_STATUSES = ('present', 'absent', 'late')
 
+# Поля для вставки (в порядку аргументів Model.insert_*)
+INSERT_FIELDS = {
+    "parents": ("parents_id", "first_name", "last_name", "phone", "email"),
+    "student": ("student_id", "parents_id", "first_name", "last_name", "birth_date", "class", "email"),
+    "teacher": ("teacher_id", "first_name", "last_name", "email"),
+    "subject": ("subject_id", "name"),
+    "journal": ("journal_id", "student_id", "teacher_id", "subject_id", "entry_date", "grade", "attendance_status"),
+}
+INSERT_METHODS = {
+    "parents": "insert_parent",
+    "student": "insert_student",
+    "teacher": "insert_teacher",
+    "subject": "insert_subject",
+    "journal": "insert_journal",
+}
+INT_FIELDS = ("parents_id", "student_id", "teacher_id", "subject_id", "journal_id", "grade")
+
 class Controller:
-    # Ініціалізація контролера
-    def __init__(self):
-        self.model = Model()
-        self.view = View()
+    # Ініціалізація контролера; при DB_SHARDS модель — фасад над шардами шкіл (sharding.py)
+    def __init__(self, view=None, model=None):
+        if model is None:
+            model = ShardedModel.from_env() or Model()
+        self.model = model
+        self.view = view if view is not None else View()
+        # Локальний аналітичний кеш (analytics.JournalAnalytics) — вмикається явно
+        self.analytics = None
 
     # Головний цикл меню
     def run(self):
         while True:
             cmd = self.view.show_menu()
-            if cmd == "1":
-                self.view.show_rows([{"table": t} for t in self.model.get_tables()])
-            elif cmd == "2":
-                table = self.view.choose_table(self.model.get_tables())
-                if table:
-                    cols = self.model.get_columns(table)
-                    self.view.show_rows(cols)
-            elif cmd == "3":
-                table = self.view.choose_table(self.model.get_tables())
-                if table:
-                    cols = self.model.get_columns(table)
-                    names = [{"column_name": c["column_name"]} for c in cols]
-                    self.view.show_rows(names)
-            elif cmd == "4":
-                table = self.view.choose_table(self.model.get_tables())
-                if table:
-                    rows = self.model.list_table(table, limit=200)
-                    self.view.show_rows(rows)
-            elif cmd == "5":
-                table = self.view.choose_table(self.model.get_tables())
-                if table:
-                    fks = self.model.get_referencing_fks(table)
-                    if not fks:
-                        self.view.show_message("Зовнішніх ключів не знайдено.")
-                    else:
-                        self.view.show_rows(fks)
-            elif cmd == "6":
-                self.handle_generate()
-            elif cmd == "7":
-                self.handle_insert()
-            elif cmd == "8":
-                self.handle_update()
-            elif cmd == "9":
-                self.handle_delete()
-            elif cmd == "10":
-                self.handle_delete_all()
-            elif cmd == "11":
-                self.handle_complex_queries()
-            elif cmd == "12":
-                self.view.show_message("Вихід..."); self.model.close(); break
-            else:
-                self.view.show_message("Невідома команда.")
+            # кожна команда меню — окремий профіль при --profile (profiling.py)
+            with PROFILER.command(f"menu {cmd}"):
+                if cmd == "1":
+                    self.view.show_rows([{"table": t} for t in self.model.get_tables()])
+                elif cmd == "2":
+                    table = self.view.choose_table(self.model.get_tables())
+                    if table:
+                        cols = self.model.get_columns(table)
+                        self.view.show_rows(cols)
+                elif cmd == "3":
+                    table = self.view.choose_table(self.model.get_tables())
+                    if table:
+                        cols = self.model.get_columns(table)
+                        names = [{"column_name": c["column_name"]} for c in cols]
+                        self.view.show_rows(names)
+                elif cmd == "4":
+                    table = self.view.choose_table(self.model.get_tables())
+                    if table:
+                        rows = self.model.list_table(table, limit=200)
+                        self.view.show_rows(rows)
+                elif cmd == "5":
+                    table = self.view.choose_table(self.model.get_tables())
+                    if table:
+                        fks = self.model.get_referencing_fks(table)
+                        if not fks:
+                            self.view.show_message("Зовнішніх ключів не знайдено.")
+                        else:
+                            self.view.show_rows(fks)
+                elif cmd == "6":
+                    self.handle_generate()
+                elif cmd == "7":
+                    self.handle_insert()
+                elif cmd == "8":
+                    self.handle_update()
+                elif cmd == "9":
+                    self.handle_delete()
+                elif cmd == "10":
+                    self.handle_delete_all()
+                elif cmd == "11":
+                    self.handle_complex_queries()
+                elif cmd == "12":
+                    self.view.show_message("Вихід..."); self.model.close(); break
+                else:
+                    self.view.show_message("Невідома команда.")
 
     # Обробка вставки записів
     def handle_insert(self):
@@ -73,10 +100,11 @@ class Controller:
         try:
             pk_name = self.model.PK_MAP.get(table)
             while True:
-                pk_raw = input(f"{pk_name}: ").strip()
+                # порожньо — id видає послідовність таблиці (міграція 007)
+                pk_raw = input(f"{pk_name} (Enter — автоматично): ").strip()
                 if pk_raw == "":
-                    print("Порожнє значення недопустиме.")
-                    continue
+                    pk_val = None
+                    break
                 if not pk_raw.isdigit():
                     print("Потрібно ввести ціле число.")
                     continue
@@ -88,15 +116,8 @@ class Controller:
                 ln = self._read_nonempty("Last name: ")
                 phone = self._read_phone("Phone (+380XXXXXXXXX): ")
                 email = self._read_email("Email: ")
-                try:
-                    pid = self.model.insert_parent(pk_val, fn, ln, phone, email)
-                    self.view.show_message(f"Inserted parents_id={pid}")
-                except ValidationError as e:
-                    self.view.show_message(f"Помилка валідації: {e}")
-                except psycopg.errors.UniqueViolation:
-                    self.view.show_message("Помилка: parents_id вже існує (duplicate key).")
-                except Exception as e:
-                    self.view.show_message(f"Помилка при вставці: {e}")
+                self.insert(table, {"parents_id": pk_val, "first_name": fn, "last_name": ln,
+                                    "phone": phone, "email": email})
 
             elif table == "student":
                 while True:
@@ -114,37 +135,18 @@ class Controller:
                 birth = self._read_date("Birth date (YYYY-MM-DD): ")
                 class_ = self._read_class("Class (наприклад 10A): ")
                 email = self._read_email("Email: ")
-                try:
-                    sid = self.model.insert_student(pk_val, parents_val, fn, ln, birth, class_, email)
-                    self.view.show_message(f"Inserted student_id={sid}")
-                except ValidationError as e:
-                    self.view.show_message(f"Помилка валідації: {e}")
-                except psycopg.errors.ForeignKeyViolation:
-                    self.view.show_message("Помилка: батько з таким ID не знайдений (FK).")
-                except Exception as e:
-                    self.view.show_message(f"Помилка при вставці: {e}")
+                self.insert(table, {"student_id": pk_val, "parents_id": parents_val, "first_name": fn,
+                                    "last_name": ln, "birth_date": birth, "class": class_, "email": email})
 
             elif table == "teacher":
                 fn = self._read_nonempty("First name: ")
                 ln = self._read_nonempty("Last name: ")
                 email = self._read_email("Email: ")
-                try:
-                    tid = self.model.insert_teacher(pk_val, fn, ln, email)
-                    self.view.show_message(f"Inserted teacher_id={tid}")
-                except ValidationError as e:
-                    self.view.show_message(f"Помилка валідації: {e}")
-                except Exception as e:
-                    self.view.show_message(f"Помилка при вставці: {e}")
+                self.insert(table, {"teacher_id": pk_val, "first_name": fn, "last_name": ln, "email": email})
 
             elif table == "subject":
                 name = self._read_nonempty("Subject name: ")
-                try:
-                    suid = self.model.insert_subject(pk_val, name)
-                    self.view.show_message(f"Inserted subject_id={suid}")
-                except ValidationError as e:
-                    self.view.show_message(f"Помилка валідації: {e}")
-                except Exception as e:
-                    self.view.show_message(f"Помилка при вставці: {e}")
+                self.insert(table, {"subject_id": pk_val, "name": name})
 
             elif table == "journal":
                 while True:
@@ -206,18 +208,32 @@ class Controller:
                             continue
                         break
 
-                try:
-                    jid = self.model.insert_journal(pk_val, sid, tid, subid, entry, grade, att)
-                    self.view.show_message(f"Inserted journal_id={jid}")
-                except ValidationError as e:
-                    self.view.show_message(f"Помилка валідації: {e}")
-                except psycopg.errors.ForeignKeyViolation:
-                    self.view.show_message("Помилка: FK violation при вставці journal")
-                except Exception as e:
-                    self.view.show_message(f"Помилка при вставці: {e}")
+                self.insert(table, {"journal_id": pk_val, "student_id": sid, "teacher_id": tid,
+                                    "subject_id": subid, "entry_date": entry, "grade": grade,
+                                    "attendance_status": att})
+
+        except Exception as e:
+            self.view.show_message(f"Помилка при вставці: {e}")
+
+    # Вставка рядка (спільна для меню та пакетного режиму)
+    def insert(self, table, values):
+        import psycopg
 
+        pk_name = self.model.PK_MAP.get(table)
+        try:
+            args = self._coerce_insert_values(table, values)
+            new_id = getattr(self.model, INSERT_METHODS[table])(*args)
+            self.view.show_message(f"Inserted {pk_name}={new_id}")
+            return new_id
+        except ValidationError as e:
+            self.view.show_message(f"Помилка валідації: {e}")
+        except psycopg.errors.UniqueViolation:
+            self.view.show_message(f"Помилка: {pk_name} вже існує (duplicate key).")
+        except psycopg.errors.ForeignKeyViolation:
+            self.view.show_message(f"Помилка: FK violation при вставці {table}")
         except Exception as e:
             self.view.show_message(f"Помилка при вставці: {e}")
+        return None
 
     # Оновлення записів
     def handle_update(self):
@@ -237,14 +253,19 @@ class Controller:
             col, val = s.split("=",1)
             col=col.strip(); val=val.strip() or None
             updates[col]=val
+        self.update(table, pk, pkv, updates)
+
+    def update(self, table, pk, pkv, updates):
         try:
             row = self.model.update_by_pk(table, pk, pkv, updates)
             if row:
                 self.view.show_message("Оновлено: " + str(row))
             else:
                 self.view.show_message("Немає такого рядка.")
+            return row
         except Exception as e:
             self.view.show_message(f"Помилка при оновленні: {e}")
+        return None
 
     # Видалення по PK
     def handle_delete(self):
@@ -255,7 +276,12 @@ class Controller:
         if not pk_col:
             self.view.show_message("PK не визначено для цієї таблиці.")
             return
+        print("Доступні стовпці для видалення по PK:", pk_col)
+        pkv_raw = input(f"PK value ({pk_col}): ").strip()
+        self.delete(table, pkv_raw)
 
+    def delete(self, table, pkv_raw):
+        pk_col = self.model.PK_MAP.get(table)
         cols_info = self.model.get_columns(table)
         pk_type = None
         for c in cols_info:
@@ -263,14 +289,12 @@ class Controller:
                 pk_type = c["data_type"]
                 break
 
-        print("Доступні стовпці для видалення по PK:", pk_col)
-        pkv_raw = input(f"PK value ({pk_col}): ").strip()
         if pk_type and any(x in pk_type for x in ("integer","bigint","smallint","serial","bigserial")):
             try:
                 pkv = int(pkv_raw)
             except:
                 self.view.show_message("PK має бути цілим числом.")
-                return
+                return None
         else:
             pkv = pkv_raw
 
@@ -278,7 +302,7 @@ class Controller:
             preview = self.model.preview_child_counts(table, pk_col, pkv)
             if preview.get(table, 0) == 0:
                 self.view.show_message("Рядок з таким PK не знайдено.")
-                return
+                return None
             self.view.show_message("Попередній підрахунок (рядок батька та дочірні записи):")
             for t, c in preview.items():
                 self.view.show_message(f"  {t}: {c}")
@@ -293,6 +317,7 @@ class Controller:
                             self.view.show_message(f"  {tt}: {cc}")
                 else:
                     self.view.show_message("Нічого не видалено.")
+                return row
             except ChildRowsExistError as e:
                 self.view.show_message("Неможливо видалити — знайдені залежні (дочірні) записи:")
                 for t, c in e.counts.items():
@@ -311,6 +336,7 @@ class Controller:
                 self.view.show_message("Причина: існують рядки в дочірніх таблицях, які посилаються на цей батьківський PK (референційна цілісність).")
         except Exception as e:
             self.view.show_message(f"Помилка при видаленні: {e}")
+        return None
 
     # Видалити всі записи таблиці
     def handle_delete_all(self):
@@ -323,9 +349,13 @@ class Controller:
         if confirm not in ("y", "yes"):
             self.view.show_message("Операція скасована.")
             return
+        self.delete_all(table)
+
+    def delete_all(self, table):
         try:
             deleted = self.model.delete_all(table)
             self.view.show_message(f"Видалено рядків у {table}: {deleted}")
+            return deleted
         except ChildRowsExistError as e:
             self.view.show_message("Неможливо видалити — знайдені залежні (дочірні) записи:")
             for t, c in e.counts.items():
@@ -344,6 +374,7 @@ class Controller:
             self.view.show_message("Видалення скасовано. Щоб видалити — спочатку видаліть дочірні записи або змініть їх FK.")
         except Exception as e:
             self.view.show_message(f"Помилка при видаленні всіх рядків: {e}")
+        return None
 
     # Генерація тестових даних
     def handle_generate(self):
@@ -356,6 +387,9 @@ class Controller:
         except:
             self.view.show_message("Невірне число.")
             return
+        self.generate(table, n)
+
+    def generate(self, table, n):
         try:
             if table == "parents":
                 self.model.generate_parents(n)
@@ -366,50 +400,160 @@ class Controller:
             elif table == "student":
                 if not self.model.list_table("parents", limit=1):
                     self.view.show_message("Спочатку згенеруйте parents.")
-                    return
+                    return False
                 self.model.generate_students(n)
             elif table == "journal":
                 if not (self.model.list_table("student", limit=1) and self.model.list_table("teacher", limit=1) and self.model.list_table("subject", limit=1)):
                     self.view.show_message("Спочатку згенеруйте student/teacher/subject.")
-                    return
+                    return False
                 self.model.generate_journal(n)
+            else:
+                self.view.show_message("Невідома таблиця.")
+                return False
             self.view.show_message("Генерація завершена")
+            return True
         except Exception as e:
             self.view.show_message(f"Помилка генерації: {e}")
+        return False
 
     # Складні запити
     def handle_complex_queries(self):
         print("1) Середній бал по предметах для класу")
         print("2) Кількість оцінок по вчителях за період")
         print("3) Розподіл відвідуваності по класам для предмета")
+        print("4) Табелі успішності класу за період")
+        print("5) Пошук людей за ім'ям, прізвищем або email")
         ch = input("Виберіть запит: ").strip()
+        if ch == "1":
+            args = (input("Введіть class (наприклад 10A): ").strip(),)
+        elif ch == "2":
+            args = (input("Дата з (YYYY-MM-DD): ").strip(), input("Дата по (YYYY-MM-DD): ").strip())
+        elif ch == "3":
+            args = (input("Назва предмета: ").strip(),)
+        elif ch == "4":
+            class_value = input("Введіть class (наприклад 10A): ").strip()
+            date_from = input("Дата з (YYYY-MM-DD): ").strip()
+            date_to = input("Дата по (YYYY-MM-DD): ").strip()
+            self.report_cards(date_from, date_to, class_value=class_value)
+            return
+        elif ch == "5":
+            self.search(input("Пошук (щонайменше 3 символи): ").strip())
+            return
+        else:
+            self.view.show_message("Невірний вибір.")
+            return
+        self.complex_query(ch, *args)
+
+    # Завантажити journal у локальний стовпчиковий кеш (один раз на процес).
+    # snapshot — шлях до .npz-знімка: якщо він існує, дотягується лише дельта, і знімок перезаписується
+    def enable_local_analytics(self, snapshot=None):
+        if self.analytics is None:
+            from analytics import JournalAnalytics
+
+            t0 = time.time()
+            if snapshot is not None and os.path.exists(snapshot):
+                self.analytics = JournalAnalytics.open(snapshot, self.model)
+            if self.analytics is not None and self.analytics.change_mark is not None:
+                stats = self.analytics.sync(self.model)
+                what = (f"знімок {snapshot} синхронізовано (змінено {stats['changed']}, "
+                        f"отримано {stats['fetched']} рядків), усього {self.analytics.rows} рядків")
+            else:
+                self.analytics = JournalAnalytics().load(self.model, track_changes=snapshot is not None)
+                what = f"завантажено {self.analytics.rows} рядків"
+            if snapshot is not None:
+                self.analytics.save(snapshot)
+            t = (time.time() - t0) * 1000
+            self.view.show_message(f"Локальна аналітика: {what} за {t:.2f} ms")
+        return self.analytics
+
+    def complex_query(self, ch, *args):
+        source = self.analytics if self.analytics is not None else self.model
+        queries = {
+            "1": source.complex_query_1,
+            "2": source.complex_query_2,
+            "3": source.complex_query_3,
+        }
+        if ch not in queries:
+            self.view.show_message("Невірний вибір.")
+            return None
         try:
-            if ch == "1":
-                cls = input("Введіть class (наприклад 10A): ").strip()
-                t0 = time.time()
-                rows = self.model.complex_query_1(cls)
-                t = (time.time() - t0) * 1000
-                self.view.show_rows(rows)
-                self.view.show_message(f"Час виконання: {t:.2f} ms")
-            elif ch == "2":
-                d1 = input("Дата з (YYYY-MM-DD): ").strip()
-                d2 = input("Дата по (YYYY-MM-DD): ").strip()
-                t0 = time.time()
-                rows = self.model.complex_query_2(d1, d2)
-                t = (time.time() - t0) * 1000
-                self.view.show_rows(rows)
-                self.view.show_message(f"Час виконання: {t:.2f} ms")
-            elif ch == "3":
-                subj = input("Назва предмета: ").strip()
-                t0 = time.time()
-                rows = self.model.complex_query_3(subj)
-                t = (time.time() - t0) * 1000
+            t0 = time.time()
+            rows = queries[ch](*args)
+            t = (time.time() - t0) * 1000
+            self.view.show_rows(rows)
+            self.view.show_message(f"Час виконання: {t:.2f} ms")
+            return rows
+        except Exception as e:
+            self.view.show_message(f"Помилка виконання запиту: {e}")
+        return None
+
+    # Табелі успішності класу або учня за період
+    def report_cards(self, date_from, date_to, class_value=None, student_id=None):
+        try:
+            t0 = time.time()
+            rows = self.model.report_cards(date_from, date_to, class_value=class_value, student_id=student_id)
+            t = (time.time() - t0) * 1000
+            self.view.show_rows(rows)
+            self.view.show_message(f"Час виконання: {t:.2f} ms")
+            return rows
+        except ValidationError as e:
+            self.view.show_message(f"Помилка валідації: {e}")
+        except Exception as e:
+            self.view.show_message(f"Помилка виконання запиту: {e}")
+        return None
+
+    # Нечіткий пошук людей у student / parents / teacher (pg_trgm, міграція 006)
+    def search(self, text, tables=None, limit=20):
+        try:
+            t0 = time.time()
+            rows = self.model.search_people(text, tables=tables, limit=limit)
+            t = (time.time() - t0) * 1000
+            if rows:
                 self.view.show_rows(rows)
-                self.view.show_message(f"Час виконання: {t:.2f} ms")
             else:
-                self.view.show_message("Невірний вибір.")
+                self.view.show_message("Нічого не знайдено.")
+            self.view.show_message(f"Час виконання: {t:.2f} ms")
+            return rows
+        except ValidationError as e:
+            self.view.show_message(f"Помилка валідації: {e}")
         except Exception as e:
-            self.view.show_message(f"Помилка виконання запиту: {e}")
+            self.view.show_message(f"Помилка пошуку (потрібна міграція 006 і pg_trgm): {e}")
+        return None
+
+    # Приведення та перевірка значень для вставки (для пакетного режиму — без інтерактивних підказок)
+    def _coerce_insert_values(self, table, values):
+        if table not in INSERT_FIELDS:
+            raise ValidationError("Невідома таблиця")
+        unknown = set(values) - set(INSERT_FIELDS[table])
+        if unknown:
+            raise ValidationError(f"Невідомі стовпці: {', '.join(sorted(unknown))}")
+        pk_name = self.model.PK_MAP.get(table)
+        args = []
+        for field in INSERT_FIELDS[table]:
+            v = values.get(field)
+            if isinstance(v, str):
+                v = v.strip() or None
+            if v is not None and field in INT_FIELDS:
+                try:
+                    v = int(v)
+                except (TypeError, ValueError):
+                    raise ValidationError(f"{field} має бути цілим числом.")
+            # порожній PK — id від сервера (перевіряє модель)
+            if v is None and field not in ("grade", pk_name):
+                raise ValidationError(f"{field}: значення не може бути порожнім.")
+            if field == "email" and not EMAIL_RE.match(v):
+                raise ValidationError("Невірний email.")
+            if field == "phone" and not PHONE_RE.match(v):
+                raise ValidationError("Невірний формат телефону. Очікується +380XXXXXXXXX")
+            if field == "class" and not CLASS_RE.match(v):
+                raise ValidationError("Невірний формат class (наприклад 10A).")
+            if field in ("birth_date", "entry_date"):
+                try:
+                    datetime.strptime(str(v), "%Y-%m-%d")
+                except ValueError:
+                    raise ValidationError("Невірний формат дати. Очікується YYYY-MM-DD.")
+            args.append(v)
+        return args
 
     # Допоміжні методи для валідного вводу
     def _read_nonempty(self, prompt):
@@ -465,3 +609,7 @@ class Controller:
                 print("Невірний формат class (наприклад 10A).")
                 continue
             return v
+
+
+# Відрізки трасування (tracing.py) для обробників handle_* і операцій контролера; run — цикл меню
+traced_methods(Controller, exclude=("run",))
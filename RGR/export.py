@@ -0,0 +1,153 @@
+import itertools
+import os
+from urllib.parse import quote
+
+from model import JOURNAL_EXPORT_COLUMNS
+from writers import arrow_column, convert_columns
+
+# Вивантаження journal (з вимірами student/teacher/subject) у партиціоновані Parquet-файли
+# у стилі Hive: OUT/journal/year=2021/class=10A/part-0.parquet, а таблиць-вимірів — в OUT/<table>.parquet.
+# Дані читаються одним проходом через серверний курсор, упорядкованими за ключами партиції: у кожен момент
+# відкритий лише один ParquetWriter, а рядки партиції накопичуються до row group розміром batch_size.
+
+PARTITION_KEYS = ("year", "class")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Для експорту в Parquet потрібен пакет pyarrow (pip install pyarrow).")
+    return pyarrow, pyarrow.parquet
+
+
+def journal_schema(pa):
+    return pa.schema([
+        ("journal_id", pa.int32()),
+        ("entry_date", pa.date32()),
+        ("year", pa.int16()),
+        ("class", pa.string()),
+        ("student_id", pa.int32()),
+        ("student_first_name", pa.string()),
+        ("student_last_name", pa.string()),
+        ("teacher_id", pa.int32()),
+        ("teacher", pa.string()),
+        ("subject_id", pa.int32()),
+        ("subject", pa.string()),
+        ("grade", pa.int16()),
+        ("attendance_status", pa.string()),
+    ])
+
+
+def _partition_dir(base, keys, values):
+    parts = [f"{k}={quote(str(v), safe='')}" for k, v in zip(keys, values)]
+    return os.path.join(base, *parts)
+
+
+# Parquet-файл, у який рядки пишуться row group-ами по row_group_size (залишок — при закритті).
+# cols — індекси стовпців рядка-кортежу для полів schema, converters — перетворення значень (writers.arrow_column)
+class _ParquetFile:
+    def __init__(self, pa, pq, path, schema, cols, row_group_size, compression, converters=None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.pa = pa
+        self.schema = schema
+        self.cols = cols
+        self.converters = converters or [None] * len(schema)
+        self.row_group_size = row_group_size
+        self.writer = pq.ParquetWriter(path, schema, compression=compression)
+        self.buffer = []
+
+    def add(self, rows):
+        self.buffer.extend(rows)
+        while len(self.buffer) >= self.row_group_size:
+            self._write(self.buffer[:self.row_group_size])
+            del self.buffer[:self.row_group_size]
+
+    def _write(self, rows):
+        columns = list(zip(*rows))
+        columns = convert_columns([columns[c] for c in self.cols], self.converters)
+        arrays = [self.pa.array(col, type=f.type) for col, f in zip(columns, self.schema)]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema),
+                                row_group_size=len(rows))
+
+    def close(self):
+        try:
+            if self.buffer:
+                self._write(self.buffer)
+                self.buffer = []
+        finally:
+            self.writer.close()
+
+
+def export_journal(model, out_dir, partition_by=PARTITION_KEYS, batch_size=100000, compression="zstd"):
+    pa, pq = _require_pyarrow()
+    for key in partition_by:
+        if key not in PARTITION_KEYS:
+            raise ValueError(f"Невідомий ключ партиціювання: {key}")
+
+    schema = journal_schema(pa)
+    key_idx = [JOURNAL_EXPORT_COLUMNS.index(k) for k in partition_by]
+    # стовпці партицій зберігаються в шляху, а не у файлі
+    file_schema = pa.schema([f for f in schema if f.name not in partition_by])
+    file_cols = [JOURNAL_EXPORT_COLUMNS.index(f.name) for f in file_schema]
+
+    def partition_of(row):
+        return tuple(row[k] for k in key_idx)
+
+    base = os.path.join(out_dir, "journal")
+    current = part = None
+    done = set()
+    rows_total = 0
+    try:
+        for rows in model.iter_journal_export(batch_size=batch_size, order_by=partition_by):
+            # рядки впорядковані за ключами — партиція є суцільним відрізком потоку
+            for key, run in itertools.groupby(rows, key=partition_of):
+                if current is None or key != part:
+                    if key in done:
+                        raise RuntimeError(f"Партиція {key} повторилась — рядки не впорядковані за ключами.")
+                    if current is not None:
+                        current.close()
+                        done.add(part)
+                    part = key
+                    path = os.path.join(_partition_dir(base, partition_by, part), "part-0.parquet")
+                    current = _ParquetFile(pa, pq, path, file_schema, file_cols, batch_size, compression)
+                current.add(run)
+            rows_total += len(rows)
+    finally:
+        if current is not None:
+            current.close()
+            done.add(part)
+    return {"journal": rows_total, "partitions": len(done)}
+
+
+# Схема таблиці-виміру та перетворення значень — з типів її стовпців у БД
+# (не з першої пачки: порожній у ній стовпець став би null)
+def table_schema(pa, model, table, cols):
+    types = {c["column_name"]: c["data_type"] for c in model.get_columns(table)}
+    columns = [arrow_column(pa, types[c]) for c in cols]
+    return pa.schema([(c, t) for c, (t, _) in zip(cols, columns)]), [conv for _, conv in columns]
+
+
+def export_table(model, table, out_dir, batch_size=100000, compression="zstd"):
+    pa, pq = _require_pyarrow()
+    cols, batches = model.iter_table(table, batch_size=batch_size)
+    schema, converters = table_schema(pa, model, table, cols)
+    out = _ParquetFile(pa, pq, os.path.join(out_dir, f"{table}.parquet"), schema, range(len(cols)),
+                       batch_size, compression, converters)
+    rows_total = 0
+    try:
+        for rows in batches:
+            out.add(rows)
+            rows_total += len(rows)
+    finally:
+        out.close()
+    return rows_total
+
+
+def export_all(model, out_dir, partition_by=PARTITION_KEYS, dimensions=("student", "teacher", "subject", "parents"),
+               batch_size=100000):
+    stats = export_journal(model, out_dir, partition_by=partition_by, batch_size=batch_size)
+    for table in dimensions:
+        stats[table] = export_table(model, table, out_dir, batch_size=batch_size)
+    return stats
@@ -1,5 +1,18 @@
+import sys
+
+import common_path  # noqa: F401 — корінь репозиторію в sys.path (пакет common)
+from common.profiling import PROFILER
 from controller import Controller
 
 if __name__ == "__main__":
+    argv = sys.argv[1:]
+    if len(argv) == 2 and argv[0] == "--profile":
+        # Меню з профілюванням кожної команди: python main.py --profile DIR (див. profiling.py)
+        PROFILER.start(argv[1])
+        argv = []
+    if argv:
+        # Пакетний режим: python main.py <команда> ... (див. cli.py)
+        from cli import main
+        sys.exit(main(argv))
     controller = Controller()
     controller.run()
\ No newline at end of file
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import re
+
+# Застосування версіонованих SQL-міграцій з LR1/migrations (файли NNN_опис.sql, по порядку).
+# Кожна міграція виконується в окремій транзакції і фіксується в schema_version
+# (component = "migration/NNN_опис", version = NNN, fingerprint = sha256 файлу).
+
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "LR1", "migrations"
+)
+MIGRATION_RE = re.compile(r"^(\d+)_[A-Za-z0-9_]+\.sql$")
+
+SCHEMA_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS public.schema_version
+(
+    component character varying(100) NOT NULL,
+    version integer NOT NULL,
+    fingerprint character varying(64) NOT NULL,
+    applied_at timestamp NOT NULL DEFAULT now(),
+    CONSTRAINT schema_version_pkey PRIMARY KEY (component)
+);
+"""
+
+
+# Виняток (вже застосовану міграцію змінено)
+class MigrationChangedError(Exception):
+    pass
+
+
+def list_migrations(directory=MIGRATIONS_DIR):
+    res = []
+    for name in sorted(os.listdir(directory)):
+        m = MIGRATION_RE.match(name)
+        if m:
+            res.append((int(m.group(1)), name[:-4], os.path.join(directory, name)))
+    return sorted(res)
+
+
+# Відбиток не залежить від кінців рядків (CRLF/LF після checkout на різних ОС)
+def file_fingerprint(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read().replace(b"\r\n", b"\n")).hexdigest()
+
+
+def applied_migrations(conn):
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA_VERSION_DDL)
+        cur.execute("SELECT component, fingerprint FROM schema_version WHERE component LIKE 'migration/%%';")
+        rows = cur.fetchall()
+    conn.commit()
+    return {r["component"]: r["fingerprint"] for r in rows}
+
+
+# Застосувати один SQL-файл і зафіксувати його версію (ідемпотентно за component)
+def apply_sql_file(conn, path, component, version):
+    fingerprint = file_fingerprint(path)
+    with open(path, encoding="utf-8") as f:
+        sql = f.read()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql)
+            cur.execute(
+                "INSERT INTO schema_version(component, version, fingerprint) VALUES (%s, %s, %s) "
+                "ON CONFLICT (component) DO UPDATE SET version = EXCLUDED.version, "
+                "fingerprint = EXCLUDED.fingerprint, applied_at = now();",
+                (component, version, fingerprint),
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return fingerprint
+
+
+# Застосувати всі ще не застосовані міграції; повертає список застосованих
+def apply_migrations(model, directory=MIGRATIONS_DIR, target=None):
+    conn = model.conn
+    done = applied_migrations(conn)
+    applied = []
+    for version, stem, path in list_migrations(directory):
+        if target is not None and version > target:
+            break
+        component = f"migration/{stem}"
+        if component in done:
+            if done[component] != file_fingerprint(path):
+                raise MigrationChangedError(
+                    f"Міграцію {stem} змінено після застосування — створіть нову міграцію."
+                )
+            continue
+        apply_sql_file(conn, path, component, version)
+        applied.append(stem)
+    return applied
@@ -1,6 +1,19 @@
+import functools
+import itertools
 import os
-import psycopg
-from psycopg.rows import dict_row
+import weakref
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import common_path  # noqa: F401 — корінь репозиторію в sys.path (пакет common)
+from common.instrumentation import STATEMENT_STATS, instrument_psycopg
+from common.metrics import METRICS, generation_metered, psycopg_connection_class, timed_methods
+from common.retry import CONNECTION, RETRY_ATTEMPTS, new_retry_stats, retrying
+from common.routing import PRIMARY, ReplicaRouter, read_only
+from common.slowlog import SlowQueryLog, slow_logged
+from common.tracing import TRACER, traced_methods
+
+# Драйвер psycopg імпортується ліниво — при першому зверненні до self.conn
 
 DB = {
     "dbname": os.getenv("DB_NAME", "postgres"),
@@ -12,6 +25,37 @@ DB = {
 
 ALLOWED_TABLES = ["parents", "student", "teacher", "subject", "journal"]
 ATTENDANCE_STATUSES = ('present', 'absent', 'late')
+# Рівні ізоляції транзакцій з'єднання (None — за замовчуванням сервера, READ COMMITTED)
+ISOLATION_LEVELS = ("READ COMMITTED", "REPEATABLE READ", "SERIALIZABLE")
+
+# Компактне кодування (міграція 003): attendance smallint = індекс у ATTENDANCE_STATUSES, class -> school_class.
+# Таблиці читаються через представлення з початковими стовпцями (attendance_status, class)
+DECODED_VIEWS = {"journal": "journal_decoded", "student": "student_decoded"}
+
+# Рядків на одну транзакцію upsert_many (тимчасова таблиця + COPY + INSERT ... ON CONFLICT)
+UPSERT_BATCH_SIZE = int(os.getenv("DB_UPSERT_BATCH", "100000"))
+
+# Розмір блоку id, який IdAllocator резервує одним запитом (послідовності PK, міграція 007)
+ID_BLOCK_SIZE = int(os.getenv("DB_ID_BLOCK", "1000"))
+
+# Діапазон дат, які розігрує generate_journal
+GEN_JOURNAL_FROM = date(2020, 1, 1)
+GEN_JOURNAL_DAYS = 2000
+
+# Варіанти тригера-охоронця journal (міграція 005): рядковий з курсорними циклами, рівня оператора, без тригера
+JOURNAL_GUARD_VARIANTS = ("row", "statement", "none")
+# Нечіткий пошук людей (міграція 006): таблиці й рядок, на якому побудовано GIN-індекс триграм
+SEARCH_TABLES = ("student", "parents", "teacher")
+SEARCH_DOCUMENT = "(first_name || ' ' || last_name || ' ' || email)"
+SEARCH_MIN_CHARS = 3
+
+# Стовпці вивантаження journal з вимірами (порядок = порядок у SELECT)
+JOURNAL_EXPORT_COLUMNS = (
+    "journal_id", "entry_date", "year", "class",
+    "student_id", "student_first_name", "student_last_name",
+    "teacher_id", "teacher", "subject_id", "subject",
+    "grade", "attendance_status",
+)
 
 # Виняток (є дочірні записи)
 class ChildRowsExistError(Exception):
@@ -23,6 +67,66 @@ class ChildRowsExistError(Exception):
 class ValidationError(Exception):
     pass
 
+
+# Рядок результату: dict з описом стовпців (ім'я, тип PostgreSQL, точність, масштаб) з cursor.description —
+# за ним writers.ArrowWriter оголошує схему наперед. Клас створюється один раз на кожен різний опис
+class ResultRow(dict):
+    __slots__ = ()
+    columns = None
+
+
+# Результат fetchall: список рядків з тим самим описом стовпців — він є і тоді, коли рядків немає
+class ResultRows(list):
+    __slots__ = ("columns",)
+
+    def __init__(self, rows=(), columns=None):
+        super().__init__(rows)
+        self.columns = columns
+
+
+_ROW_CLASSES = {}
+
+
+# Клас рядків ResultRow під опис поточного результату курсора
+def _row_class(cursor):
+    desc = cursor.description
+    key = tuple((c.name, c.type_code, c.precision, c.scale) for c in desc)
+    cls = _ROW_CLASSES.get(key)
+    if cls is None:
+        types = cursor.adapters.types
+        columns = tuple(
+            (c.name, getattr(types.get(c.type_code), "name", None), c.precision, c.scale) for c in desc
+        )
+        cls = _ROW_CLASSES[key] = type("ResultRow", (ResultRow,), {"__slots__": (), "columns": columns})
+    return cls
+
+
+# Фабрика рядків psycopg: як dict_row, але рядки — ResultRow з описом стовпців результату
+def described_dict_row(cursor):
+    from psycopg.rows import no_result
+
+    if cursor.description is None:
+        return no_result
+    cls = _row_class(cursor)
+    names = [c.name for c in cursor.description]
+
+    def make_row(values):
+        return cls(zip(names, values))
+
+    return make_row
+
+
+# Курсор поверх base, у якого fetchall повертає ResultRows з описом стовпців
+@functools.lru_cache(maxsize=None)
+def described_cursor_class(base):
+    class DescribedCursor(base):
+        def fetchall(self):
+            rows = super().fetchall()
+            return ResultRows(rows, _row_class(self).columns if self.description is not None else None)
+
+    return DescribedCursor
+
+
 class Model:
     PK_MAP = {
         "parents": "parents_id",
@@ -32,22 +136,253 @@ class Model:
         "journal": "journal_id",
     }
 
-    # Ініціалізація з'єднання
-    def __init__(self):
-        self.conn = psycopg.connect(**DB)
-        self.conn.row_factory = dict_row
-        self.conn.autocommit = False
+    # Ініціалізація (з'єднання відкривається при першій операції з даними)
+    # retry_attempts — повтори при тимчасових помилках БД (retry.py); 0 — без повторів
+    # db — параметри з'єднання замість DB (шард у sharding.py)
+    def __init__(self, isolation_level=None, retry_attempts=None, db=None):
+        if isolation_level is not None and isolation_level not in ISOLATION_LEVELS:
+            raise ValueError(f"Невідомий рівень ізоляції: {isolation_level}")
+        self.db = DB if db is None else db
+        self.isolation_level = isolation_level
+        self.retry_attempts = RETRY_ATTEMPTS if retry_attempts is None else retry_attempts
+        self.retry_stats = new_retry_stats()
+        self._retry_depth = 0
+        # глибина вкладеності transaction(): > 0 — методи не фіксують зміни самі
+        self._tx_depth = 0
+        # слухачі кожного SQL-оператора (instrumentation.py); статистика спільна для процесу
+        self.statement_stats = STATEMENT_STATS
+        self.statement_listeners = [STATEMENT_STATS, TRACER]
+        self.slow_log = SlowQueryLog.from_env()
+        if self.slow_log is not None:
+            self.statement_listeners.append(self.slow_log)
+        self._conn = None
+        # репліки для читань (routing.py, DB_REPLICAS); _read_route — маршрут поточного методу читання.
+        # DB_REPLICAS — репліки основної БД, тож для шардів не застосовуються
+        self.router = ReplicaRouter.from_env(DB) if db is None else None
+        self._read_route = None
+        self._replica_conns = {}
+        self._journal_partitioned = None
+        self._journal_years = set()
+        self._compact = None
+        self._pk_columns = {}
+        self._id_sequences = {}
+        # нижня межа наступного значення кожної послідовності, відома клієнту (_advance_sequence)
+        self._sequence_floor = {}
+        # метрики (metrics.py): з'єднання моделі видно в db_pool_connections; DB_METRICS_PORT — ендпоінт
+        _models.add(self)
+        METRICS.serve_from_env()
+
+    # Відкладене з'єднання; у методі читання, направленому на репліку, — з'єднання репліки
+    @property
+    def conn(self):
+        if self._read_route is not None and self._read_route != PRIMARY:
+            return self._replica(self._read_route)
+        if self._conn is None:
+            self._conn = self._connect(self.db)
+        return self._conn
+
+    def _connect(self, params, read_only=False):
+        import psycopg
+
+        with TRACER.span("connect", "db", host=params["host"], dbname=params["dbname"]):
+            conn = psycopg_connection_class().connect(**params)
+        conn.row_factory = described_dict_row
+        instrument_psycopg(conn, self.statement_listeners)
+        conn.cursor_factory = described_cursor_class(conn.cursor_factory)
+        conn.autocommit = False
+        conn.read_only = read_only or None
+        if self.isolation_level is not None:
+            conn.isolation_level = psycopg.IsolationLevel[self.isolation_level.replace(" ", "_")]
+        return conn
+
+    def _replica(self, index):
+        conn = self._replica_conns.get(index)
+        if conn is None or conn.closed:
+            conn = self._replica_conns[index] = self._connect(self.router.replicas[index], read_only=True)
+        return conn
+
+    # Позиція WAL основного сервера (викликається до вибору маршруту, тож self.conn — основний)
+    def _primary_lsn(self):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT pg_current_wal_lsn()::text AS lsn;")
+            lsn = cur.fetchone()["lsn"]
+        self.conn.rollback()
+        return lsn
+
+    # Чи відтворила репліка WAL до позиції lsn
+    def _replica_replayed(self, index, lsn):
+        conn = self._replica(index)
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_last_wal_replay_lsn() >= %s::pg_lsn AS ok;", (lsn,))
+            ok = cur.fetchone()["ok"]
+        conn.rollback()
+        return bool(ok)
+
+    def _drop_replica(self, index):
+        conn = self._replica_conns.pop(index, None)
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
 
     # Закрити з'єднання
     def close(self):
-        if self.conn:
-            self.conn.close()
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+        for index in list(self._replica_conns):
+            self._drop_replica(index)
+        self._journal_partitioned = None
+        self._journal_years = set()
+        self._compact = None
+        self._pk_columns = {}
+        self._id_sequences = {}
+        self._sequence_floor = {}
+        self._tx_depth = 0
+        self._retry_depth = 0
+
+    # Увімкнути журнал повільних запитів (slowlog.py): оператори й виклики довші за threshold_ms
+    def enable_slow_log(self, threshold_ms, path=None, analyze_writes=None):
+        kwargs = {}
+        if path is not None:
+            kwargs["path"] = path
+        if analyze_writes is not None:
+            kwargs["analyze_writes"] = analyze_writes
+        if self.slow_log is not None:
+            self.statement_listeners.remove(self.slow_log)
+        self.slow_log = SlowQueryLog(threshold_ms, **kwargs)
+        self.statement_listeners.append(self.slow_log)
+        return self.slow_log
+
+    # Фіксація операції; всередині transaction() відкладається до кінця зовнішнього блоку
+    def _commit(self):
+        if not self._tx_depth:
+            self.conn.commit()
+            if self.router is not None and self._read_route is None:
+                self.router.wrote()
+
+    # Завершення транзакції лише для читання; всередині transaction() транзакція належить викликачу
+    def _rollback(self):
+        if not self._tx_depth:
+            self.conn.rollback()
+
+    # Явна транзакція: методи моделі в блоці приєднуються до неї (відкладена фіксація), і тисячі змін
+    # фіксуються одним COMMIT. Вкладений блок — SAVEPOINT: помилка в ньому відкочує лише його зміни.
+    # Виняток у зовнішньому блоці відкочує все. Методи в блоці не повторюються окремо (retry.py).
+    @contextmanager
+    def transaction(self):
+        conn = self.conn
+        nested = self._tx_depth > 0
+        savepoint = f"model_sp_{self._tx_depth}"
+        if nested:
+            conn.execute(f"SAVEPOINT {savepoint};")
+        else:
+            # незавершена транзакція попередніх читань не повинна потрапити в блок
+            conn.rollback()
+        self._tx_depth += 1
+        self._retry_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._tx_depth -= 1
+            self._retry_depth -= 1
+            # партиції, створені у відкоченій транзакції, більше не існують
+            self._journal_years = set()
+            if not conn.broken:
+                if nested:
+                    conn.execute(f"ROLLBACK TO SAVEPOINT {savepoint};")
+                else:
+                    conn.rollback()
+            raise
+        self._tx_depth -= 1
+        self._retry_depth -= 1
+        if nested:
+            conn.execute(f"RELEASE SAVEPOINT {savepoint};")
+        else:
+            conn.commit()
+            if self.router is not None:
+                self.router.wrote()
+
+    # Чи виконується виклик усередині transaction()
+    def in_transaction(self):
+        return self._tx_depth > 0
+
+    # Відновлення після помилки БД: відкат перерваної транзакції або нове з'єднання при наступному зверненні
+    def _recover(self, kind):
+        if self._read_route is not None and self._read_route != PRIMARY:
+            conn = self._replica_conns.get(self._read_route)
+            if conn is not None and (kind == CONNECTION or conn.broken):
+                self._drop_replica(self._read_route)
+            elif conn is not None:
+                conn.rollback()
+            return
+        if self._conn is None:
+            return
+        if kind != CONNECTION and not self._conn.broken:
+            try:
+                self._conn.rollback()
+                return
+            except Exception:
+                pass
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
 
     # Перевірка допустимої таблиці
     def _validate_table(self, table):
         if table not in ALLOWED_TABLES:
             raise ValueError("Невідома таблиця")
 
+    # Чи застосовано компактне кодування (міграція 003); визначається один раз на з'єднання
+    def compact_encoding(self):
+        METRICS.cache_access("compact_encoding", self._compact is not None)
+        if self._compact is None:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT to_regclass('public.journal_decoded') IS NOT NULL AS ok;")
+                self._compact = cur.fetchone()["ok"]
+            self._commit()
+        return self._compact
+
+    # SQL-умови «відвідуваність = статус» для рядків journal (alias — префікс стовпця) за кодами міграції 003.
+    # Потрібні лише поряд з report_card_summary (міграція 004), а вона можлива тільки після 003
+    def _attendance_conditions(self, alias=""):
+        return [f"{alias}attendance = {code}" for code in range(len(ATTENDANCE_STATUSES))]
+
+    # Відношення для читання таблиці в логічних стовпцях
+    def read_relation(self, table):
+        if table in DECODED_VIEWS and self.compact_encoding():
+            return DECODED_VIEWS[table]
+        return table
+
+    # Логічний стовпець і значення -> (фізичний стовпець, SQL-вираз, параметр)
+    def _encode_value(self, table, col, value):
+        if self.compact_encoding():
+            if table == "journal" and col == "attendance_status":
+                if value is not None and value not in ATTENDANCE_STATUSES:
+                    raise ValidationError("Invalid attendance_status.")
+                return "attendance", "%s", None if value is None else ATTENDANCE_STATUSES.index(value)
+            if table == "student" and col == "class":
+                return "class_id", "class_id_of(%s)", value
+        return col, "%s", value
+
+    # Рядок з RETURNING * (фізичні стовпці) -> логічні стовпці в порядку представлення
+    def _decode_row(self, table, row):
+        if row is None or table not in DECODED_VIEWS or not self.compact_encoding():
+            return row
+        values = dict(row)
+        if "attendance" in values:
+            code = values.pop("attendance")
+            values["attendance_status"] = None if code is None else ATTENDANCE_STATUSES[code]
+        if "class_id" in values:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT name FROM school_class WHERE class_id = %s;", (values.pop("class_id"),))
+                r = cur.fetchone()
+            values["class"] = r["name"] if r else None
+        return {c: values[c] for c in self._get_columns_list(table) if c in values}
+
     # Повернути список стовпців
     def _get_columns_list(self, table):
         q = """
@@ -57,7 +392,7 @@ class Model:
         ORDER BY ordinal_position;
         """
         with self.conn.cursor() as cur:
-            cur.execute(q, (table,))
+            cur.execute(q, (self.read_relation(table),))
             return [r["column_name"] for r in cur.fetchall()]
 
     # Повернути список таблиць
@@ -65,6 +400,8 @@ class Model:
         return ALLOWED_TABLES.copy()
 
     # Повернути інформацію про стовпці таблиці
+    @read_only
+    @retrying()
     def get_columns(self, table):
         self._validate_table(table)
         q = """
@@ -74,18 +411,22 @@ class Model:
         ORDER BY ordinal_position;
         """
         with self.conn.cursor() as cur:
-            cur.execute(q, (table,))
+            cur.execute(q, (self.read_relation(table),))
             return cur.fetchall()
 
     # Повернути рядки таблиці
+    @read_only
+    @retrying()
     def list_table(self, table, limit=200):
         self._validate_table(table)
-        q = f'SELECT * FROM "{table}" ORDER BY 1 LIMIT %s'
+        q = f'SELECT * FROM "{self.read_relation(table)}" ORDER BY 1 LIMIT %s'
         with self.conn.cursor() as cur:
             cur.execute(q, (limit,))
             return cur.fetchall()
 
     # Перевірити наявність рядка за PK
+    @read_only
+    @retrying()
     def row_exists(self, table, pk_col, value):
         self._validate_table(table)
         q = f'SELECT 1 FROM "{table}" WHERE "{pk_col}" = %s LIMIT 1'
@@ -93,59 +434,131 @@ class Model:
             cur.execute(q, (value,))
             return cur.fetchone() is not None
 
+    # Послідовність PK таблиці (identity або OWNED BY, міграція 007); None — id задає викликач
+    def id_sequence(self, table):
+        self._validate_table(table)
+        if table not in self._id_sequences:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT pg_get_serial_sequence(%s, %s) AS seq;", (f'public."{table}"', self.PK_MAP[table]))
+                self._id_sequences[table] = cur.fetchone()["seq"]
+        return self._id_sequences[table]
+
+    # Зарезервувати n id таблиці одним запитом (nextval пачкою); id не повторюються між сесіями,
+    # але можуть чергуватися з id інших писачів
+    @retrying()
+    def reserve_ids(self, table, n):
+        seq = self.id_sequence(table)
+        if seq is None:
+            raise ValidationError(f"{table}: немає послідовності id — застосуйте міграції (python main.py migrate).")
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT nextval(%s::regclass) AS id FROM generate_series(1, %s);", (seq, n))
+            ids = [r["id"] for r in cur.fetchall()]
+        if ids:
+            self._raise_sequence_floor(seq, max(ids) + 1)
+        return ids
+
+    # Розподільник id з блоками по block_size (одна вставка — без запиту за id)
+    def id_allocator(self, table, block_size=ID_BLOCK_SIZE):
+        return IdAllocator(self, table, block_size)
+
+    # PK для вставки: None -> DEFAULT (послідовність); явний id просуває послідовність за себе,
+    # щоб наступні серверні id з ним не збіглися
+    def _insert_pk(self, table, value):
+        seq = self.id_sequence(table)
+        if value is None:
+            if seq is None:
+                raise ValidationError(
+                    f"{self.PK_MAP[table]} обов'язковий для вставки (автогенерація — після міграції 007)."
+                )
+            return "DEFAULT", ()
+        if seq is not None:
+            self._advance_sequence(seq, value)
+        return "%s", (value,)
+
+    # Наступне значення послідовності — не менше value + 1 (setval лише вперед).
+    # Читання і setval — під транзакційним advisory-замком послідовності: два писачі з явними id (100 і 200)
+    # не прочитають одне старе значення, тож менший id не поверне послідовність назад.
+    # Послідовність іде лише вперед, тож id нижче відомої клієнту межі пропускаються без запиту й замка;
+    # запит повертає нове наступне значення, і явні id нижче нього далі не звертаються до БД
+    def _advance_sequence(self, seq, value):
+        if value < self._sequence_floor.get(seq, 0):
+            return
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s::regclass::oid::bigint);", (seq,))
+            cur.execute(
+                "SELECT CASE WHEN s.next <= %s THEN setval(%s::regclass, %s) + 1 ELSE s.next END AS next "
+                f"FROM (SELECT CASE WHEN is_called THEN last_value + 1 ELSE last_value END AS next FROM {seq}) s;",
+                (value, seq, value),
+            )
+            self._raise_sequence_floor(seq, cur.fetchone()["next"])
+
+    def _raise_sequence_floor(self, seq, value):
+        if value > self._sequence_floor.get(seq, 0):
+            self._sequence_floor[seq] = value
+
+    # Нові PK для генераторів: з послідовності (паралельні генератори не конфліктують)
+    # або, без міграції 007, MAX(pk) + номер рядка
+    def _generated_ids(self, table):
+        seq = self.id_sequence(table)
+        if seq is not None:
+            return "maxv AS (SELECT 0 AS m)", f"nextval('{seq}'::regclass)"
+        pk = self.PK_MAP[table]
+        return f'maxv AS (SELECT COALESCE(MAX({pk}), 0) AS m FROM "{table}")', "m + row_number() OVER ()"
+
     # Вставка батьків
+    @retrying(idempotent=False)
     def insert_parent(self, parents_id, first_name, last_name, phone, email):
-        if parents_id is None:
-            raise ValidationError("parents_id обов'язковий для вставки (не можна автогенерувати).")
+        pk_sql, pk_params = self._insert_pk("parents", parents_id)
         with self.conn.cursor() as cur:
             cur.execute(
                 'INSERT INTO "parents"(parents_id, first_name, last_name, phone, email) '
-                'VALUES (%s,%s,%s,%s,%s) RETURNING parents_id;',
-                (parents_id, first_name, last_name, phone, email)
+                f'VALUES ({pk_sql},%s,%s,%s,%s) RETURNING parents_id;',
+                (*pk_params, first_name, last_name, phone, email)
             )
             row = cur.fetchone()
-            self.conn.commit()
+            self._commit()
             return row["parents_id"] if isinstance(row, dict) else row[0]
 
     # Вставка студентів
+    @retrying(idempotent=False)
     def insert_student(self, student_id, parents_id, first_name, last_name, birth_date, class_, email):
-        if student_id is None:
-            raise ValidationError("student_id обов'язковий для вставки (не можна автогенерувати).")
+        pk_sql, pk_params = self._insert_pk("student", student_id)
         if parents_id is not None and not self.row_exists("parents", "parents_id", parents_id):
             raise ValidationError("Parent with given parents_id not found.")
+        class_col, class_sql, class_ = self._encode_value("student", "class", class_)
         with self.conn.cursor() as cur:
-            q = 'INSERT INTO "student"(student_id, parents_id, first_name, last_name, birth_date, class, email) VALUES (%s,%s,%s,%s,%s,%s,%s) RETURNING student_id;'
-            cur.execute(q, (student_id, parents_id, first_name, last_name, birth_date, class_, email))
+            q = f'INSERT INTO "student"(student_id, parents_id, first_name, last_name, birth_date, {class_col}, email) VALUES ({pk_sql},%s,%s,%s,%s,{class_sql},%s) RETURNING student_id;'
+            cur.execute(q, (*pk_params, parents_id, first_name, last_name, birth_date, class_, email))
             sid = cur.fetchone()["student_id"]
-            self.conn.commit()
+            self._commit()
             return sid
 
     # Вставка вчителя
+    @retrying(idempotent=False)
     def insert_teacher(self, teacher_id, first_name, last_name, email):
-        if teacher_id is None:
-            raise ValidationError("teacher_id обов'язковий для вставки (не можна автогенерувати).")
+        pk_sql, pk_params = self._insert_pk("teacher", teacher_id)
         with self.conn.cursor() as cur:
-            q = 'INSERT INTO "teacher"(teacher_id, first_name, last_name, email) VALUES (%s,%s,%s,%s) RETURNING teacher_id;'
-            cur.execute(q, (teacher_id, first_name, last_name, email))
+            q = f'INSERT INTO "teacher"(teacher_id, first_name, last_name, email) VALUES ({pk_sql},%s,%s,%s) RETURNING teacher_id;'
+            cur.execute(q, (*pk_params, first_name, last_name, email))
             tid = cur.fetchone()["teacher_id"]
-            self.conn.commit()
+            self._commit()
             return tid
 
     # Вставка предмета
+    @retrying(idempotent=False)
     def insert_subject(self, subject_id, name):
-        if subject_id is None:
-            raise ValidationError("subject_id обов'язковий для вставки (не можна автогенерувати).")
+        pk_sql, pk_params = self._insert_pk("subject", subject_id)
         with self.conn.cursor() as cur:
-            q = 'INSERT INTO "subject"(subject_id, name) VALUES (%s,%s) RETURNING subject_id;'
-            cur.execute(q, (subject_id, name))
+            q = f'INSERT INTO "subject"(subject_id, name) VALUES ({pk_sql},%s) RETURNING subject_id;'
+            cur.execute(q, (*pk_params, name))
             sid = cur.fetchone()["subject_id"]
-            self.conn.commit()
+            self._commit()
             return sid
 
     # Вставка журналу
+    @retrying(idempotent=False)
     def insert_journal(self, journal_id, student_id, teacher_id, subject_id, entry_date, grade, attendance_status):
-        if journal_id is None:
-            raise ValidationError("journal_id обов'язковий для вставки (не можна автогенерувати).")
+        # повтор journal_id відхиляє БД (реєстр journal_id_registry, міграція 008) — UniqueViolation
         if not self.row_exists("student", "student_id", student_id):
             raise ValidationError("Student not found.")
         if teacher_id is not None and not self.row_exists("teacher", "teacher_id", teacher_id):
@@ -169,28 +582,72 @@ class Model:
             if g < 1 or g > 12:
                 raise ValidationError("Grade out of allowed range (1-12).")
 
+        if entry_date is not None:
+            self.ensure_journal_partitions(entry_date, entry_date)
+        att_col, _, attendance_status = self._encode_value("journal", "attendance_status", attendance_status)
+        pk_sql, pk_params = self._insert_pk("journal", journal_id)
         with self.conn.cursor() as cur:
-            q = """INSERT INTO "journal"(journal_id, student_id, teacher_id, subject_id, entry_date, grade, attendance_status)
-                   VALUES (%s,%s,%s,%s,%s,%s,%s) RETURNING journal_id;"""
-            cur.execute(q, (journal_id, student_id, teacher_id, subject_id, entry_date, grade, attendance_status))
+            q = f"""INSERT INTO "journal"(journal_id, student_id, teacher_id, subject_id, entry_date, grade, {att_col})
+                   VALUES ({pk_sql},%s,%s,%s,%s,%s,%s) RETURNING journal_id;"""
+            cur.execute(q, (*pk_params, student_id, teacher_id, subject_id, entry_date, grade, attendance_status))
             jid = cur.fetchone()["journal_id"]
-            self.conn.commit()
+            self._commit()
             return jid
 
     # Повернути всі рядки за PK
+    @read_only
+    @retrying()
     def select_by_pk(self, table, pk_col, pk_val):
         self._validate_table(table)
+        rel = self.read_relation(table)
         if pk_val is None:
-            q = f'SELECT * FROM "{table}" ORDER BY 1 LIMIT 10;'
+            q = f'SELECT * FROM "{rel}" ORDER BY 1 LIMIT 10;'
             with self.conn.cursor() as cur:
                 cur.execute(q)
                 return cur.fetchall()
-        q = f'SELECT * FROM "{table}" WHERE "{pk_col}" = %s;'
+        q = f'SELECT * FROM "{rel}" WHERE "{pk_col}" = %s;'
         with self.conn.cursor() as cur:
             cur.execute(q, (pk_val,))
             return cur.fetchall()
 
+    # Нечіткий пошук за ім'ям, прізвищем або email (pg_trgm, міграція 006): top-k за word_similarity.
+    # Рядок шукається як частина слова з помилками (<%) або як підрядок (ILIKE) — обидва через GIN-індекс.
+    # threshold — власний поріг word_similarity як параметр запиту (налаштування сесії не змінюються);
+    # без нього — <% з порогом сервера pg_trgm.word_similarity_threshold (0.6). Поріг-параметр індекс не обмежує,
+    # тож такий запит перевіряє word_similarity для кожного рядка
+    @read_only
+    @retrying()
+    def search_people(self, text, tables=None, limit=20, threshold=None):
+        text = (text or "").strip()
+        if len(text) < SEARCH_MIN_CHARS:
+            raise ValidationError(f"Пошуковий рядок — щонайменше {SEARCH_MIN_CHARS} символи.")
+        tables = SEARCH_TABLES if tables is None else tuple(tables)
+        for table in tables:
+            if table not in SEARCH_TABLES:
+                raise ValidationError(f"Пошук лише в таблицях: {', '.join(SEARCH_TABLES)}")
+        if threshold is None:
+            fuzzy = f"%(q)s <%% {SEARCH_DOCUMENT}"
+        else:
+            fuzzy = f"word_similarity(%(q)s, {SEARCH_DOCUMENT}) >= %(threshold)s"
+        branches = [
+            f"""(SELECT '{table}' AS "table", {self.PK_MAP[table]} AS id, first_name, last_name, email,
+                    round(word_similarity(%(q)s, {SEARCH_DOCUMENT})::numeric, 3) AS score
+             FROM "{table}"
+             WHERE {fuzzy} OR {SEARCH_DOCUMENT} ILIKE %(like)s
+             ORDER BY score DESC LIMIT %(k)s)"""
+            for table in tables
+        ]
+        q = f'SELECT * FROM ({" UNION ALL ".join(branches)}) m ORDER BY score DESC, "table", id LIMIT %(k)s;'
+        like = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        with self.conn.cursor() as cur:
+            cur.execute(q, {"q": text, "like": like, "k": limit, "threshold": threshold})
+            rows = cur.fetchall()
+        self._rollback()
+        return rows
+
     # Допоміжний метод — приклади дочірніх рядків, які посилаються на батьківські PK
+    @read_only
+    @retrying()
     def select_child_examples(self, child_table, child_col, parent_table, limit=10):
         self._validate_table(child_table)
         self._validate_table(parent_table)
@@ -200,7 +657,7 @@ class Model:
 
         q = f'''
             SELECT c.*
-            FROM "{child_table}" c
+            FROM "{self.read_relation(child_table)}" c
             JOIN "{parent_table}" p ON c."{child_col}" = p."{parent_pk}"
             LIMIT %s;
         '''
@@ -209,6 +666,7 @@ class Model:
             return cur.fetchall()
 
     # Оновити рядок по PK
+    @retrying()
     def update_by_pk(self, table, pk_col, pk_val, updates: dict):
         self._validate_table(table)
         if not updates:
@@ -219,18 +677,155 @@ class Model:
         for k, v in updates.items():
             if k not in cols:
                 raise ValueError(f"Невідомий стовпець: {k}")
-            set_parts.append(f'"{k}" = %s')
+            col, expr, v = self._encode_value(table, k, v)
+            set_parts.append(f'"{col}" = {expr}')
             params.append(v)
         params.append(pk_val)
         set_clause = ", ".join(set_parts)
         q = f'UPDATE "{table}" SET {set_clause} WHERE "{pk_col}" = %s RETURNING *;'
         with self.conn.cursor() as cur:
             cur.execute(q, tuple(params))
-            row = cur.fetchone()
-            self.conn.commit()
-            return row
+            row = self._decode_row(table, cur.fetchone())
+        self._commit()
+        return row
+
+    # Стовпці первинного ключа таблиці з pg_index (у партиціонованій journal — (journal_id, entry_date))
+    def _primary_key(self, table):
+        cols = self._pk_columns.get(table)
+        if cols is None:
+            q = """
+            SELECT a.attname
+            FROM pg_index i
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = %s::regclass AND i.indisprimary
+            ORDER BY array_position(i.indkey::int2[], a.attnum);
+            """
+            with self.conn.cursor() as cur:
+                cur.execute(q, (f'public."{table}"',))
+                cols = self._pk_columns[table] = [r["attname"] for r in cur.fetchall()]
+        return cols
+
+    # Логічний стовпець тимчасової таблиці -> (фізичний стовпець, SQL-вираз від s.стовпця)
+    def _encode_column(self, table, col):
+        if self.compact_encoding():
+            if table == "journal" and col == "attendance_status":
+                return "attendance", "(SELECT a.code FROM attendance_code a WHERE a.status = s.attendance_status)"
+            if table == "student" and col == "class":
+                return "class_id", 'class_id_of(s."class")'
+        return col, f's."{col}"'
+
+    # Ідемпотентне завантаження: рядки (dict або послідовності в порядку columns) пачками по batch_size
+    # копіюються (COPY) у тимчасову таблицю і зливаються в таблицю через INSERT ... ON CONFLICT (PK) DO UPDATE.
+    # Оновлюються лише рядки, що відрізняються, — повторний запуск перерваного імпорту дописує відсутнє
+    # і не переписує решту. Кожна пачка — окрема транзакція (усередині transaction() — точка збереження),
+    # тож після збою зафіксовані пачки лишаються. Повертає лічильники рядків.
+    @slow_logged
+    def upsert_many(self, table, rows, columns=None, batch_size=UPSERT_BATCH_SIZE):
+        self._validate_table(table)
+        rows = iter(rows)
+        first = next(rows, None)
+        stats = {"rows": 0, "inserted": 0, "updated": 0, "unchanged": 0, "batches": 0}
+        if first is None:
+            return stats
+        logical = self._get_columns_list(table)
+        if columns is None:
+            columns = list(first) if isinstance(first, dict) else logical
+        unknown = [c for c in columns if c not in logical]
+        if unknown:
+            raise ValidationError(f"Невідомі стовпці: {', '.join(unknown)}")
+        pk = self._primary_key(table)
+        missing = [c for c in pk if c not in columns]
+        if missing:
+            raise ValidationError(f"Для злиття потрібні стовпці первинного ключа: {', '.join(missing)}")
+
+        encoded = [self._encode_column(table, c) for c in columns]
+        targets = ", ".join(f'"{col}"' for col, _ in encoded)
+        updates = [col for col, _ in encoded if col not in pk]
+        if updates:
+            changed = " OR ".join(f't."{c}" IS DISTINCT FROM EXCLUDED."{c}"' for c in updates)
+            conflict = "DO UPDATE SET " + ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in updates) + f" WHERE {changed}"
+        else:
+            conflict = "DO NOTHING"
+        pk_list = ", ".join(f'"{c}"' for c in pk)
+        # наявні ключі рахуються до злиття: RETURNING xmax у партиціонованій таблиці недоступний
+        existing_q = f'SELECT count(*) AS existing FROM upsert_stage JOIN "{table}" USING ({pk_list});'
+        merge_q = f"""
+        INSERT INTO "{table}" AS t ({targets})
+        SELECT {", ".join(expr for _, expr in encoded)} FROM upsert_stage s
+        ON CONFLICT ({pk_list}) {conflict};
+        """
+        stage_cols = ", ".join(f'"{c}"' for c in columns)
+        id_col = self.PK_MAP[table]
+        sequence = self.id_sequence(table) if id_col in columns else None
+
+        def values(row):
+            return [row.get(c) for c in columns] if isinstance(row, dict) else row
+
+        pending = itertools.chain([first], rows)
+        while True:
+            with self.transaction():
+                with self.conn.cursor() as cur:
+                    cur.execute(
+                        f'CREATE TEMP TABLE upsert_stage ON COMMIT DROP AS '
+                        f'SELECT {stage_cols} FROM "{self.read_relation(table)}" WITH NO DATA;'
+                    )
+                    staged = 0
+                    with cur.copy(f"COPY upsert_stage ({stage_cols}) FROM STDIN") as copy:
+                        for row in itertools.islice(pending, batch_size):
+                            copy.write_row(values(row))
+                            staged += 1
+                    if staged:
+                        moved = self._prepare_upsert_stage(cur, table, columns)
+                        cur.execute(existing_q)
+                        inserted = staged - cur.fetchone()["existing"]
+                        cur.execute(merge_q)
+                        merged = cur.rowcount
+                        if sequence is not None:
+                            cur.execute(f'SELECT max("{id_col}") AS m FROM upsert_stage;')
+                            self._advance_sequence(sequence, cur.fetchone()["m"])
+                        stats["rows"] += staged
+                        stats["inserted"] += inserted
+                        stats["updated"] += merged - inserted + moved
+                        stats["unchanged"] += staged - merged - moved
+                        stats["batches"] += 1
+                    # у вкладеній транзакції ON COMMIT DROP не спрацює до зовнішнього COMMIT
+                    cur.execute("DROP TABLE upsert_stage;")
+            if staged < batch_size:
+                return stats
+
+    # Підготовка пачки journal перед злиттям: коди відвідуваності, партиції для її дат і перенесення дат.
+    # У партиціонованій journal ON CONFLICT (journal_id, entry_date) не бачить той самий journal_id з виправленою
+    # датою — вставка впала б на реєстрі journal_id_registry (міграція 008). Такі рядки оновлюються тут
+    # (UPDATE переносить рядок у партицію нової дати), а злиття їх уже не змінює. Повертає кількість перенесених
+    def _prepare_upsert_stage(self, cur, table, columns):
+        if table != "journal":
+            return 0
+        if "attendance_status" in columns:
+            cur.execute(
+                "SELECT attendance_status FROM upsert_stage "
+                "WHERE attendance_status IS NOT NULL AND attendance_status <> ALL(%s) LIMIT 1;",
+                (list(ATTENDANCE_STATUSES),),
+            )
+            bad = cur.fetchone()
+            if bad:
+                raise ValidationError(f"Invalid attendance_status: {bad['attendance_status']}")
+        cur.execute("SELECT min(entry_date) AS date_from, max(entry_date) AS date_to FROM upsert_stage;")
+        bounds = cur.fetchone()
+        if bounds["date_from"] is not None:
+            self.ensure_journal_partitions(bounds["date_from"], bounds["date_to"])
+        if "entry_date" not in self._primary_key(table):
+            return 0
+        sets = ", ".join(f'"{col}" = {expr}' for col, expr in
+                         (self._encode_column(table, c) for c in columns if c != "journal_id"))
+        cur.execute(
+            f'UPDATE "journal" AS t SET {sets} FROM upsert_stage s '
+            "WHERE t.journal_id = s.journal_id AND t.entry_date <> s.entry_date;"
+        )
+        return cur.rowcount
 
     # Порахувати дітей
+    @read_only
+    @retrying()
     def count_children(self, child_table, fk_column, value):
         self._validate_table(child_table)
         q = f'SELECT COUNT(*) AS cnt FROM "{child_table}" WHERE "{fk_column}" = %s'
@@ -239,6 +834,8 @@ class Model:
             return cur.fetchone()["cnt"]
 
     # Видалити всі рядки в таблиці
+    @slow_logged
+    @retrying()
     def delete_all(self, table):
         self._validate_table(table)
         fks = self.get_referencing_fks(table)
@@ -263,10 +860,12 @@ class Model:
 
             cur.execute(f'DELETE FROM "{table}";')
             deleted = cur.rowcount
-            self.conn.commit()
+            self._commit()
             return deleted
 
     # Порахувати рядки в таблиці
+    @read_only
+    @retrying()
     def count_rows(self, table):
         self._validate_table(table)
         q = f'SELECT COUNT(*) AS cnt FROM "{table}";'
@@ -275,19 +874,25 @@ class Model:
             return cur.fetchone()["cnt"]
 
     # Отримати FK, які посилаються на цю таблицю
+    @read_only
+    @retrying()
     def get_referencing_fks(self, table):
+        # pg_constraint замість information_schema: копії FK на партиціях journal мають ті самі імена
+        # і дублювали б рядки; conparentid = 0 залишає лише FK самої (батьківської) таблиці
         q = """
         SELECT
-          kcu.table_name AS child_table,
-          kcu.column_name AS child_column
-        FROM information_schema.table_constraints AS tc
-        JOIN information_schema.key_column_usage AS kcu
-          ON tc.constraint_name = kcu.constraint_name AND tc.table_schema = kcu.table_schema
-        JOIN information_schema.constraint_column_usage AS ccu
-          ON ccu.constraint_name = tc.constraint_name AND ccu.table_schema = tc.table_schema
-        WHERE tc.constraint_type = 'FOREIGN KEY'
-          AND ccu.table_name = %s
-          AND ccu.table_schema = 'public';
+          ch.relname AS child_table,
+          a.attname AS child_column
+        FROM pg_constraint c
+        JOIN pg_class ch ON ch.oid = c.conrelid
+        JOIN pg_class p ON p.oid = c.confrelid
+        JOIN pg_namespace n ON n.oid = p.relnamespace
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = ANY(c.conkey)
+        WHERE c.contype = 'f'
+          AND c.conparentid = 0
+          AND p.relname = %s
+          AND n.nspname = 'public'
+        ORDER BY ch.relname, a.attname;
         """
         with self.conn.cursor() as cur:
             cur.execute(q, (table,))
@@ -301,6 +906,9 @@ class Model:
             return res
 
     # Попередній підрахунок дочірніх записів (для видалення по PK)
+    @read_only
+    @slow_logged
+    @retrying()
     def preview_child_counts(self, table, pk_col, pk_val):
         self._validate_table(table)
         counts = {}
@@ -319,6 +927,7 @@ class Model:
         return counts
 
     # Видалення по PK з забороною при наявності дочірніх записів
+    @retrying()
     def delete_by_pk(self, table, pk_col, pk_val):
         self._validate_table(table)
         counts = self.preview_child_counts(table, pk_col, pk_val)
@@ -329,18 +938,20 @@ class Model:
             raise ChildRowsExistError(child_totals)
         with self.conn.cursor() as cur:
             cur.execute(f'DELETE FROM "{table}" WHERE "{pk_col}" = %s RETURNING *;', (pk_val,))
-            row = cur.fetchone()
-            self.conn.commit()
-            deleted_counts = {table: (1 if row else 0)}
-            return row, deleted_counts
+            row = self._decode_row(table, cur.fetchone())
+        self._commit()
+        deleted_counts = {table: (1 if row else 0)}
+        return row, deleted_counts
 
-    # Генерація батьків
+    # Генерація батьків (генератори повертають кількість вставлених рядків)
+    @generation_metered("parents")
+    @slow_logged
+    @retrying(idempotent=False)
     def generate_parents(self, n):
-        q = """
-        WITH maxv AS (
-          SELECT COALESCE(MAX(parents_id), 0) AS m FROM "parents"
-        ), gens AS (
-          SELECT m + row_number() OVER () AS new_id,
+        ids_cte, new_id = self._generated_ids("parents")
+        q = f"""
+        WITH {ids_cte}, gens AS (
+          SELECT {new_id} AS new_id,
                  left(md5(random()::text),8) AS fn,
                  left(md5(random()::text),8) AS ln,
                  ('+380' || (100000000 + floor(random()*900000000)::bigint)::text) AS phone,
@@ -352,15 +963,18 @@ class Model:
         """
         with self.conn.cursor() as cur:
             cur.execute(q, (n,))
-            self.conn.commit()
+            self._commit()
+            return cur.rowcount
 
     # Генерація вчителів
+    @generation_metered("teacher")
+    @slow_logged
+    @retrying(idempotent=False)
     def generate_teachers(self, n):
-        q = """
-        WITH maxv AS (
-          SELECT COALESCE(MAX(teacher_id), 0) AS m FROM "teacher"
-        ), gens AS (
-          SELECT m + row_number() OVER () AS new_id,
+        ids_cte, new_id = self._generated_ids("teacher")
+        q = f"""
+        WITH {ids_cte}, gens AS (
+          SELECT {new_id} AS new_id,
                  left(md5(random()::text),8) AS fn,
                  left(md5(random()::text),8) AS ln,
                  lower(left(md5(random()::text),8) || '@example.com') AS em
@@ -371,15 +985,18 @@ class Model:
         """
         with self.conn.cursor() as cur:
             cur.execute(q, (n,))
-            self.conn.commit()
+            self._commit()
+            return cur.rowcount
 
     # Генерація предметів
+    @generation_metered("subject")
+    @slow_logged
+    @retrying(idempotent=False)
     def generate_subjects(self, n):
-        q = """
-        WITH maxv AS (
-          SELECT COALESCE(MAX(subject_id), 0) AS m FROM "subject"
-        ), gens AS (
-          SELECT m + row_number() OVER () AS new_id,
+        ids_cte, new_id = self._generated_ids("subject")
+        q = f"""
+        WITH {ids_cte}, gens AS (
+          SELECT {new_id} AS new_id,
                  left(md5(random()::text),10) AS nm
           FROM maxv, generate_series(1, %s)
         )
@@ -388,18 +1005,36 @@ class Model:
         """
         with self.conn.cursor() as cur:
             cur.execute(q, (n,))
-            self.conn.commit()
+            self._commit()
+            return cur.rowcount
 
     # Генерація студентів
+    @generation_metered("student")
+    @slow_logged
+    @retrying(idempotent=False)
     def generate_students(self, n):
-        q = """
-        WITH maxv AS (
-          SELECT COALESCE(MAX(student_id), 0) AS m FROM "student"
-        ), pids AS (
+        ids_cte, new_id = self._generated_ids("student")
+        if self.compact_encoding():
+            # словник класів генератора (1..11 з необов'язковою літерою) додається у вимір наперед,
+            # а рядки отримують class_id звичайним з'єднанням за назвою.
+            # Вставляються лише відсутні назви — ON CONFLICT теж витрачав би значення identity (smallint)
+            prepare_q = """
+            INSERT INTO "school_class"(name)
+            SELECT v.name
+            FROM (SELECT n::text || l AS name FROM generate_series(1, 11) n, unnest(ARRAY['', 'A', 'B']) l) v
+            WHERE NOT EXISTS (SELECT 1 FROM "school_class" c WHERE c.name = v.name)
+            ON CONFLICT (name) DO NOTHING;
+            """
+            class_col, class_val, class_join = "class_id", "c.class_id", 'JOIN "school_class" c ON c.name = g.cls'
+        else:
+            prepare_q = None
+            class_col, class_val, class_join = "class", "g.cls", ""
+        q = f"""
+        WITH {ids_cte}, pids AS (
           SELECT row_number() OVER (ORDER BY parents_id) AS idx, parents_id
           FROM "parents"
         ), gens AS (
-          SELECT m + row_number() OVER () AS new_id,
+          SELECT {new_id} AS new_id,
                  (floor(random() * (SELECT count(*) FROM "parents"))::int + 1) AS pidx,
                  left(md5(random()::text),6) AS fn,
                  left(md5(random()::text),6) AS ln,
@@ -409,46 +1044,62 @@ class Model:
                  lower(left(md5(random()::text),6) || '@example.com') AS em
           FROM maxv, generate_series(1, %s)
         )
-        INSERT INTO "student"(student_id, parents_id, first_name, last_name, birth_date, class, email)
-        SELECT g.new_id, p.parents_id, g.fn, g.ln, g.bd, g.cls, g.em
+        INSERT INTO "student"(student_id, parents_id, first_name, last_name, birth_date, {class_col}, email)
+        SELECT g.new_id, p.parents_id, g.fn, g.ln, g.bd, {class_val}, g.em
         FROM gens g
-        JOIN pids p ON p.idx = g.pidx;
+        JOIN pids p ON p.idx = g.pidx
+        {class_join};
         """
         with self.conn.cursor() as cur:
+            if prepare_q:
+                cur.execute(prepare_q)
             cur.execute(q, (n,))
-            self.conn.commit()
+            self._commit()
+            return cur.rowcount
 
     # Генерація журналу
+    @generation_metered("journal")
+    @slow_logged
+    @retrying(idempotent=False)
     def generate_journal(self, n):
         if n <= 0:
-            return
+            return 0
+
+        ids_cte, new_id = self._generated_ids("journal")
+        # партиції для всього діапазону дат генератора створюються до вставки
+        self.ensure_journal_partitions(GEN_JOURNAL_FROM, GEN_JOURNAL_FROM + timedelta(days=GEN_JOURNAL_DAYS - 1))
 
-        insert_q = """
-        WITH maxv AS (
-          SELECT COALESCE(MAX(journal_id), 0) AS m FROM "journal"
-        ), counts AS (
+        # відвідуваність і оцінка розігруються одразу у вставці (без другого проходу UPDATE
+        # по всіх партиціях і без записів 'U' у journal_changes)
+        if self.compact_encoding():
+            att_col, att_val = "attendance", "g.r"
+        else:
+            att_col, att_val = "attendance_status", "CASE g.r WHEN 0 THEN 'present' WHEN 1 THEN 'absent' ELSE 'late' END"
+        insert_q = f"""
+        WITH {ids_cte}, counts AS (
           SELECT (SELECT count(*) FROM "student") AS students_count,
                  (SELECT count(*) FROM "teacher") AS teachers_count,
                  (SELECT count(*) FROM "subject") AS subjects_count
         ), gens AS (
           SELECT
-            m + row_number() OVER () AS new_id,
+            {new_id} AS new_id,
             (floor(random() * (SELECT students_count FROM counts))::int + 1) AS s_idx,
             (floor(random() * (SELECT teachers_count FROM counts))::int + 1) AS t_idx,
             (floor(random() * (SELECT subjects_count FROM counts))::int + 1) AS sb_idx,
-            (date '2020-01-01' + (trunc(random()*2000)::int))::date AS ed,
-            (floor(random()*12)::int + 1) AS gr_rand
+            (%s::date + (trunc(random()*%s)::int))::date AS ed,
+            (floor(random()*12)::int + 1) AS gr_rand,
+            (floor(random()*3)::int) AS r
           FROM maxv, counts, generate_series(1, %s)
         )
-        INSERT INTO "journal"(journal_id, student_id, teacher_id, subject_id, entry_date, grade, attendance_status)
+        INSERT INTO "journal"(journal_id, student_id, teacher_id, subject_id, entry_date, grade, {att_col})
         SELECT
           g.new_id,
           s.student_id,
           t.teacher_id,
           sb.subject_id,
           g.ed,
-          g.gr_rand,
-          'present'
+          CASE WHEN g.r = 1 THEN NULL ELSE g.gr_rand END,
+          {att_val}
         FROM gens g
         JOIN (SELECT row_number() OVER (ORDER BY student_id) AS idx, student_id FROM "student") s ON s.idx = g.s_idx
         JOIN (SELECT row_number() OVER (ORDER BY teacher_id) AS idx, teacher_id FROM "teacher") t ON t.idx = g.t_idx
@@ -457,64 +1108,85 @@ class Model:
 
         with self.conn.cursor() as cur:
             try:
-                cur.execute('SELECT COALESCE(MAX(journal_id), 0) AS m FROM "journal";')
-                old_m_row = cur.fetchone()
-                old_max = old_m_row["m"] if isinstance(old_m_row, dict) else old_m_row[0]
-
-                cur.execute(insert_q, (n,))
-                self.conn.commit()
-
-                update_q = """
-                WITH new_rows AS (
-                  SELECT journal_id, (floor(random()*3)::int) AS r
-                  FROM "journal"
-                  WHERE journal_id > %s
-                )
-                UPDATE "journal" j
-                SET attendance_status = CASE new_rows.r WHEN 0 THEN 'present' WHEN 1 THEN 'absent' ELSE 'late' END,
-                    grade = CASE WHEN new_rows.r = 1 THEN NULL ELSE j.grade END
-                FROM new_rows
-                WHERE j.journal_id = new_rows.journal_id;
-                """
-                cur.execute(update_q, (old_max,))
-                self.conn.commit()
+                cur.execute(insert_q, (GEN_JOURNAL_FROM, GEN_JOURNAL_DAYS, n))
+                self._commit()
+                return cur.rowcount
             except Exception:
                 try:
-                    self.conn.rollback()
+                    self._rollback()
                 except Exception:
                     pass
                 raise
 
-    # Складні запити — середній бал по предметах для класу
-    def complex_query_1(self, class_value):
-        q = """
-        SELECT sb.name AS subject, COUNT(j.journal_id) AS marks_count, AVG(j.grade) AS avg_grade
+    # Складні запити — середній бал по предметах для класу.
+    # partial — сума й кількість оцінок замість середнього (для злиття результатів шардів у sharding.py)
+    @read_only
+    @slow_logged
+    @retrying()
+    def complex_query_1(self, class_value, partial=False):
+        if self.compact_encoding():
+            class_filter = 's.class_id = (SELECT class_id FROM "school_class" WHERE name = %s)'
+        else:
+            class_filter = "s.class = %s"
+        if partial:
+            aggregates, order = "SUM(j.grade) AS grade_sum, COUNT(j.grade) AS grade_count", ""
+        else:
+            aggregates, order = "AVG(j.grade) AS avg_grade", "ORDER BY avg_grade DESC"
+        q = f"""
+        SELECT sb.name AS subject, COUNT(j.journal_id) AS marks_count, {aggregates}
         FROM "journal" j
         JOIN "subject" sb ON j.subject_id = sb.subject_id
         JOIN "student" s ON j.student_id = s.student_id
-        WHERE s.class = %s
+        WHERE {class_filter}
         GROUP BY sb.name
-        ORDER BY avg_grade DESC;
+        {order};
         """
         with self.conn.cursor() as cur:
             cur.execute(q, (class_value,))
             return cur.fetchall()
 
-    # Складні запити — кількість оцінок по вчителях за період
-    def complex_query_2(self, date_from, date_to):
-        q = """
+    # Складні запити — кількість оцінок по вчителях за період.
+    # partial — усі вчителі без LIMIT (для злиття результатів шардів у sharding.py)
+    @read_only
+    @slow_logged
+    @retrying()
+    def complex_query_2(self, date_from, date_to, partial=False):
+        top = "" if partial else "ORDER BY marks_count DESC LIMIT 50"
+        q = f"""
         SELECT t.first_name || ' ' || t.last_name AS teacher, COUNT(j.journal_id) AS marks_count
         FROM "journal" j
         JOIN "teacher" t ON j.teacher_id = t.teacher_id
         WHERE j.entry_date BETWEEN %s AND %s
-        GROUP BY teacher ORDER BY marks_count DESC LIMIT 50;
+        GROUP BY teacher {top};
         """
         with self.conn.cursor() as cur:
             cur.execute(q, (date_from, date_to))
             return cur.fetchall()
 
     # Складні запити — розподіл відвідуваності по класам для предмета
+    @read_only
+    @slow_logged
+    @retrying()
     def complex_query_3(self, subject_name):
+        if self.compact_encoding():
+            # групування за кодами, назви підставляються вже після агрегації
+            q = """
+            SELECT c.name AS class, a.status AS attendance_status, x.cnt
+            FROM (
+              SELECT s.class_id, j.attendance, COUNT(*) AS cnt
+              FROM "journal" j
+              JOIN "student" s ON j.student_id = s.student_id
+              JOIN "subject" sb ON j.subject_id = sb.subject_id
+              WHERE sb.name = %s
+              GROUP BY s.class_id, j.attendance
+            ) x
+            JOIN "school_class" c ON c.class_id = x.class_id
+            JOIN "attendance_code" a ON a.code = x.attendance
+            ORDER BY c.name, a.status;
+            """
+            with self.conn.cursor() as cur:
+                cur.execute(q, (subject_name,))
+                return cur.fetchall()
         q = """
         SELECT s.class, j.attendance_status, COUNT(*) AS cnt
         FROM "journal" j
@@ -526,4 +1198,362 @@ class Model:
         """
         with self.conn.cursor() as cur:
             cur.execute(q, (subject_name,))
-            return cur.fetchall()
\ No newline at end of file
+            return cur.fetchall()
+
+    # Потокове читання через серверний курсор (пачками по batch_size рядків-кортежів)
+    def iter_batches(self, q, params=None, batch_size=10000, name="stream"):
+        from psycopg.rows import tuple_row
+
+        try:
+            with self.conn.cursor(name=name, row_factory=tuple_row) as cur:
+                cur.itersize = batch_size
+                cur.execute(q, params)
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+        finally:
+            # серверний курсор живе в транзакції — завершити її
+            self._rollback()
+
+    # Вивантаження journal разом із student/teacher/subject (один послідовний прохід).
+    # order_by — стовпці результату (JOURNAL_EXPORT_COLUMNS), за якими впорядкувати рядки (ключі партицій export.py)
+    def iter_journal_export(self, batch_size=10000, order_by=()):
+        for col in order_by:
+            if col not in JOURNAL_EXPORT_COLUMNS:
+                raise ValueError(f"Невідомий стовпець: {col}")
+        # за номерами стовпців: імена результату збігаються з JOURNAL_EXPORT_COLUMNS не всюди
+        order = "ORDER BY " + ", ".join(str(JOURNAL_EXPORT_COLUMNS.index(c) + 1) for c in order_by) if order_by else ""
+        q = f"""
+        SELECT j.journal_id, j.entry_date, EXTRACT(YEAR FROM j.entry_date)::int AS year, s.class,
+               j.student_id, s.first_name, s.last_name,
+               j.teacher_id, t.first_name || ' ' || t.last_name,
+               j.subject_id, sb.name,
+               j.grade, j.attendance_status
+        FROM "{self.read_relation('journal')}" j
+        JOIN "{self.read_relation('student')}" s ON j.student_id = s.student_id
+        JOIN "teacher" t ON j.teacher_id = t.teacher_id
+        JOIN "subject" sb ON j.subject_id = sb.subject_id
+        {order};
+        """
+        return self.iter_batches(q, batch_size=batch_size, name="export_journal")
+
+    # Вивантаження всієї таблиці (для таблиць-вимірів)
+    def iter_table(self, table, batch_size=10000):
+        self._validate_table(table)
+        cols = self._get_columns_list(table)
+        col_list = ", ".join(f'"{c}"' for c in cols)
+        q = f'SELECT {col_list} FROM "{self.read_relation(table)}" ORDER BY 1;'
+        return cols, self.iter_batches(q, batch_size=batch_size, name=f"export_{table}")
+
+    # Позначка журналу змін journal_changes (міграції 001, 009): xmin поточного знімка БД.
+    # Транзакції з меншим xid уже завершені, тож усе, чого знімок ще не бачив, має txid >= позначки
+    @retrying()
+    def journal_change_mark(self):
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "SELECT EXISTS (SELECT 1 FROM pg_attribute WHERE attrelid = to_regclass('public.journal_changes') "
+                "AND attname = 'txid' AND NOT attisdropped) AS ok;"
+            )
+            if not cur.fetchone()["ok"]:
+                self._rollback()
+                raise RuntimeError("Немає journal_changes.txid — застосуйте міграції (python main.py migrate).")
+            cur.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint AS mark;")
+            mark = cur.fetchone()["mark"]
+        self._rollback()
+        return mark
+
+    # journal_id рядків, вставлених, змінених або видалених транзакціями з xid >= since
+    @retrying()
+    def changed_journal_ids(self, since):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT DISTINCT journal_id FROM journal_changes WHERE txid >= %s::text::xid8;", (since,))
+            ids = [r["journal_id"] for r in cur.fetchall()]
+        self._rollback()
+        return ids
+
+    # Очищення журналу змін, уже врахованого знімком з позначкою upto (коли всі знімки синхронізовані)
+    @retrying()
+    def prune_journal_changes(self, upto):
+        with self.conn.cursor() as cur:
+            cur.execute("DELETE FROM journal_changes WHERE txid < %s::text::xid8;", (upto,))
+            deleted = cur.rowcount
+        self._commit()
+        return deleted
+
+    # Чи партиціонована journal (міграція 002); визначається один раз на з'єднання
+    def journal_is_partitioned(self):
+        if self._journal_partitioned is None:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT relkind FROM pg_class WHERE oid = 'public.journal'::regclass;")
+                self._journal_partitioned = cur.fetchone()["relkind"] == "p"
+            self._commit()
+        return self._journal_partitioned
+
+    # Створити річні партиції journal для діапазону дат (відомі роки кешуються — без зайвих запитів)
+    @retrying()
+    def ensure_journal_partitions(self, date_from, date_to):
+        if not self.journal_is_partitioned():
+            return 0
+        years = set(range(_year_of(date_from), _year_of(date_to) + 1))
+        METRICS.cache_access("journal_partitions", years <= self._journal_years)
+        if years <= self._journal_years:
+            return 0
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT journal_ensure_partitions(%s::date, %s::date) AS created;", (date_from, date_to))
+            created = cur.fetchone()["created"]
+        self._commit()
+        self._journal_years |= years
+        return created
+
+    # Наперед створити партиції до кінця поточного року + years_ahead
+    def ensure_future_journal_partitions(self, years_ahead=1):
+        today = date.today()
+        return self.ensure_journal_partitions(today, date(today.year + years_ahead, 12, 31))
+
+    # Список партицій journal з межами та кількістю рядків
+    @read_only
+    @retrying()
+    def journal_partitions(self):
+        q = """
+        SELECT c.relname AS partition,
+               pg_get_expr(c.relpartbound, c.oid) AS bounds,
+               (SELECT COUNT(*) FROM "journal" j WHERE j.tableoid = c.oid) AS rows
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'public.journal'::regclass
+        ORDER BY c.relname;
+        """
+        with self.conn.cursor() as cur:
+            cur.execute(q)
+            rows = cur.fetchall()
+        self._commit()
+        return rows
+
+    # Від'єднати рік від journal (дані лишаються в окремій таблиці; archive=True — перенести в схему archive)
+    @retrying(idempotent=False)
+    def detach_journal_year(self, year, archive=False):
+        name = f"journal_y{int(year)}"
+        with self.conn.cursor() as cur:
+            try:
+                cur.execute("SELECT to_regclass('public.journal_changes') IS NOT NULL AS ok;")
+                if cur.fetchone()["ok"]:
+                    # для локальних знімків від'єднані рядки — видалені
+                    cur.execute(f'INSERT INTO journal_changes(journal_id, op) SELECT journal_id, \'D\' FROM "{name}";')
+                cur.execute("SELECT to_regclass('public.report_card_summary') IS NOT NULL AS ok;")
+                if cur.fetchone()["ok"]:
+                    # партиція = рік, тож підсумки року просто прибираються (тригери на DETACH не спрацьовують)
+                    cur.execute(
+                        "DELETE FROM report_card_summary WHERE month >= %s AND month < %s;",
+                        (date(int(year), 1, 1), date(int(year) + 1, 1, 1)),
+                    )
+                cur.execute(f'ALTER TABLE "journal" DETACH PARTITION "{name}";')
+                if archive:
+                    cur.execute(f'ALTER TABLE "{name}" SET SCHEMA archive;')
+                self._commit()
+            except Exception:
+                self._rollback()
+                raise
+        self._journal_years.discard(int(year))
+        return f"archive.{name}" if archive else name
+
+    # Повернути від'єднаний (або архівний) рік у journal
+    @retrying(idempotent=False)
+    def attach_journal_year(self, year):
+        y = int(year)
+        name = f"journal_y{y}"
+        with self.conn.cursor() as cur:
+            try:
+                cur.execute("SELECT to_regclass(%s) IS NOT NULL AS ok;", (f"archive.{name}",))
+                if cur.fetchone()["ok"]:
+                    cur.execute(f'ALTER TABLE archive."{name}" SET SCHEMA public;')
+                # DDL не приймає параметрів — межі підставляються як літерали (рік уже int)
+                cur.execute(
+                    f'ALTER TABLE "journal" ATTACH PARTITION "{name}" '
+                    f"FOR VALUES FROM ('{date(y, 1, 1)}') TO ('{date(y + 1, 1, 1)}');"
+                )
+                cur.execute("SELECT to_regclass('public.journal_changes') IS NOT NULL AS ok;")
+                if cur.fetchone()["ok"]:
+                    cur.execute(f'INSERT INTO journal_changes(journal_id, op) SELECT journal_id, \'U\' FROM "{name}";')
+                cur.execute("SELECT to_regclass('public.report_card_summary') IS NOT NULL AS ok;")
+                if cur.fetchone()["ok"]:
+                    present, absent, late = self._attendance_conditions()
+                    cur.execute(f"""
+                        INSERT INTO report_card_summary
+                        SELECT student_id, subject_id, date_trunc('month', entry_date)::date,
+                               COUNT(*), COUNT(grade), COALESCE(SUM(grade), 0),
+                               COUNT(*) FILTER (WHERE {present}),
+                               COUNT(*) FILTER (WHERE {absent}),
+                               COUNT(*) FILTER (WHERE {late})
+                        FROM "{name}"
+                        GROUP BY 1, 2, 3;
+                    """)
+                self._commit()
+            except Exception:
+                self._rollback()
+                raise
+        self._journal_years.add(y)
+        return name
+
+    # Табелі успішності (міграція 004): по кожному учню і предмету — кількість записів, середній бал,
+    # відвідуваність за період [date_from, date_to]. Повні місяці беруться з report_card_summary,
+    # неповні місяці на краях періоду — з journal через покривний індекс (student_id, entry_date).
+    # Фільтр: клас (class_value) або окремий учень (student_id). Схема — компактна (міграції 003 і 004)
+    @read_only
+    @retrying()
+    def report_cards(self, date_from, date_to, class_value=None, student_id=None):
+        from psycopg import errors
+
+        if class_value is None and student_id is None:
+            raise ValidationError("Потрібен клас або student_id.")
+        if not self.compact_encoding():
+            raise RuntimeError(
+                "Табелі потребують міграцій 003 і 004 (компактне кодування і report_card_summary) — "
+                "застосуйте міграції (python main.py migrate)."
+            )
+        if student_id is not None:
+            students = "SELECT %(student_id)s::int AS student_id"
+        else:
+            students = """
+            SELECT st.student_id FROM "student" st
+            WHERE st.class_id = (SELECT class_id FROM "school_class" WHERE name = %(class_value)s)
+            """
+        present, absent, late = self._attendance_conditions("j.")
+        q = f"""
+        WITH bounds AS (
+          SELECT d1, d2,
+                 -- повні місяці періоду: [m1, m2)
+                 CASE WHEN date_trunc('month', d1) = d1 THEN d1
+                      ELSE (date_trunc('month', d1) + interval '1 month')::date END AS m1,
+                 date_trunc('month', d2 + 1)::date AS m2
+          FROM (SELECT %(date_from)s::date AS d1, %(date_to)s::date AS d2) p
+        ), students AS ({students}
+        ), parts AS (
+          SELECT r.student_id, r.subject_id, r.marks_count, r.graded_count, r.grade_sum,
+                 r.present_count, r.absent_count, r.late_count
+          FROM "report_card_summary" r, bounds b
+          WHERE r.student_id IN (SELECT student_id FROM students)
+            AND r.month >= b.m1 AND r.month < b.m2
+          UNION ALL
+          SELECT j.student_id, j.subject_id, 1, (j.grade IS NOT NULL)::int, COALESCE(j.grade, 0),
+                 ({present})::int, ({absent})::int, ({late})::int
+          FROM "journal" j, bounds b
+          WHERE j.student_id IN (SELECT student_id FROM students)
+            AND j.entry_date BETWEEN b.d1 AND b.d2
+            AND (j.entry_date < b.m1 OR j.entry_date >= b.m2)
+        )
+        SELECT st.student_id, st.first_name, st.last_name, sb.name AS subject,
+               SUM(p.marks_count) AS marks_count,
+               ROUND(SUM(p.grade_sum)::numeric / NULLIF(SUM(p.graded_count), 0), 2) AS avg_grade,
+               SUM(p.present_count) AS present, SUM(p.absent_count) AS absent, SUM(p.late_count) AS late,
+               ROUND((SUM(p.present_count) + SUM(p.late_count))::numeric / SUM(p.marks_count), 3) AS attendance_ratio
+        FROM parts p
+        JOIN "student" st ON st.student_id = p.student_id
+        JOIN "subject" sb ON sb.subject_id = p.subject_id
+        GROUP BY st.student_id, st.first_name, st.last_name, sb.name
+        HAVING SUM(p.marks_count) > 0
+        ORDER BY st.last_name, st.first_name, st.student_id, sb.name;
+        """
+        params = {"date_from": date_from, "date_to": date_to, "class_value": class_value, "student_id": student_id}
+        with self.conn.cursor() as cur:
+            try:
+                cur.execute(q, params)
+            except errors.UndefinedTable:
+                self._rollback()
+                raise RuntimeError("Немає report_card_summary (міграція 004) — застосуйте міграції (python main.py migrate).")
+            rows = cur.fetchall()
+        self._commit()
+        return rows
+
+    # Встановлений варіант тригера-охоронця journal (міграція 005): 'row', 'statement', 'none';
+    # None — міграцію не застосовано
+    @retrying()
+    def journal_guard_variant(self):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT to_regproc('public.journal_guard_variant') IS NOT NULL AS ok;")
+            if not cur.fetchone()["ok"]:
+                self._rollback()
+                return None
+            cur.execute("SELECT journal_guard_variant() AS variant;")
+            variant = cur.fetchone()["variant"]
+        self._commit()
+        return variant
+
+    # Встановити варіант тригера-охоронця (інші варіанти знімаються)
+    @retrying()
+    def install_journal_guard(self, variant):
+        if variant not in JOURNAL_GUARD_VARIANTS:
+            raise ValidationError(f"Невідомий варіант тригера: {variant}")
+        if self.journal_guard_variant() is None:
+            raise RuntimeError("Немає функцій тригера journal — застосуйте міграції (python main.py migrate).")
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT journal_guard_install(%s) AS variant;", (variant,))
+            installed = cur.fetchone()["variant"]
+        self._commit()
+        return installed
+
+# Клієнтський розподільник id: блоки з послідовності таблиці (Model.reserve_ids) видаються локально,
+# тож паралельні писачі не змагаються за ключі і не питають MAX(). Невикористані id блоку пропадають
+class IdAllocator:
+    def __init__(self, model, table, block_size=ID_BLOCK_SIZE):
+        if block_size < 1:
+            raise ValueError("block_size має бути додатним")
+        self.model = model
+        self.table = table
+        self.block_size = block_size
+        self._block = []
+        self._pos = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._pos >= len(self._block):
+            self._block = self.model.reserve_ids(self.table, self.block_size)
+            self._pos = 0
+        value = self._block[self._pos]
+        self._pos += 1
+        return value
+
+    # n наступних id (блоки дорезервовуються за потреби)
+    def take(self, n):
+        return [next(self) for _ in range(n)]
+
+
+# Гістограми затримок публічних методів (metrics.py); без методів, що не звертаються до БД
+timed_methods(Model, exclude=("get_tables", "in_transaction", "enable_slow_log", "read_relation", "close",
+                              "id_sequence", "id_allocator"))
+# Відрізки трасування (tracing.py) для тих самих методів
+traced_methods(Model, exclude=("get_tables", "in_transaction", "enable_slow_log", "read_relation", "close",
+                               "id_sequence", "id_allocator"))
+
+# Моделі процесу — для метрики з'єднань (у RGR кожна модель має одне з'єднання, пулу немає)
+_models = weakref.WeakSet()
+
+
+def _connection_samples():
+    idle = in_use = 0
+    for model in list(_models):
+        conn = model._conn
+        if conn is None or conn.closed:
+            continue
+        if conn.info.transaction_status.name == "IDLE":
+            idle += 1
+        else:
+            in_use += 1
+    yield "db_pool_connections", {"model": "Model", "state": "idle"}, idle
+    yield "db_pool_connections", {"model": "Model", "state": "in_use"}, in_use
+
+
+METRICS.add_source(_connection_samples)
+
+
+# Рік дати (date або рядок 'YYYY-MM-DD')
+def _year_of(value):
+    if isinstance(value, date):
+        return value.year
+    try:
+        return int(str(value).strip()[:4])
+    except ValueError:
+        raise ValidationError(f"Некоректна дата: {value}")
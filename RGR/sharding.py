@@ -0,0 +1,204 @@
+import os
+
+import common_path  # noqa: F401 — корінь репозиторію в sys.path (пакет common)
+from common.instrumentation import STATEMENT_STATS
+from common.tracing import traced_methods
+from model import DB, Model
+
+# Шардування за школами: кожна школа живе в одній із кількох БД PostgreSQL з однаковою схемою (шардів).
+# ShardedModel — фасад над Model шардів: CRUD, генератори, транзакції й решта методів виконуються на шарді
+# вибраної школи (use_school / for_school), складні запити complex_query_* розсилаються на всі шарди
+# паралельно, а агрегати зливаються на клієнті (середнє — із сум і кількостей, топ-50 — після злиття);
+# так само search_people — top-k кожного шарду зводиться за score.
+# Школа -> шард: закріплення з DB_SHARD_MAP, інакше рандеву-хешування (найбільша вага crc32(школа|шард)):
+# новий шард забирає лише ~1/N шкіл, решта лишаються на місці. Місткість росте додаванням БД у кінець DB_SHARDS.
+# Налаштування: DB_SHARDS=host[:port][/dbname],... (користувач і пароль — з DB),
+# DB_SHARD_MAP=школа=індекс,... (індекс шарду в DB_SHARDS, з 0), DB_SCHOOL=школа за замовчуванням.
+
+SHARDS = os.getenv("DB_SHARDS", "")
+SHARD_MAP = os.getenv("DB_SHARD_MAP", "")
+SCHOOL = os.getenv("DB_SCHOOL")
+TOP_TEACHERS = 50
+
+
+# "host:port/db,host" -> параметри з'єднання кожного шарду на основі DB
+def parse_shards(value, db=DB):
+    shards = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        address, _, dbname = item.partition("/")
+        host, _, port = address.partition(":")
+        shards.append({**db, "host": host, "port": port or db["port"], "dbname": dbname or db["dbname"]})
+    return shards
+
+
+# "school=0,school2=1" -> {школа: індекс шарду}
+def parse_shard_map(value):
+    pins = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        school, sep, index = item.rpartition("=")
+        if not sep or not school.strip():
+            raise ValueError(f"Формат DB_SHARD_MAP: школа=індекс, отримано {item!r}")
+        pins[school.strip()] = int(index)
+    return pins
+
+
+def _shard_id(params):
+    return f"{params['host']}:{params['port']}/{params['dbname']}"
+
+
+class ShardedModel:
+    PK_MAP = Model.PK_MAP
+    statement_stats = STATEMENT_STATS
+
+    def __init__(self, shards, pins=None, school=None, **model_options):
+        if not shards:
+            raise ValueError("Не задано жодного шарду")
+        self.shards = shards
+        self.pins = dict(pins or {})
+        for school_key, index in self.pins.items():
+            if not 0 <= index < len(shards):
+                raise ValueError(f"Школа {school_key}: немає шарду з індексом {index}")
+        self._ids = [_shard_id(params) for params in shards]
+        self._model_options = model_options
+        self._models = {}
+        self.school = None
+        if school is not None:
+            self.use_school(school)
+
+    # Фасад з DB_SHARDS / DB_SHARD_MAP; None — шардування не налаштоване
+    @classmethod
+    def from_env(cls, school=SCHOOL, **model_options):
+        shards = parse_shards(SHARDS)
+        if not shards:
+            return None
+        return cls(shards, parse_shard_map(SHARD_MAP), school=school, **model_options)
+
+    # Індекс шарду школи
+    def shard_of(self, school):
+        import zlib
+
+        school = str(school)
+        if school in self.pins:
+            return self.pins[school]
+        weights = [zlib.crc32(f"{school}|{shard_id}".encode()) for shard_id in self._ids]
+        return weights.index(max(weights))
+
+    # Model шарду (з'єднання відкривається при першій операції)
+    def shard(self, index):
+        model = self._models.get(index)
+        if model is None:
+            model = self._models[index] = Model(db=self.shards[index], **self._model_options)
+        return model
+
+    def for_school(self, school):
+        return self.shard(self.shard_of(school))
+
+    # Школа, на шард якої йдуть наступні виклики методів Model.
+    # Транзакція не охоплює кілька шардів — перемикання на інший шард усередині transaction() заборонене
+    def use_school(self, school):
+        school = None if school is None else str(school)
+        if self.school is not None and school != self.school:
+            index = self.shard_of(self.school)
+            if index in self._models and self._models[index].in_transaction() and (
+                school is None or self.shard_of(school) != index
+            ):
+                raise ValueError(f"Школа {school} на іншому шарді, а транзакція школи {self.school} не завершена")
+        self.school = school
+        return self
+
+    @property
+    def current(self):
+        if self.school is None:
+            raise ValueError("Не вибрано школу: шард визначається за школою (--school або use_school)")
+        return self.for_school(self.school)
+
+    # Решта методів і атрибутів Model — на шарді вибраної школи
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.current, name)
+
+    def get_tables(self):
+        return self.shard(0).get_tables()
+
+    # Виклик методу на всіх шардах паралельно (у кожного шарду своє з'єднання); результати в порядку шардів
+    def fan_out(self, method, *args, **kwargs):
+        models = [self.shard(index) for index in range(len(self.shards))]
+        if len(models) == 1:
+            return [getattr(models[0], method)(*args, **kwargs)]
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=len(models), thread_name_prefix="shard") as pool:
+            futures = [pool.submit(getattr(model, method), *args, **kwargs) for model in models]
+            return [future.result() for future in futures]
+
+    # Середній бал по предметах для класу: середнє з сум і кількостей оцінок усіх шардів
+    def complex_query_1(self, class_value):
+        from decimal import Decimal
+
+        merged = {}
+        for rows in self.fan_out("complex_query_1", class_value, partial=True):
+            for row in rows:
+                acc = merged.setdefault(row["subject"], [0, 0, 0])
+                acc[0] += row["marks_count"]
+                acc[1] += row["grade_sum"] or 0
+                acc[2] += row["grade_count"]
+        result = [
+            {
+                "subject": subject,
+                "marks_count": marks,
+                "avg_grade": Decimal(grade_sum) / grade_count if grade_count else None,
+            }
+            for subject, (marks, grade_sum, grade_count) in merged.items()
+        ]
+        # як ORDER BY avg_grade DESC: NULL спочатку
+        result.sort(key=lambda r: (r["avg_grade"] is None, r["avg_grade"] or 0), reverse=True)
+        return result
+
+    # Кількість оцінок по вчителях за період: шарди повертають усіх вчителів, топ — після злиття
+    def complex_query_2(self, date_from, date_to):
+        merged = {}
+        for rows in self.fan_out("complex_query_2", date_from, date_to, partial=True):
+            for row in rows:
+                merged[row["teacher"]] = merged.get(row["teacher"], 0) + row["marks_count"]
+        result = [{"teacher": teacher, "marks_count": count} for teacher, count in merged.items()]
+        result.sort(key=lambda r: r["marks_count"], reverse=True)
+        return result[:TOP_TEACHERS]
+
+    # Розподіл відвідуваності по класам для предмета: суми лічильників шардів
+    def complex_query_3(self, subject_name):
+        merged = {}
+        for rows in self.fan_out("complex_query_3", subject_name):
+            for row in rows:
+                key = (row["class"], row["attendance_status"])
+                merged[key] = merged.get(key, 0) + row["cnt"]
+        result = [
+            {"class": class_value, "attendance_status": status, "cnt": cnt}
+            for (class_value, status), cnt in merged.items()
+        ]
+        result.sort(key=lambda r: (r["class"] or "", r["attendance_status"] or ""))
+        return result
+
+    # Нечіткий пошук людей: top-k кожного шарду, зведені за score
+    def search_people(self, text, tables=None, limit=20, threshold=None):
+        results = self.fan_out("search_people", text, tables, limit, threshold)
+        rows = [row for shard_rows in results for row in shard_rows]
+        rows.sort(key=lambda r: -r["score"])
+        return rows[:limit]
+
+    def enable_slow_log(self, threshold_ms, path=None, analyze_writes=None):
+        for index in range(len(self.shards)):
+            self.shard(index).enable_slow_log(threshold_ms, path, analyze_writes)
+
+    def close(self):
+        for model in self._models.values():
+            model.close()
+
+
+traced_methods(ShardedModel, exclude=("shard_of", "shard", "for_school", "use_school", "get_tables", "close"))
@@ -0,0 +1,88 @@
+import os
+import sys
+
+# Модулі лабораторної імпортуються як верхньорівневі (model, export, ...), як у main.py.
+# Запуск: cd RGR && python -m pytest tests
+LAB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if LAB_DIR not in sys.path:
+    sys.path.insert(0, LAB_DIR)
+
+
+import datetime  # noqa: E402
+
+import pytest  # noqa: E402
+
+from migrate import MIGRATIONS_DIR, applied_migrations, apply_sql_file, list_migrations  # noqa: E402
+from model import DB, Model  # noqa: E402
+
+# Тимчасова БД з початковою схемою LR1 (electronic_journal.sql) і кількома рядками — для тестів міграцій і злиття.
+# Потрібен доступний сервер PostgreSQL з параметрами DB_* (model.DB) і правом CREATE DATABASE; інакше тести пропускаються
+SCHEMA_SQL = os.path.join(os.path.dirname(MIGRATIONS_DIR), "electronic_journal.sql")
+JOURNAL = [
+    (1, 1, 1, 1, datetime.date(2021, 9, 1), 10, "present"),
+    (2, 2, 1, 1, datetime.date(2021, 12, 31), None, "absent"),
+    (3, 1, 1, 2, datetime.date(2022, 1, 1), 7, "late"),
+    (4, 3, 1, 2, datetime.date(2022, 5, 20), 12, "present"),
+]
+STUDENTS = [
+    (1, 1, "Ivan", "Petrenko", datetime.date(2010, 1, 5), "5-A", "ivan@example.com"),
+    (2, 1, "Olha", "Petrenko", datetime.date(2011, 3, 7), "4-B", "olha@example.com"),
+    (3, 1, "Petro", "Koval", datetime.date(2010, 8, 1), "5-A", "petro@example.com"),
+]
+
+
+def admin_connect():
+    psycopg = pytest.importorskip("psycopg")
+    try:
+        return psycopg.connect(**DB, autocommit=True, connect_timeout=3)
+    except psycopg.OperationalError as e:
+        pytest.skip(f"PostgreSQL недоступний: {e}")
+
+
+@pytest.fixture
+def scratch_db():
+    import psycopg
+
+    name = f"rgr_test_{os.getpid()}"
+    with admin_connect() as admin:
+        admin.execute(f'DROP DATABASE IF EXISTS "{name}";')
+        admin.execute(f'CREATE DATABASE "{name}";')
+    params = {**DB, "dbname": name}
+    try:
+        with psycopg.connect(**params, autocommit=True) as conn:
+            with open(SCHEMA_SQL, encoding="utf-8") as f:
+                conn.execute(f.read())
+            conn.execute("INSERT INTO parents VALUES (1, 'Maria', 'Petrenko', '+380000000000', 'maria@example.com');")
+            conn.execute("INSERT INTO teacher VALUES (1, 'Olena', 'Shevchenko', 'olena@example.com');")
+            conn.execute("INSERT INTO subject VALUES (1, 'Math'), (2, 'History');")
+            with conn.cursor() as cur:
+                cur.executemany("INSERT INTO student VALUES (%s, %s, %s, %s, %s, %s, %s);", STUDENTS)
+                cur.executemany("INSERT INTO journal VALUES (%s, %s, %s, %s, %s, %s, %s);", JOURNAL)
+        yield params
+    finally:
+        with admin_connect() as admin:
+            admin.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE);')
+
+
+@pytest.fixture
+def scratch_model(scratch_db):
+    m = Model(db=scratch_db)
+    yield m
+    m.close()
+
+
+# Застосувати вибрані міграції за номерами (без решти ланцюжка, напр. 006 потребує pg_trgm)
+def apply_versions(model, *versions):
+    applied_migrations(model.conn)
+    for version, stem, path in list_migrations():
+        if version in versions:
+            apply_sql_file(model.conn, path, f"migration/{stem}", version)
+
+
+# Рядки запиту як кортежі (транзакція читання завершується)
+def fetch(model, q):
+    with model.conn.cursor() as cur:
+        cur.execute(q)
+        rows = cur.fetchall()
+    model.conn.rollback()
+    return [tuple(r.values()) for r in rows]
@@ -0,0 +1,123 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from analytics import JournalAnalytics  # noqa: E402
+
+STUDENTS = [(1, "5-A"), (2, "6-B")]
+TEACHERS = [(1, "Olena Shevchenko")]
+SUBJECTS = [(1, "Math"), (2, "History")]
+
+
+# journal_id, student_id, teacher_id, subject_id, день від 1970-01-01, оцінка (0 — NULL), код відвідуваності
+def journal_row(journal_id, grade=10, student_id=1, subject_id=1):
+    return (journal_id, student_id, 1, subject_id, 19000 + journal_id, grade, 0)
+
+
+# Модель-замінник: журнал змін із xid транзакцій, видимий після фіксації, як journal_changes (міграції 001, 009)
+class FakeModel:
+    def __init__(self, rows):
+        self.rows = {r[0]: r for r in rows}
+        self.changes = []
+        self.next_txid = 100
+        self.open = {}
+
+    def begin(self):
+        txid = self.next_txid
+        self.next_txid += 1
+        self.open[txid] = []
+        return txid
+
+    def write(self, txid, journal_id, row=None):
+        self.open[txid].append((journal_id, row))
+
+    def commit(self, txid):
+        for journal_id, row in self.open.pop(txid):
+            if row is None:
+                self.rows.pop(journal_id, None)
+            else:
+                self.rows[journal_id] = row
+            self.changes.append((txid, journal_id))
+
+    def compact_encoding(self):
+        return False
+
+    def read_relation(self, table):
+        return table
+
+    # xmin знімка: найстаріша незавершена транзакція
+    def journal_change_mark(self):
+        return min(self.open, default=self.next_txid)
+
+    def changed_journal_ids(self, since):
+        return sorted({journal_id for txid, journal_id in self.changes if txid >= since})
+
+    def iter_batches(self, q, params=None, batch_size=10000, name="stream"):
+        if name == "analytics_journal":
+            ids = self.changed_journal_ids(params[0]) if params else self.rows
+            rows = [self.rows[i] for i in sorted(ids) if i in self.rows]
+        else:
+            rows = {"analytics_student": STUDENTS, "analytics_teacher": TEACHERS,
+                    "analytics_subject": SUBJECTS}[name]
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+
+def test_sync_applies_inserts_updates_and_deletes():
+    model = FakeModel([journal_row(1), journal_row(2), journal_row(3)])
+    late = model.begin()
+    other = model.begin()
+    model.write(other, 10, journal_row(10))
+    model.commit(other)
+    analytics = JournalAnalytics().load(model, track_changes=True)
+    assert analytics.journal_id.tolist() == [1, 2, 3, 10]
+
+    # транзакція, що почалася до знімка, фіксує менший journal_id пізніше
+    model.write(late, 4, journal_row(4))
+    model.commit(late)
+    tx = model.begin()
+    model.write(tx, 2, journal_row(2, grade=5))
+    model.write(tx, 3)
+    model.commit(tx)
+
+    stats = analytics.sync(model)
+    assert analytics.journal_id.tolist() == [1, 2, 4, 10]
+    assert analytics.grade.tolist() == [10, 5, 10, 10]
+    assert stats == {"changed": 4, "fetched": 3, "rows_before": 4, "rows": 4}
+
+    assert analytics.sync(model)["changed"] == 0
+    assert analytics.journal_id.tolist() == [1, 2, 4, 10]
+
+
+def test_sync_matches_full_reload():
+    model = FakeModel([journal_row(i, grade=i % 12, subject_id=1 + i % 2) for i in range(1, 50)])
+    analytics = JournalAnalytics().load(model, track_changes=True)
+    tx = model.begin()
+    for i in range(1, 50, 7):
+        model.write(tx, i)
+    for i in range(60, 65):
+        model.write(tx, i, journal_row(i, grade=12, student_id=2))
+    model.commit(tx)
+    analytics.sync(model)
+    fresh = JournalAnalytics().load(model)
+    assert analytics.journal_id.tolist() == fresh.journal_id.tolist()
+    assert analytics.complex_query_1("5-A") == fresh.complex_query_1("5-A")
+    assert analytics.complex_query_3("Math") == fresh.complex_query_3("Math")
+
+
+def test_saved_snapshot_keeps_change_mark(tmp_path):
+    model = FakeModel([journal_row(1)])
+    path = tmp_path / "journal.npz"
+    JournalAnalytics().load(model, track_changes=True).save(path)
+    tx = model.begin()
+    model.write(tx, 2, journal_row(2))
+    model.commit(tx)
+    analytics = JournalAnalytics.open(path, model)
+    assert analytics.sync(model)["fetched"] == 1
+    assert analytics.journal_id.tolist() == [1, 2]
+
+
+def test_sync_requires_tracked_load():
+    analytics = JournalAnalytics().load(FakeModel([journal_row(1)]))
+    with pytest.raises(RuntimeError):
+        analytics.sync(FakeModel([]))
@@ -0,0 +1,55 @@
+import cli
+
+
+class FakeModel:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeView:
+    def __init__(self):
+        self.messages = []
+
+    def show_message(self, msg):
+        self.messages.append(msg)
+
+
+class FakeController:
+    def __init__(self, view=None):
+        self.model = FakeModel()
+        self.view = FakeView()
+
+
+def run_main(monkeypatch, dispatch, argv):
+    controllers = []
+
+    def make_controller(view=None):
+        controllers.append(FakeController(view))
+        return controllers[-1]
+
+    monkeypatch.setattr(cli, "Controller", make_controller)
+    monkeypatch.setattr(cli, "dispatch", dispatch)
+    return cli.main(argv), controllers[0]
+
+
+def test_single_command_error_is_reported_with_exit_code(monkeypatch):
+    def dispatch(controller, args):
+        raise RuntimeError('extension "pg_trgm" is not available')
+
+    code, controller = run_main(monkeypatch, dispatch, ["migrate"])
+    assert code == 1
+    assert controller.view.messages == ['Помилка: extension "pg_trgm" is not available']
+    assert controller.model.closed
+
+
+def test_single_command_result_sets_exit_code(monkeypatch):
+    code, _ = run_main(monkeypatch, lambda controller, args: True, ["tables"])
+    assert code == 0
+    code, _ = run_main(monkeypatch, lambda controller, args: False, ["tables"])
+    assert code == 1
+
+
+def test_arrow_batch_is_rejected():
+    assert cli.main(["--format", "arrow", "batch"]) == 2
@@ -0,0 +1,70 @@
+import datetime
+import os
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from export import export_journal, export_table  # noqa: E402
+from model import JOURNAL_EXPORT_COLUMNS  # noqa: E402
+
+
+def journal_row(journal_id, year, cls):
+    return (journal_id, datetime.date(year, 3, 1), year, cls, 1, "Ivan", "Petrenko",
+            2, "Olena Shevchenko", 3, "Math", 10, "present")
+
+
+# Модель-замінник: потік рядків journal пачками, упорядкований за ключами партиції, як у БД
+class FakeModel:
+    def __init__(self, rows, sort=True):
+        self.rows = rows
+        self.sort = sort
+        self.order_by = None
+
+    def iter_journal_export(self, batch_size=10000, order_by=()):
+        self.order_by = order_by
+        idx = [JOURNAL_EXPORT_COLUMNS.index(k) for k in order_by]
+        rows = sorted(self.rows, key=lambda r: [r[i] for i in idx]) if self.sort else self.rows
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+    def iter_table(self, table, batch_size=10000):
+        cols = ["student_id", "parents_id", "class"]
+        rows = [(1, None, "5A"), (2, None, "5A"), (3, 7, "6B")]
+        return cols, (rows[i:i + batch_size] for i in range(0, len(rows), batch_size))
+
+    def get_columns(self, table):
+        return [
+            {"column_name": "student_id", "data_type": "integer", "is_nullable": "NO"},
+            {"column_name": "parents_id", "data_type": "integer", "is_nullable": "YES"},
+            {"column_name": "class", "data_type": "character varying", "is_nullable": "NO"},
+        ]
+
+
+def test_partitions_get_large_row_groups(tmp_path):
+    # пачки по 100 рядків, у кожній — рядки кількох партицій упереміш
+    rows = [journal_row(i, 2020 + i % 2, "5A" if i % 3 else "6B") for i in range(600)]
+    model = FakeModel(rows)
+    stats = export_journal(model, str(tmp_path), batch_size=100)
+
+    assert model.order_by == ("year", "class")
+    assert stats == {"journal": 600, "partitions": 4}
+    path = os.path.join(tmp_path, "journal", "year=2020", "class=5A", "part-0.parquet")
+    meta = pq.ParquetFile(path).metadata
+    assert meta.num_rows == 200
+    assert [meta.row_group(i).num_rows for i in range(meta.num_row_groups)] == [100, 100]
+
+
+def test_unordered_partitions_are_rejected(tmp_path):
+    rows = [journal_row(1, 2020, "5A"), journal_row(2, 2021, "5A"), journal_row(3, 2020, "5A")]
+    with pytest.raises(RuntimeError):
+        export_journal(FakeModel(rows, sort=False), str(tmp_path), batch_size=10)
+
+
+def test_table_schema_comes_from_column_types(tmp_path):
+    # parents_id — NULL у всій першій пачці
+    assert export_table(FakeModel([]), "student", str(tmp_path), batch_size=2) == 3
+    table = pq.read_table(os.path.join(tmp_path, "student.parquet"))
+    assert table.schema.field("parents_id").type == pa.int32()
+    assert table.column("parents_id").to_pylist() == [None, None, 7]
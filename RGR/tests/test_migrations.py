@@ -0,0 +1,63 @@
+import pytest
+
+from conftest import JOURNAL, STUDENTS, apply_versions, fetch
+from migrate import apply_migrations
+
+# Міграції на тимчасовій БД з початковою схемою LR1 (фікстура scratch_db у conftest.py)
+
+
+def test_partitioning_keeps_rows(scratch_model):
+    assert apply_migrations(scratch_model, target=2) == ["001_journal_changes", "002_journal_partitioning"]
+
+    # 002: journal партиціонована за роками, рядки розкладено по партиціях
+    assert fetch(scratch_model, "SELECT relkind FROM pg_class WHERE oid = 'public.journal'::regclass;") == [("p",)]
+    partitions = dict(fetch(scratch_model, "SELECT tableoid::regclass::text, count(*) FROM journal GROUP BY 1;"))
+    assert partitions == {"journal_y2021": 2, "journal_y2022": 2}
+    assert fetch(scratch_model, "SELECT * FROM journal ORDER BY journal_id;") == JOURNAL
+
+
+def test_compact_encoding_keeps_rows(scratch_model):
+    assert apply_migrations(scratch_model, target=3)[-1] == "003_compact_encoding"
+
+    # 003: attendance — smallint-код, class — class_id; представлення повертають початкові рядки
+    columns = fetch(scratch_model, "SELECT table_name, column_name, data_type FROM information_schema.columns "
+                           "WHERE table_name IN ('journal', 'student') AND column_name IN "
+                           "('attendance', 'attendance_status', 'class', 'class_id') ORDER BY 1, 2;")
+    assert columns == [("journal", "attendance", "smallint"), ("student", "class_id", "smallint")]
+    assert scratch_model.compact_encoding()
+    assert fetch(scratch_model, "SELECT * FROM journal_decoded ORDER BY journal_id;") == JOURNAL
+    assert fetch(scratch_model, "SELECT * FROM student_decoded ORDER BY student_id;") == STUDENTS
+    assert fetch(scratch_model, "SELECT journal_id, attendance FROM journal ORDER BY 1;") == [(1, 0), (2, 1), (3, 2), (4, 0)]
+
+
+def test_applied_migrations_are_skipped(scratch_model):
+    apply_migrations(scratch_model, target=2)
+    assert apply_migrations(scratch_model, target=2) == []
+    assert fetch(scratch_model, "SELECT count(*) FROM journal;") == [(len(JOURNAL),)]
+
+
+# 005 лише створює функції охоронця: без тригера до міграції — none, а тригер зі звіту ЛР2 лишається (row)
+def test_journal_guard_migration_keeps_effective_variant(scratch_model):
+    apply_versions(scratch_model, 5)
+    assert scratch_model.journal_guard_variant() == "none"
+
+    with scratch_model.conn.cursor() as cur:
+        cur.execute("CREATE TRIGGER trg_journal_before_ud BEFORE UPDATE OR DELETE ON journal "
+                    "FOR EACH ROW EXECUTE FUNCTION journal_before_update_delete();")
+    scratch_model.conn.commit()
+    # повторне застосування (як на БД, де охоронець ЛР2 вже стоїть) тригер не чіпає
+    apply_versions(scratch_model, 5)
+    assert scratch_model.journal_guard_variant() == "row"
+
+
+# Табелі (004) потребують компактного кодування (003): на початковій схемі — помилка з назвами міграцій
+def test_report_cards_require_compact_encoding(scratch_model):
+    with pytest.raises(RuntimeError, match="003 і 004"):
+        scratch_model.report_cards("2021-09-01", "2022-06-30", class_value="5-A")
+
+    apply_versions(scratch_model, 3, 4)
+    scratch_model.close()  # кодування БД кешується до перепідключення
+    rows = scratch_model.report_cards("2021-09-01", "2022-06-30", class_value="5-A")
+    assert [(r["student_id"], r["subject"], r["marks_count"], r["absent"]) for r in rows] == [
+        (3, "History", 1, 0), (1, "History", 1, 0), (1, "Math", 1, 0),
+    ]
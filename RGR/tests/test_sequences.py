@@ -0,0 +1,85 @@
+import threading
+
+from conftest import apply_versions, fetch
+from model import Model
+
+SEQ = "public.journal_journal_id_seq"
+
+
+# З'єднання-замінник: послідовність із наступним значенням next_value; лічить запити до послідовності і замки
+class FakeConnection:
+    def __init__(self, next_value):
+        self.next_value = next_value
+        self.queries = 0
+        self.locks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params):
+        if "pg_advisory_xact_lock" in query:
+            self.conn.locks += 1
+            return
+        # читання й setval — лише під замком послідовності
+        assert self.conn.locks == self.conn.queries + 1
+        value = params[0]
+        self.conn.queries += 1
+        self.conn.next_value = max(self.conn.next_value, value + 1)
+
+    def fetchone(self):
+        return {"next": self.conn.next_value}
+
+
+def model_with_sequence(next_value):
+    model = Model()
+    model._conn = FakeConnection(next_value)
+    return model
+
+
+def test_explicit_ids_below_known_floor_skip_the_query():
+    model = model_with_sequence(100)
+    for value in (5, 6, 50):
+        model._advance_sequence(SEQ, value)
+    assert model._conn.queries == 1
+    assert model._sequence_floor[SEQ] == 100
+
+
+def test_id_at_floor_advances_sequence():
+    model = model_with_sequence(100)
+    model._advance_sequence(SEQ, 5)
+    model._advance_sequence(SEQ, 100)
+    model._advance_sequence(SEQ, 99)
+    assert model._conn.queries == 2
+    assert model._conn.next_value == model._sequence_floor[SEQ] == 101
+
+
+def test_advance_waits_for_concurrent_writer(scratch_model, scratch_db):
+    apply_versions(scratch_model, 7)
+    seq = scratch_model.id_sequence("journal")
+    other = Model(db=scratch_db)
+    try:
+        scratch_model._advance_sequence(seq, 200)
+        worker = threading.Thread(target=other._advance_sequence, args=(seq, 100))
+        worker.start()
+        # менший id чекає на замок послідовності, доки транзакція першого писача не завершиться
+        worker.join(0.5)
+        assert worker.is_alive()
+        scratch_model.conn.commit()
+        worker.join(5)
+        assert not worker.is_alive()
+        other.conn.commit()
+        assert other._sequence_floor[seq] == 201
+        assert fetch(scratch_model, f"SELECT nextval('{seq}') AS id;") == [(201,)]
+    finally:
+        other.close()
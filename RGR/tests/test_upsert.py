@@ -0,0 +1,52 @@
+import datetime
+
+import pytest
+
+from conftest import apply_versions, fetch
+
+
+def stats(rows=0, inserted=0, updated=0, unchanged=0, batches=0):
+    return {"rows": rows, "inserted": inserted, "updated": updated, "unchanged": unchanged, "batches": batches}
+
+
+def subjects(names):
+    return [{"subject_id": 10 + i, "name": name} for i, name in enumerate(names)]
+
+
+# Лічильники злиття в таблиці з послідовністю id (міграція 007): max(id) пачки просуває послідовність
+def test_upsert_stats_on_sequence_backed_table(scratch_model):
+    apply_versions(scratch_model, 7)
+    names = [f"Subject {i}" for i in range(10)]
+
+    assert scratch_model.upsert_many("subject", subjects(names), batch_size=4) == stats(10, 10, 0, 0, 3)
+    assert scratch_model.upsert_many("subject", subjects(names), batch_size=4) == stats(10, 0, 0, 10, 3)
+
+    names[2] = names[5] = "Renamed"
+    assert scratch_model.upsert_many("subject", subjects(names), batch_size=4) == stats(10, 0, 2, 8, 3)
+    assert fetch(scratch_model, "SELECT count(*) FROM subject WHERE name = 'Renamed';") == [(2,)]
+    # наступний серверний id — після найбільшого явного
+    assert scratch_model.insert_subject(None, "Physics") == 20
+
+
+def journal_rows(rows):
+    keys = ("journal_id", "student_id", "teacher_id", "subject_id", "entry_date", "grade", "attendance_status")
+    return [dict(zip(keys, row)) for row in rows]
+
+
+# Повторний імпорт journal з виправленою датою: рядок переноситься в партицію нової дати, а не падає на реєстрі.
+# Партиціонована journal (002) з реєстром id (008), у початковому і компактному (003) кодуванні
+@pytest.mark.parametrize("versions", [(1, 2, 7, 8), (1, 2, 3, 7, 8)], ids=["plain", "compact"])
+def test_upsert_moves_journal_row_to_corrected_date(scratch_model, versions):
+    apply_versions(scratch_model, *versions)
+    query = f'SELECT * FROM "{scratch_model.read_relation("journal")}" ORDER BY journal_id;'
+    rows = fetch(scratch_model, query)
+    corrected = list(rows)
+    corrected[1] = rows[1][:4] + (datetime.date(2023, 2, 1), 9, "late")
+
+    assert scratch_model.upsert_many("journal", journal_rows(corrected)) == stats(4, 0, 1, 3, 1)
+    assert fetch(scratch_model, query) == corrected
+    assert fetch(scratch_model, "SELECT tableoid::regclass::text FROM journal WHERE journal_id = 2;") == [
+        ("journal_y2023",)
+    ]
+    assert scratch_model.upsert_many("journal", journal_rows(corrected)) == stats(4, 0, 0, 4, 1)
+    assert fetch(scratch_model, "SELECT count(*) FROM journal_id_registry;") == [(4,)]
@@ -0,0 +1,98 @@
+import decimal
+import io
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from cli import main  # noqa: E402
+from model import ResultRow, ResultRows  # noqa: E402
+from writers import ArrowWriter, arrow_column  # noqa: E402
+
+
+# Рядки, як їх повертає модель: ResultRow з описом стовпців (ім'я, тип PostgreSQL, точність, масштаб)
+def result_rows(columns, values):
+    cls = type("ResultRow", (ResultRow,), {"__slots__": (), "columns": columns})
+    names = [c[0] for c in columns]
+    return [cls(zip(names, v)) for v in values]
+
+
+def read_stream(buf):
+    return pa.ipc.open_stream(buf.getvalue()).read_all()
+
+
+def test_schema_is_declared_from_columns():
+    columns = (("journal_id", "int4", None, None), ("grade", "int2", None, None), ("avg", "numeric", None, None))
+    # grade — NULL у всій першій пачці
+    rows = result_rows(columns, [(1, None, None), (2, None, decimal.Decimal("7.5")), (3, 11, None)])
+    buf = io.BytesIO()
+    assert ArrowWriter(buf, batch_size=2).write(rows) == 3
+
+    table = read_stream(buf)
+    assert table.schema.field("grade").type == pa.int16()
+    assert table.schema.field("avg").type == pa.decimal128(38, 18)
+    assert table.column("grade").to_pylist() == [None, None, 11]
+    assert table.column("avg").to_pylist() == [None, decimal.Decimal("7.5"), None]
+
+
+def test_empty_result_keeps_declared_schema():
+    columns = (("journal_id", "int4", None, None), ("entry_date", "date", None, None))
+    buf = io.BytesIO()
+    assert ArrowWriter(buf).write(ResultRows([], columns)) == 0
+
+    table = read_stream(buf)
+    assert table.schema.names == ["journal_id", "entry_date"]
+    assert table.schema.field("entry_date").type == pa.date32()
+    assert table.num_rows == 0
+
+
+def test_empty_result_from_model_keeps_columns(scratch_model):
+    rows = scratch_model.list_table("journal", limit=0)
+    assert rows == [] and rows.columns[0][:2] == ("journal_id", "int4")
+    buf = io.BytesIO()
+    ArrowWriter(buf).write(rows)
+    assert read_stream(buf).schema.names[:2] == ["journal_id", "student_id"]
+
+
+def test_plain_dict_rows_are_written_in_batches():
+    buf = io.BytesIO()
+    written_before_last = []
+
+    def rows():
+        for i in range(7):
+            if i == 6:
+                written_before_last.append(buf.tell())
+            yield {"a": None if i < 3 else i, "b": str(i)}
+
+    assert ArrowWriter(buf, batch_size=2).write(rows()) == 7
+    # пачки пишуться до того, як прочитано весь набір
+    assert written_before_last[0] > 0
+
+    reader = pa.ipc.open_stream(buf.getvalue())
+    batches = list(reader)
+    assert reader.schema.field("a").type == pa.int64()
+    assert [b.num_rows for b in batches] == [2, 2, 2, 1]
+    assert pa.Table.from_batches(batches).column("a").to_pylist() == [None, None, None, 3, 4, 5, 6]
+
+
+def test_second_result_set_is_rejected():
+    writer = ArrowWriter(io.BytesIO())
+    writer.write([{"a": 1}])
+    with pytest.raises(RuntimeError):
+        writer.write([{"a": 2}])
+
+
+def test_batch_with_arrow_is_rejected(capsys):
+    assert main(["--format", "arrow", "batch", "commands.txt"]) == 2
+    assert "arrow" in capsys.readouterr().err
+
+
+def test_numeric_precision_maps_to_decimal():
+    arrow_t, conv = arrow_column(pa, "numeric", 5, 2)
+    assert arrow_t == pa.decimal128(5, 2) and conv is None
+    arrow_t, conv = arrow_column(pa, "numeric")
+    assert arrow_t == pa.decimal128(38, 18)
+    assert conv(decimal.Decimal(1) / 3) == decimal.Decimal("0.333333333333333333")
+    assert conv(decimal.Decimal("12345678901234567890.5")) == decimal.Decimal("12345678901234567890.5")
+    assert conv(decimal.Decimal("NaN")) is None
+    assert arrow_column(pa, "uuid") == (pa.string(), str)
@@ -1,6 +1,16 @@
 import decimal
+import sys
+
+from writers import get_writer
 
 class View:
+    # fmt: "table" (текстова таблиця) або машинозчитуваний формат з writers.FORMATS;
+    # у машинних форматах повідомлення йдуть у stderr, щоб stdout містив лише дані
+    def __init__(self, fmt="table", stream=None):
+        self.fmt = fmt
+        self.stream = stream if stream is not None else sys.stdout
+        self.writer = None if fmt == "table" else get_writer(fmt, self.stream)
+
     def show_menu(self):
         print("\n================= МЕНЮ =================")
         print("1. Отримання імен таблиць БД")
@@ -13,7 +23,7 @@ class View:
         print("8. Оновлення даних у таблиці")
         print("9. Видалення даних з таблиці (по PK)")
         print("10. Видалення ВСІХ даних таблиці (delete all)")
-        print("11. Складні запити (3 варіанта)")
+        print("11. Складні запити (3 варіанта) і табелі успішності")
         print("12. Вихід")
         return input("Оберіть варіант: ").strip()
 
@@ -46,6 +56,11 @@ class View:
         return str(v)
 
     def show_rows(self, rows):
+        if self.writer is not None:
+            self.writer.write(rows)
+            return
+        if not isinstance(rows, (list, tuple)):
+            rows = list(rows)
         if not rows:
             print("Немає результатів.")
             return
@@ -76,4 +91,7 @@ class View:
                     print(self._format_value(r))
 
     def show_message(self, msg):
+        if self.writer is not None:
+            print(msg, file=sys.stderr)
+            return
         print(msg)
\ No newline at end of file
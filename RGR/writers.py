@@ -0,0 +1,274 @@
+import csv
+import datetime
+import decimal
+import itertools
+import json
+import math
+
+# Потокові машинозчитувані формати для View.show_rows: JSON Lines, CSV, Arrow IPC.
+# Рядки споживаються поступово (будь-який ітерабельний об'єкт dict/tuple),
+# значення кодуються за типом без втрат (Decimal, date, None), а не через _format_value.
+
+FORMATS = ("table", "jsonl", "csv", "arrow")
+
+
+def _json_float(v):
+    if math.isfinite(v):
+        return repr(v)
+    return "null"
+
+
+def _json_decimal(v):
+    if v.is_finite():
+        return str(v)
+    return "null"
+
+
+def _json_date(v):
+    return '"' + v.isoformat() + '"'
+
+
+# Кодувальники JSON за точним типом значення
+JSON_ENCODERS = {
+    type(None): lambda v: "null",
+    bool: lambda v: "true" if v else "false",
+    int: str,
+    float: _json_float,
+    decimal.Decimal: _json_decimal,
+    str: json.dumps,
+    datetime.date: _json_date,
+    datetime.datetime: _json_date,
+    datetime.time: _json_date,
+}
+
+
+def _csv_decimal(v):
+    return str(v) if v.is_finite() else ""
+
+
+def _csv_date(v):
+    return v.isoformat()
+
+
+# Кодувальники CSV (None -> порожнє поле)
+CSV_ENCODERS = {
+    type(None): lambda v: "",
+    bool: lambda v: "true" if v else "false",
+    int: str,
+    float: repr,
+    decimal.Decimal: _csv_decimal,
+    str: lambda v: v,
+    datetime.date: _csv_date,
+    datetime.datetime: _csv_date,
+    datetime.time: _csv_date,
+}
+
+
+# Типи PostgreSQL (назви з information_schema або pg_type) -> конструктор типу Arrow
+ARROW_TYPES = {
+    "smallint": "int16", "int2": "int16",
+    "integer": "int32", "int4": "int32",
+    "bigint": "int64", "int8": "int64",
+    "real": "float32", "float4": "float32",
+    "double precision": "float64", "float8": "float64",
+    "boolean": "bool_", "bool": "bool_",
+    "date": "date32",
+    "character varying": "string", "varchar": "string", "character": "string", "bpchar": "string",
+    "text": "string", "name": "string",
+}
+
+
+# numeric без точності (AVG, ROUND, ділення) пишеться як decimal128(38, 18): до 20 цифр цілої частини
+# і 18 після коми; значення округлюються до 18 знаків, NaN стає null
+UNCONSTRAINED_NUMERIC = (38, 18)
+_NUMERIC_CONTEXT = decimal.Context(prec=UNCONSTRAINED_NUMERIC[0])
+_NUMERIC_QUANTUM = decimal.Decimal(1).scaleb(-UNCONSTRAINED_NUMERIC[1])
+
+
+def _unconstrained_decimal(v):
+    if not v.is_finite():
+        return None
+    return v.quantize(_NUMERIC_QUANTUM, context=_NUMERIC_CONTEXT)
+
+
+# Тип Arrow стовпця PostgreSQL і перетворення значень перед записом (None — без перетворення).
+# Схема оголошується наперед, а не виводиться з першої пачки (стовпець, порожній у першій пачці, інакше стає
+# null і ламає наступні). numeric — завжди decimal без втрати точності (без точності — UNCONSTRAINED_NUMERIC);
+# невідомі типи — рядок через str()
+def arrow_column(pa, type_name, precision=None, scale=None):
+    if type_name in ARROW_TYPES:
+        return getattr(pa, ARROW_TYPES[type_name])(), None
+    if type_name == "numeric":
+        if precision:
+            decimal_type = pa.decimal128 if precision <= 38 else pa.decimal256
+            return decimal_type(precision, scale or 0), None
+        return pa.decimal128(*UNCONSTRAINED_NUMERIC), _unconstrained_decimal
+    if type_name in ("timestamp without time zone", "timestamp"):
+        return pa.timestamp("us"), None
+    if type_name in ("timestamp with time zone", "timestamptz"):
+        return pa.timestamp("us", tz="UTC"), None
+    if type_name in ("time without time zone", "time"):
+        return pa.time64("us"), None
+    return pa.string(), str
+
+
+# Перетворити значення рядків-списків за converters (None у списку — стовпець без перетворення)
+def convert_columns(columns, converters):
+    return [
+        col if conv is None else [None if v is None else conv(v) for v in col]
+        for col, conv in zip(columns, converters)
+    ]
+
+
+def _row_keys(row):
+    if isinstance(row, dict):
+        return list(row.keys())
+    return [f"c{i}" for i in range(len(row))]
+
+
+def _row_values(row):
+    if isinstance(row, dict):
+        return row.values()
+    return row
+
+
+# Ітерабельний rows порціями списків по size
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class JsonLinesWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, rows):
+        encoders = JSON_ENCODERS
+        prefixes = None
+        count = 0
+        for row in rows:
+            if prefixes is None:
+                # ключі кодуються один раз на набір результатів
+                prefixes = ["{" + json.dumps(k) + ":" for k in _row_keys(row)]
+                prefixes[1:] = ["," + p[1:] for p in prefixes[1:]]
+            parts = []
+            for prefix, v in zip(prefixes, _row_values(row)):
+                enc = encoders.get(type(v))
+                parts.append(prefix + (enc(v) if enc else json.dumps(str(v))))
+            self.stream.write("".join(parts) + ("}\n" if parts else "{}\n"))
+            count += 1
+        self.stream.flush()
+        return count
+
+
+class CsvWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, rows):
+        encoders = CSV_ENCODERS
+        writer = csv.writer(self.stream, lineterminator="\n")
+        header = None
+        count = 0
+        for row in rows:
+            if header is None:
+                header = _row_keys(row)
+                writer.writerow(header)
+            values = []
+            for v in _row_values(row):
+                enc = encoders.get(type(v))
+                values.append(enc(v) if enc else str(v))
+            writer.writerow(values)
+            count += 1
+        self.stream.flush()
+        return count
+
+
+# Arrow IPC: один потік (схема + пачки) на вихід, тож і один набір результатів — другий виклик write
+# дав би другий потік, який читачі не розберуть. Схема — з опису стовпців результату БД (model.ResultRows.columns
+# або ResultRow.columns), тож і порожній результат має свої стовпці. Для рядків, зібраних у Python, типи
+# виводяться з початку набору: рядки буферизуються, доки в кожному стовпці не трапиться значення (не менше
+# пачки), далі пишуться пачками без накопичення
+class ArrowWriter:
+    def __init__(self, stream, batch_size=10000):
+        # pyarrow — необов'язкова залежність, потрібна лише для цього формату
+        try:
+            import pyarrow
+        except ImportError:
+            raise RuntimeError("Для формату arrow потрібен пакет pyarrow (pip install pyarrow).")
+        self.pa = pyarrow
+        self.stream = getattr(stream, "buffer", stream)
+        self.batch_size = batch_size
+        self.written = False
+
+    def _declared(self, columns):
+        fields, converters = [], []
+        for name, type_name, precision, scale in columns:
+            arrow_t, conv = arrow_column(self.pa, type_name, precision, scale)
+            fields.append(self.pa.field(name, arrow_t))
+            converters.append(conv)
+        return self.pa.schema(fields), converters
+
+    def _batch(self, rows, schema, converters):
+        columns = convert_columns(list(zip(*(_row_values(r) for r in rows))), converters)
+        return self.pa.RecordBatch.from_arrays(
+            [self.pa.array(col, type=f.type) for col, f in zip(columns, schema)], schema=schema
+        )
+
+    def _write_declared(self, columns, rows):
+        schema, converters = self._declared(columns)
+        writer = self.pa.ipc.new_stream(self.stream, schema)
+        count = 0
+        for batch in _chunks(rows, self.batch_size):
+            writer.write_batch(self._batch(batch, schema, converters))
+            count += len(batch)
+        return writer, count
+
+    def _write_inferred(self, rows):
+        rows = (r if isinstance(r, dict) else dict(zip(_row_keys(r), r)) for r in rows)
+        head, untyped = [], None
+        for row in rows:
+            head.append(row)
+            untyped = {k for k in (row if untyped is None else untyped) if row.get(k) is None}
+            if not untyped and len(head) >= self.batch_size:
+                break
+        schema = self.pa.Table.from_pylist(head).schema
+        writer = self.pa.ipc.new_stream(self.stream, schema)
+        count = 0
+        for batch in itertools.chain(_chunks(head, self.batch_size), _chunks(rows, self.batch_size)):
+            writer.write_table(self.pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+        return writer, count
+
+    def write(self, rows):
+        if self.written:
+            raise RuntimeError("Формат arrow: один набір результатів на вихід (потік Arrow IPC має одну схему).")
+        self.written = True
+        columns = getattr(rows, "columns", None)
+        rows = iter(rows)
+        if columns is None:
+            first = next(rows, None)
+            if first is not None:
+                rows = itertools.chain([first], rows)
+                columns = getattr(first, "columns", None)
+        if columns:
+            writer, count = self._write_declared(columns, rows)
+        else:
+            writer, count = self._write_inferred(rows)
+        writer.close()
+        self.stream.flush()
+        return count
+
+
+def get_writer(fmt, stream):
+    if fmt == "jsonl":
+        return JsonLinesWriter(stream)
+    if fmt == "csv":
+        return CsvWriter(stream)
+    if fmt == "arrow":
+        return ArrowWriter(stream)
+    raise ValueError(f"Невідомий формат: {fmt}")
@@ -0,0 +1,291 @@
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+# Навантажувальний тест рівнів ізоляції для записів journal: N потоків (кожен зі своєю моделлю і з'єднанням)
+# одночасно виконують insert_journal, update_by_pk і delete_by_pk на обраному рівні ізоляції.
+# Оновлення — read-modify-write (прочитати оцінку, записати наступну) над невеликим «гарячим» набором
+# рядків, тож конфлікти гарантовані. Помилки серіалізації (40001) і взаємоблокування (40P01)
+# повторюються з випадковою затримкою. Для кожного рівня виводиться пропускна здатність, частка
+# відкатів, затримки (p50/p95/p99, разом з повторами) і кількість рядків із втраченими оновленнями.
+# Усі рядки тесту створюються з нових journal_id і видаляються наприкінці.
+# Запуск: python bench_isolation.py [--lab RGR|LR2] [--levels ...] [--workers 8] [--ops 200] [--hot 5]
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+LEVELS = ("READ COMMITTED", "REPEATABLE READ", "SERIALIZABLE")
+RETRYABLE_SQLSTATES = {"40001": "serialization_failure", "40P01": "deadlock_detected"}
+OPS = ("insert", "update", "delete")
+
+
+# SQLSTATE винятку драйвера: psycopg (sqlstate), psycopg2 (pgcode), обгортка SQLAlchemy (orig)
+def sqlstate_of(exc):
+    for e in (exc, getattr(exc, "orig", None)):
+        code = getattr(e, "sqlstate", None) or getattr(e, "pgcode", None)
+        if code:
+            return code
+    return None
+
+
+# Відмінності RGR (psycopg, self.conn) і LR2 (SQLAlchemy, self.session), потрібні тесту
+class RgrLab:
+    def __init__(self, model_module):
+        self.Model = model_module.Model
+
+    def rollback(self, model):
+        model.conn.rollback()
+
+    def read_grade(self, model, jid):
+        return model.select_by_pk("journal", "journal_id", jid)[0]["grade"]
+
+    def read_grades(self, model, ids):
+        with model.conn.cursor() as cur:
+            cur.execute("SELECT journal_id, grade FROM journal WHERE journal_id = ANY(%s);", (list(ids),))
+            rows = {r["journal_id"]: r["grade"] for r in cur.fetchall()}
+        model.conn.commit()
+        return rows
+
+    def max_journal_id(self, model):
+        with model.conn.cursor() as cur:
+            cur.execute("SELECT COALESCE(MAX(journal_id), 0) AS m FROM journal;")
+            m = cur.fetchone()["m"]
+        model.conn.commit()
+        return m
+
+
+class Lr2Lab:
+    def __init__(self, model_module):
+        self.Model = model_module.Model
+
+    def rollback(self, model):
+        model.session.rollback()
+
+    def read_grade(self, model, jid):
+        Journal = model.orm.Journal
+        return model.session.query(Journal.grade).filter(Journal.journal_id == jid).one().grade
+
+    def read_grades(self, model, ids):
+        Journal = model.orm.Journal
+        rows = model.session.query(Journal.journal_id, Journal.grade).filter(Journal.journal_id.in_(list(ids))).all()
+        model.session.commit()
+        return {r.journal_id: r.grade for r in rows}
+
+    def max_journal_id(self, model):
+        from sqlalchemy import func
+
+        Journal = model.orm.Journal
+        m = model.session.query(func.coalesce(func.max(Journal.journal_id), 0)).scalar()
+        model.session.commit()
+        return m
+
+
+def load_lab(name):
+    sys.path.insert(0, os.path.join(ROOT, name))
+    import model as model_module
+
+    return (RgrLab if name == "RGR" else Lr2Lab)(model_module)
+
+
+# Спільний стан потоків одного прогону
+class RunState:
+    def __init__(self, next_id, template, hot_ids, hot_grades):
+        self.lock = threading.Lock()
+        self.ids = itertools.count(next_id)
+        self.template = template
+        self.hot = list(hot_ids)
+        self.start_grades = dict(hot_grades)
+        self.increments = {jid: 0 for jid in hot_ids}
+        self.inserted = []
+        self.latencies = []
+        self.committed = {op: 0 for op in OPS}
+        self.aborts = 0
+        self.failed = 0
+        self.errors = {}
+
+    def new_id(self):
+        with self.lock:
+            return next(self.ids)
+
+
+def insert_row(model, t, jid, grade):
+    model.insert_journal(jid, t["student_id"], t["teacher_id"], t["subject_id"], t["entry_date"], grade, "present")
+
+
+# Одна операція; повертає (виконана операція, journal_id) для обліку в спільному стані
+def run_op(lab, model, state, op, rng):
+    if op == "delete":
+        with state.lock:
+            jid = state.inserted.pop(rng.randrange(len(state.inserted))) if state.inserted else None
+        if jid is None:
+            op = "update"
+        else:
+            try:
+                model.delete_by_pk("journal", "journal_id", jid)
+            except Exception:
+                with state.lock:
+                    state.inserted.append(jid)
+                raise
+            return op, None
+    if op == "update":
+        jid = rng.choice(state.hot)
+        grade = lab.read_grade(model, jid)
+        # оцінки тесту лишаються в 1..9: тригер-охоронець дозволяє їх видалити при очищенні
+        model.update_by_pk("journal", "journal_id", jid, {"grade": grade % 9 + 1})
+        return op, jid
+    jid = state.new_id()
+    insert_row(model, state.template, jid, rng.randint(1, 9))
+    return op, jid
+
+
+def worker(lab, level, state, ops, weights, max_retries, seed):
+    rng = random.Random(seed)
+    # повтор усієї транзакції (читання + запис) робить тест, тож повтори моделі вимкнено
+    model = lab.Model(isolation_level=level, retry_attempts=0)
+    try:
+        for _ in range(ops):
+            op = rng.choices(OPS, weights)[0]
+            t0 = time.perf_counter()
+            attempt = 0
+            while True:
+                try:
+                    done, jid = run_op(lab, model, state, op, rng)
+                except Exception as e:
+                    try:
+                        lab.rollback(model)
+                    except Exception:
+                        pass
+                    code = sqlstate_of(e)
+                    if code in RETRYABLE_SQLSTATES:
+                        with state.lock:
+                            state.aborts += 1
+                        if attempt < max_retries:
+                            attempt += 1
+                            # експоненційна затримка з повним джитером
+                            time.sleep(rng.uniform(0, 0.001 * 2 ** min(attempt, 6)))
+                            continue
+                    with state.lock:
+                        state.failed += 1
+                        key = RETRYABLE_SQLSTATES.get(code) or code or type(e).__name__
+                        state.errors[key] = state.errors.get(key, 0) + 1
+                    break
+                with state.lock:
+                    state.committed[done] += 1
+                    state.latencies.append(time.perf_counter() - t0)
+                    if done == "update":
+                        state.increments[jid] += 1
+                    elif done == "insert":
+                        state.inserted.append(jid)
+                break
+    finally:
+        model.close()
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_level(lab, level, args, weights):
+    setup = lab.Model()
+    try:
+        templates = setup.list_table("journal", limit=1)
+        if not templates:
+            raise RuntimeError("journal порожня — згенеруйте дані (python main.py generate journal 1000)")
+        template = templates[0]
+        base = lab.max_journal_id(setup) + 1
+        hot_ids = list(range(base, base + args.hot))
+        for jid in hot_ids:
+            insert_row(setup, template, jid, 1)
+        state = RunState(base + args.hot, template, hot_ids, {jid: 1 for jid in hot_ids})
+
+        threads = [
+            threading.Thread(target=worker, args=(lab, level, state, args.ops, weights, args.max_retries, args.seed + i))
+            for i in range(args.workers)
+        ]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+
+        # втрачене оновлення: фінальна оцінка не відповідає кількості зафіксованих інкрементів
+        final = lab.read_grades(setup, hot_ids)
+        lost = sum(
+            1 for jid in hot_ids
+            if final.get(jid) != (state.start_grades[jid] - 1 + state.increments[jid]) % 9 + 1
+        )
+        for jid in hot_ids + state.inserted:
+            setup.delete_by_pk("journal", "journal_id", jid)
+    finally:
+        setup.close()
+
+    committed = sum(state.committed.values())
+    attempts = committed + state.failed + state.aborts
+    return {
+        "level": level,
+        "ops_s": committed / elapsed if elapsed > 0 else 0.0,
+        "committed": committed,
+        "abort_rate": state.aborts / attempts if attempts else 0.0,
+        "failed": state.failed,
+        "p50": percentile(state.latencies, 0.50) * 1000,
+        "p95": percentile(state.latencies, 0.95) * 1000,
+        "p99": percentile(state.latencies, 0.99) * 1000,
+        "mean": (statistics.fmean(state.latencies) * 1000) if state.latencies else 0.0,
+        "lost": lost,
+        "errors": state.errors,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Конкурентний тест записів journal на різних рівнях ізоляції")
+    parser.add_argument("--lab", choices=("RGR", "LR2"), default="RGR")
+    parser.add_argument("--levels", nargs="+", choices=LEVELS, default=list(LEVELS), metavar="LEVEL",
+                        help="рівні ізоляції (у лапках): " + ", ".join(LEVELS))
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=200, help="операцій на потік")
+    parser.add_argument("--hot", type=int, default=5, help="розмір «гарячого» набору рядків для оновлень")
+    parser.add_argument("--mix", default="30:50:20", help="частки insert:update:delete")
+    parser.add_argument("--max-retries", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    try:
+        weights = [float(x) for x in args.mix.split(":")]
+    except ValueError:
+        weights = []
+    if len(weights) != len(OPS) or sum(weights) <= 0:
+        parser.error("--mix: три невід'ємні частки через двокрапку, наприклад 30:50:20")
+
+    lab = load_lab(args.lab)
+    print(f"{args.lab}: {args.workers} потоків x {args.ops} операцій, гарячих рядків {args.hot}, "
+          f"insert:update:delete = {args.mix}")
+    print(f"{'рівень':<16} {'оп/с':>7} {'відкати':>8} {'відмови':>8} {'p50 ms':>7} {'p95 ms':>7} "
+          f"{'p99 ms':>7} {'втрачені':>9}")
+    results = []
+    for level in args.levels:
+        r = run_level(lab, level, args, weights)
+        results.append(r)
+        print(f"{r['level']:<16} {r['ops_s']:>7.0f} {r['abort_rate']:>8.1%} {r['failed']:>8} {r['p50']:>7.1f} "
+              f"{r['p95']:>7.1f} {r['p99']:>7.1f} {r['lost']:>9}")
+        if r["errors"]:
+            print("  відмови: " + ", ".join(f"{k}: {v}" for k, v in sorted(r["errors"].items())))
+
+    # найдешевший рівень без втрачених оновлень (відмови після всіх повторів — окремий показник)
+    safe = [r for r in results if r["lost"] == 0]
+    if safe:
+        best = max(safe, key=lambda r: r["ops_s"])
+        print(f"Найшвидший безпечний рівень для цього навантаження: {best['level']} ({best['ops_s']:.0f} оп/с, "
+              f"відмов після повторів: {best['failed']})")
+        return 0
+    print("На всіх рівнях є втрачені оновлення.")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
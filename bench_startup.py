@@ -0,0 +1,91 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Бенчмарк холодного старту консольних точок входу (RGR, LR2) на основі `python -X importtime`.
+# Запуск: python bench_startup.py [RGR LR2] [--repeat 5] [--top 10] [--max-ms 100]
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+LABS = ["RGR", "LR2"]
+# Модулі, які не повинні завантажуватися до першої операції з даними
+HEAVY_MODULES = ("psycopg", "psycopg2", "sqlalchemy")
+# Те, що робить main.py до показу меню
+STARTUP_CODE = "import controller; controller.Controller()"
+
+
+# Розбір рядків виду "import time:   self [us] | cumulative | imported package"
+def parse_importtime(stderr):
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us), int(cum_us), depth))
+    return modules
+
+
+def run_once(code, cwd):
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=cwd, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - t0) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return wall_ms, parse_importtime(proc.stderr)
+
+
+def bench_lab(lab, repeat, top, interpreter_ms):
+    cwd = os.path.join(ROOT, lab)
+    walls, import_totals = [], []
+    modules = []
+    for _ in range(repeat):
+        wall_ms, modules = run_once(STARTUP_CODE, cwd)
+        walls.append(wall_ms)
+        # сумарний час імпорту — cumulative модулів верхнього рівня
+        import_totals.append(sum(m[2] for m in modules if m[3] == 1) / 1000)
+
+    wall = statistics.median(walls)
+    print(f"\n=== {lab} ===")
+    print(f"Старт процесу (медіана з {repeat}): {wall:.1f} ms "
+          f"(з них інтерпретатор ~{interpreter_ms:.1f} ms)")
+    print(f"Імпорти: {statistics.median(import_totals):.1f} ms, модулів: {len(modules)}")
+
+    heavy = sorted({m[0] for m in modules if m[0].split(".")[0] in HEAVY_MODULES})
+    if heavy:
+        print("Важкі модулі завантажено при старті: " + ", ".join(heavy[:10]))
+    else:
+        print("Важкі модулі (драйвер/ORM) при старті не завантажуються.")
+
+    print(f"Топ-{top} модулів за власним часом імпорту:")
+    for name, self_us, cum_us, _ in sorted(modules, key=lambda m: -m[1])[:top]:
+        print(f"  {self_us / 1000:8.2f} ms  (cum {cum_us / 1000:8.2f} ms)  {name}")
+    return wall, heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк холодного старту консольних застосунків")
+    parser.add_argument("labs", nargs="*", default=LABS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="ліміт часу старту без урахування інтерпретатора; код 1, якщо перевищено "
+                             "або при старті завантажено драйвер/ORM")
+    args = parser.parse_args(argv)
+
+    interpreter_ms = statistics.median(run_once("pass", ROOT)[0] for _ in range(args.repeat))
+    failed = False
+    for lab in args.labs:
+        wall, heavy = bench_lab(lab, args.repeat, args.top, interpreter_ms)
+        if heavy or (args.max_ms is not None and wall - interpreter_ms > args.max_ms):
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Бенчмарк тригера-охоронця journal (міграція 005): пропускна здатність Model.update_by_pk і
+# Model.delete_by_pk (RGR) з кожним варіантом тригера — без тригера, row (курсорні цикли на кожен рядок)
+# і statement (таблиці переходів), а також одного UPDATE на N рядків.
+# Операції виконуються над тимчасовими копіями існуючих записів journal, які наприкінці видаляються;
+# після вимірювань повертається варіант, що був встановлений до запуску.
+# Запуск: python bench_triggers.py [none row statement] [--ops 300] [--repeat 3]
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "RGR"))
+
+from model import JOURNAL_GUARD_VARIANTS, Model  # noqa: E402
+
+
+# Скопіювати n випадкових записів journal з новими journal_id (оцінки < 10 — видалення дозволене)
+def make_scratch_rows(model, n):
+    with model.conn.cursor() as cur:
+        cur.execute("SELECT COALESCE(MAX(journal_id), 0) AS m FROM journal;")
+        base = cur.fetchone()["m"]
+        # через тимчасову таблицю — не залежить від набору стовпців (компактне кодування чи ні)
+        cur.execute("CREATE TEMP TABLE bench_rows ON COMMIT DROP AS "
+                    "SELECT * FROM journal ORDER BY random() LIMIT %s;", (n,))
+        cur.execute("UPDATE bench_rows b SET journal_id = %s + r.rn, grade = LEAST(b.grade, 9) "
+                    "FROM (SELECT journal_id, row_number() OVER () AS rn FROM bench_rows) r "
+                    "WHERE r.journal_id = b.journal_id;", (base,))
+        cur.execute("INSERT INTO journal SELECT * FROM bench_rows RETURNING journal_id;")
+        ids = [r["journal_id"] for r in cur.fetchall()]
+    model.conn.commit()
+    return ids
+
+
+def drop_scratch_rows(model, ids):
+    with model.conn.cursor() as cur:
+        cur.execute("DELETE FROM journal WHERE journal_id = ANY(%s);", (ids,))
+    model.conn.commit()
+
+
+# Операцій за секунду для кожного виклику fn(journal_id)
+def run_ops(ids, fn):
+    t0 = time.perf_counter()
+    for jid in ids:
+        fn(jid)
+    elapsed = time.perf_counter() - t0
+    return len(ids) / elapsed
+
+
+def bench_variant(model, variant, ops, repeat):
+    model.install_journal_guard(variant)
+    updates, deletes, bulk = [], [], []
+    for i in range(repeat):
+        ids = make_scratch_rows(model, ops)
+        try:
+            updates.append(run_ops(ids, lambda jid: model.update_by_pk(
+                "journal", "journal_id", jid, {"grade": 1 + (jid + i) % 9})))
+            t0 = time.perf_counter()
+            with model.conn.cursor() as cur:
+                cur.execute("UPDATE journal SET grade = COALESCE(grade, 0) %% 9 + 1 WHERE journal_id = ANY(%s);",
+                            (ids,))
+            model.conn.commit()
+            bulk.append((time.perf_counter() - t0) * 1000)
+            deletes.append(run_ops(ids, lambda jid: model.delete_by_pk("journal", "journal_id", jid)))
+        finally:
+            drop_scratch_rows(model, ids)
+    return statistics.median(updates), statistics.median(deletes), statistics.median(bulk)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк варіантів тригера journal (update_by_pk / delete_by_pk)")
+    parser.add_argument("variants", nargs="*", default=list(JOURNAL_GUARD_VARIANTS),
+                        help="варіанти: " + ", ".join(JOURNAL_GUARD_VARIANTS))
+    parser.add_argument("--ops", type=int, default=300, help="операцій update/delete на повтор")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    unknown = [v for v in args.variants if v not in JOURNAL_GUARD_VARIANTS]
+    if unknown:
+        parser.error("невідомі варіанти: " + ", ".join(unknown))
+
+    model = Model()
+    try:
+        original = model.journal_guard_variant()
+        if original is None:
+            print("Міграцію 005 не застосовано — python RGR/main.py migrate", file=sys.stderr)
+            return 1
+        with model.conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) AS n FROM journal;")
+            rows = cur.fetchone()["n"]
+        model.conn.commit()
+        print(f"journal: {rows} рядків; {args.ops} операцій на повтор, медіана з {args.repeat}")
+        print(f"{'варіант':<10} {'update/s':>10} {'delete/s':>10} {'UPDATE x' + str(args.ops):>14}")
+        results = {}
+        try:
+            for variant in args.variants:
+                results[variant] = bench_variant(model, variant, args.ops, args.repeat)
+                upd, dele, bulk = results[variant]
+                print(f"{variant:<10} {upd:>10.0f} {dele:>10.0f} {bulk:>11.1f} ms")
+        finally:
+            model.install_journal_guard(original)
+        if "none" in results:
+            base_upd, base_del, _ = results["none"]
+            for variant, (upd, dele, _) in results.items():
+                if variant != "none":
+                    print(f"{variant}: накладні витрати тригера — update "
+                          f"{(1 / upd - 1 / base_upd) * 1e6:.0f} us/оп, delete {(1 / dele - 1 / base_del) * 1e6:.0f} us/оп")
+    finally:
+        model.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
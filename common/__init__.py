@@ -0,0 +1,4 @@
+# Спільні модулі RGR і LR2: статистика SQL (instrumentation), журнал повільних запитів (slowlog), метрики
+# Prometheus (metrics), трасування (tracing), профілювання команд (profiling), маршрутизація читань на репліки
+# (routing) і повтори при тимчасових помилках БД (retry). Лабораторні додають корінь репозиторію в sys.path
+# модулем common_path.
@@ -0,0 +1,200 @@
+import atexit
+import functools
+import json
+import os
+import re
+import threading
+import time
+
+# Інструментування SQL-операторів моделі: кожне виконання курсора (RGR — підкласи курсорів psycopg,
+# LR2 — події SQLAlchemy before/after_cursor_execute) передається слухачам on_statement(...).
+# Основний слухач — StatementStats: лічильники за «відбитком» оператора (SQL без літералів і зайвих
+# пробілів): кількість викликів, помилки, сумарний/середній/максимальний час і кількість рядків.
+# Статистика спільна для всіх моделей процесу (STATEMENT_STATS); DB_STATS_FILE=шлях.json — записати її
+# у файл при завершенні процесу. Драйвер і SQLAlchemy імпортуються лише при під'єднанні.
+
+STATS_FILE = os.getenv("DB_STATS_FILE")
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+# Відбиток оператора: літерали й числа -> ?, списки (?, ?, ...) -> (?...), пробіли згорнуто
+@functools.lru_cache(maxsize=2048)
+def fingerprint(sql):
+    s = _LITERAL_RE.sub("?", sql)
+    s = _NUMBER_RE.sub("?", s)
+    s = _LIST_RE.sub("(?...)", s)
+    return _SPACE_RE.sub(" ", s).strip().rstrip(";").strip()
+
+
+def statement_text(query, conn=None):
+    if isinstance(query, bytes):
+        return query.decode("utf-8", "replace")
+    if isinstance(query, str):
+        return query
+    # psycopg.sql.Composed / SQL
+    try:
+        return query.as_string(conn)
+    except Exception:
+        return str(query)
+
+
+class StatementStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.started = time.time()
+
+    # Слухач: elapsed — секунди, rows — кількість рядків (None — невідомо),
+    # connection — DBAPI-з'єднання, на якому виконано оператор (для повторного EXPLAIN у slowlog.py)
+    def on_statement(self, sql, params, elapsed, rows, error=None, connection=None):
+        key = fingerprint(sql)
+        with self._lock:
+            s = self._stats.get(key)
+            if s is None:
+                s = self._stats[key] = {"calls": 0, "errors": 0, "total_s": 0.0, "max_s": 0.0, "rows": 0}
+            s["calls"] += 1
+            s["total_s"] += elapsed
+            if elapsed > s["max_s"]:
+                s["max_s"] = elapsed
+            if rows is not None and rows > 0:
+                s["rows"] += rows
+            if error is not None:
+                s["errors"] += 1
+
+    # Рядки статистики за спаданням сумарного часу
+    def snapshot(self, top=None):
+        with self._lock:
+            items = [(k, dict(v)) for k, v in self._stats.items()]
+        rows = []
+        for key, s in sorted(items, key=lambda kv: -kv[1]["total_s"])[:top]:
+            calls = s["calls"] or 1
+            rows.append({
+                "statement": key,
+                "calls": s["calls"],
+                "errors": s["errors"],
+                "total_ms": round(s["total_s"] * 1000, 3),
+                "mean_ms": round(s["total_s"] * 1000 / calls, 3),
+                "max_ms": round(s["max_s"] * 1000, 3),
+                "rows": s["rows"],
+            })
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.started = time.time()
+
+    def dump_json(self, path):
+        data = {"started": self.started, "dumped": time.time(), "statements": self.snapshot()}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+STATEMENT_STATS = StatementStats()
+if STATS_FILE:
+    atexit.register(STATEMENT_STATS.dump_json, STATS_FILE)
+
+
+def notify(listeners, sql, params, elapsed, rows, error=None, connection=None):
+    for listener in listeners:
+        try:
+            listener.on_statement(sql, params, elapsed, rows, error, connection)
+        except Exception:
+            # інструментування не повинно ламати операцію з даними
+            pass
+
+
+# RGR (psycopg 3): класи курсорів, що звітують про кожне execute; слухачі — conn.statement_listeners
+@functools.lru_cache(maxsize=None)
+def psycopg_cursor_classes():
+    import psycopg
+
+    class InstrumentedCursor(psycopg.Cursor):
+        def execute(self, query, params=None, **kwargs):
+            t0 = time.perf_counter()
+            error = None
+            try:
+                return super().execute(query, params, **kwargs)
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                listeners = getattr(self.connection, "statement_listeners", ())
+                if listeners:
+                    rows = self.rowcount if error is None else None
+                    notify(listeners, statement_text(query, self.connection), params,
+                           time.perf_counter() - t0, rows, error, self.connection)
+
+    # серверний курсор: DECLARE і всі порції вибірки — один виклик, про який звітує close()
+    class InstrumentedServerCursor(psycopg.ServerCursor):
+        def execute(self, query, params=None, **kwargs):
+            self._instrumented = [statement_text(query, self.connection), params, 0.0, 0]
+            t0 = time.perf_counter()
+            try:
+                return super().execute(query, params, **kwargs)
+            except Exception as e:
+                listeners = getattr(self.connection, "statement_listeners", ())
+                if listeners:
+                    sql, params, _, _ = self._instrumented
+                    notify(listeners, sql, params, time.perf_counter() - t0, None, e, self.connection)
+                self._instrumented = None
+                raise
+            finally:
+                if getattr(self, "_instrumented", None):
+                    self._instrumented[2] += time.perf_counter() - t0
+
+        def fetchmany(self, size=0):
+            t0 = time.perf_counter()
+            rows = super().fetchmany(size)
+            if getattr(self, "_instrumented", None):
+                self._instrumented[2] += time.perf_counter() - t0
+                self._instrumented[3] += len(rows)
+            return rows
+
+        def close(self):
+            try:
+                super().close()
+            finally:
+                pending, self._instrumented = getattr(self, "_instrumented", None), None
+                listeners = getattr(self.connection, "statement_listeners", ())
+                if pending and listeners:
+                    sql, params, elapsed, rows = pending
+                    notify(listeners, sql, params, elapsed, rows, connection=self.connection)
+
+    return InstrumentedCursor, InstrumentedServerCursor
+
+
+def instrument_psycopg(conn, listeners):
+    cursor_cls, server_cursor_cls = psycopg_cursor_classes()
+    conn.cursor_factory = cursor_cls
+    conn.server_cursor_factory = server_cursor_cls
+    conn.statement_listeners = listeners
+
+
+# LR2 (SQLAlchemy): події engine; час між before і after зберігається в контексті виконання
+def instrument_engine(engine, listeners):
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._statement_t0 = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        t0 = getattr(context, "_statement_t0", None)
+        if t0 is not None:
+            # курсор-адаптер AsyncModel не має connection — для нього EXPLAIN у slowlog.py не виконується
+            notify(listeners, statement, parameters, time.perf_counter() - t0, cursor.rowcount,
+                   connection=getattr(cursor, "connection", None))
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        context = exception_context.execution_context
+        t0 = getattr(context, "_statement_t0", None) if context is not None else None
+        if t0 is not None and exception_context.statement is not None:
+            notify(listeners, exception_context.statement, exception_context.parameters,
+                   time.perf_counter() - t0, None, exception_context.original_exception)
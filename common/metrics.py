@@ -0,0 +1,345 @@
+import functools
+import os
+import threading
+import time
+import types
+import weakref
+
+from common.instrumentation import STATEMENT_STATS, fingerprint
+
+# Метрики процесу в текстовому форматі Prometheus: затримки методів моделі (гістограми), фіксації й
+# відкати транзакцій, влучання в кеші, згенеровані рядки, стан з'єднань/пулу і найдовші SQL-оператори
+# (зі статистики instrumentation.py). Лічильники збираються завжди; HTTP-ендпоінт необов'язковий:
+# DB_METRICS_PORT=9108 (або METRICS.serve(port)) — фоновий потік віддає /metrics.
+# За замовчуванням слухає лише 127.0.0.1 (DB_METRICS_HOST). http.server імпортується лише при запуску.
+
+METRICS_PORT = os.getenv("DB_METRICS_PORT")
+METRICS_HOST = os.getenv("DB_METRICS_HOST", "127.0.0.1")
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STATEMENT_TOP = 20
+STATEMENT_LABEL_CHARS = 200
+
+# прапорці code.co_flags (як у inspect, який не імпортується заради холодного старту)
+CO_GENERATOR = 0x20
+CO_COROUTINE = 0x80
+CO_ASYNC_GENERATOR = 0x200
+
+METRIC_TYPES = {
+    "db_operation_duration_seconds": ("histogram", "Тривалість виклику методу моделі"),
+    "db_operation_errors_total": ("counter", "Виклики методів моделі, що завершилися винятком"),
+    "db_transactions_total": ("counter", "Завершені транзакції за результатом (commit/rollback)"),
+    "db_cache_hits_total": ("counter", "Влучання в кеш"),
+    "db_cache_misses_total": ("counter", "Промахи кешу"),
+    "db_cache_hit_ratio": ("gauge", "Частка влучань у кеш"),
+    "db_generated_rows_total": ("counter", "Рядки, вставлені генераторами generate_*"),
+    "db_generate_seconds_total": ("counter", "Час роботи генераторів generate_*"),
+    "db_generate_rows_per_second": ("gauge", "Швидкість останньої генерації, рядків/с"),
+    "db_pool_size": ("gauge", "Розмір пулу з'єднань"),
+    "db_pool_overflow": ("gauge", "З'єднання понад розмір пулу"),
+    "db_pool_connections": ("gauge", "Відкриті з'єднання: idle — вільні, in_use — зайняті (в транзакції)"),
+    "db_reads_routed_total": ("counter", "Маршрут методів читання: replica, primary (реплік немає), sticky, fallback"),
+    "db_statement_calls_total": ("counter", "Виконання SQL-оператора (найдовші за сумарним часом)"),
+    "db_statement_errors_total": ("counter", "Помилки SQL-оператора"),
+    "db_statement_seconds_total": ("counter", "Сумарний час SQL-оператора"),
+}
+
+
+def _key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        # (назва, мітки) -> [лічильники за кошиками..., сума, кількість]
+        self._histograms = {}
+        # джерела значень, що обчислюються при зчитуванні: fn() -> [(назва, мітки, значення)]
+        self._sources = []
+        self._server = None
+
+    def inc(self, name, labels=None, value=1):
+        key = (name, _key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, labels, value):
+        with self._lock:
+            self._gauges[(name, _key(labels))] = value
+
+    def observe(self, name, value, labels=None):
+        key = (name, _key(labels))
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    h[i] += 1
+                    break
+            h[-2] += value
+            h[-1] += 1
+
+    def add_source(self, fn):
+        self._sources.append(fn)
+
+    def cache_access(self, cache, hit):
+        self.inc("db_cache_hits_total" if hit else "db_cache_misses_total", {"cache": cache})
+
+    # Рядки, вставлені генератором за elapsed секунд
+    def generated(self, table, rows, elapsed):
+        labels = {"table": table}
+        self.inc("db_generated_rows_total", labels, rows)
+        self.inc("db_generate_seconds_total", labels, elapsed)
+        if elapsed > 0:
+            self.set("db_generate_rows_per_second", labels, rows / elapsed)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    # Текстовий формат Prometheus (version 0.0.4)
+    def render(self):
+        samples = {}
+        with self._lock:
+            counters = list(self._counters.items())
+            gauges = list(self._gauges.items())
+            histograms = [(k, list(v)) for k, v in self._histograms.items()]
+        for (name, key), value in counters + gauges:
+            samples.setdefault(name, {})[key] = value
+        for fn in self._sources:
+            try:
+                for name, labels, value in fn():
+                    bucket = samples.setdefault(name, {})
+                    key = _key(labels)
+                    bucket[key] = bucket.get(key, 0) + value
+            except Exception:
+                # недоступне джерело (закрите з'єднання тощо) не повинно ламати зчитування
+                continue
+        hits, misses = samples.get("db_cache_hits_total", {}), samples.get("db_cache_misses_total", {})
+        for key in set(hits) | set(misses):
+            total = hits.get(key, 0) + misses.get(key, 0)
+            if total:
+                samples.setdefault("db_cache_hit_ratio", {})[key] = hits.get(key, 0) / total
+
+        lines = []
+        for name in sorted(samples.keys() | {k[0] for k, _ in histograms}):
+            kind, help_text = METRIC_TYPES.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                for (hname, key), h in sorted(histograms):
+                    if hname != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), h[:-2] + [h[-1] - sum(h[:-2])]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(h[-2])}")
+                    lines.append(f"{name}_count{_format_labels(key)} {h[-1]}")
+                continue
+            for key, value in sorted(samples[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    # Фоновий HTTP-сервер /metrics; повторний виклик повертає вже запущений
+    def serve(self, port, host=METRICS_HOST):
+        if self._server is not None:
+            return self._server
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, int(port)), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        self._server = server
+        return server
+
+    # Запуск ендпоінта, якщо задано DB_METRICS_PORT
+    def serve_from_env(self):
+        if METRICS_PORT and self._server is None:
+            return self.serve(int(METRICS_PORT))
+        return self._server
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+METRICS = Metrics()
+
+
+# Найдовші оператори зі STATEMENT_STATS і кеш відбитків (lru_cache)
+def _statement_samples():
+    for row in STATEMENT_STATS.snapshot(top=STATEMENT_TOP):
+        labels = {"statement": row["statement"][:STATEMENT_LABEL_CHARS]}
+        yield "db_statement_calls_total", labels, row["calls"]
+        yield "db_statement_errors_total", labels, row["errors"]
+        yield "db_statement_seconds_total", labels, row["total_ms"] / 1000
+    info = fingerprint.cache_info()
+    yield "db_cache_hits_total", {"cache": "statement_fingerprint"}, info.hits
+    yield "db_cache_misses_total", {"cache": "statement_fingerprint"}, info.misses
+
+
+METRICS.add_source(_statement_samples)
+
+
+def _code_flags(fn):
+    while hasattr(fn, "__wrapped__"):
+        fn = fn.__wrapped__
+    return fn.__code__.co_flags
+
+
+def _timed(fn, model, name):
+    labels = {"model": model, "operation": name}
+
+    if fn.__code__.co_flags & CO_COROUTINE:
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                METRICS.inc("db_operation_errors_total", {**labels, "error": type(e).__name__})
+                raise
+            finally:
+                METRICS.observe("db_operation_duration_seconds", time.perf_counter() - t0, labels)
+    else:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                METRICS.inc("db_operation_errors_total", {**labels, "error": type(e).__name__})
+                raise
+            finally:
+                METRICS.observe("db_operation_duration_seconds", time.perf_counter() - t0, labels)
+
+    wrapper._metrics_timed = True
+    return wrapper
+
+
+# Гістограми затримок для публічних методів класу моделі. Пропускаються генератори й контекстні
+# менеджери (iter_*, transaction — час створення нічого не каже), exclude і вже обгорнуті методи
+# (спільні з іншим класом)
+def timed_methods(cls, exclude=()):
+    for name, fn in list(vars(cls).items()):
+        if name.startswith("_") or name in exclude or not isinstance(fn, types.FunctionType):
+            continue
+        if getattr(fn, "_metrics_timed", False):
+            continue
+        if _code_flags(fn) & (CO_GENERATOR | CO_ASYNC_GENERATOR):
+            continue
+        setattr(cls, name, _timed(fn, cls.__name__, name))
+    return cls
+
+
+# Декоратор генератора даних: метод повертає кількість вставлених рядків
+def generation_metered(table):
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            t0 = time.perf_counter()
+            rows = method(self, *args, **kwargs)
+            METRICS.generated(table, rows or 0, time.perf_counter() - t0)
+            return rows
+
+        return wrapper
+
+    return decorate
+
+
+# RGR (psycopg 3): клас з'єднання, що рахує фіксації й відкати (порожні — без транзакції — не рахуються)
+@functools.lru_cache(maxsize=None)
+def psycopg_connection_class():
+    import psycopg
+    from psycopg.pq import TransactionStatus
+
+    class MeteredConnection(psycopg.Connection):
+        def commit(self):
+            active = self.info.transaction_status != TransactionStatus.IDLE
+            super().commit()
+            if active:
+                METRICS.inc("db_transactions_total", {"outcome": "commit"})
+
+        def rollback(self):
+            active = self.info.transaction_status != TransactionStatus.IDLE
+            super().rollback()
+            if active:
+                METRICS.inc("db_transactions_total", {"outcome": "rollback"})
+
+    return MeteredConnection
+
+
+_engines = weakref.WeakKeyDictionary()
+
+
+def _pool_samples():
+    for engine, model in list(_engines.items()):
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            continue
+        labels = {"model": model}
+        yield "db_pool_size", labels, pool.size()
+        yield "db_pool_overflow", labels, max(0, pool.overflow())
+        yield "db_pool_connections", {**labels, "state": "idle"}, pool.checkedin()
+        yield "db_pool_connections", {**labels, "state": "in_use"}, pool.checkedout()
+
+
+METRICS.add_source(_pool_samples)
+
+
+# LR2 (SQLAlchemy): події commit/rollback і стан пулу engine
+def meter_engine(engine, model):
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "commit")
+    def commit(conn):
+        METRICS.inc("db_transactions_total", {"outcome": "commit"})
+
+    @event.listens_for(engine, "rollback")
+    def rollback(conn):
+        METRICS.inc("db_transactions_total", {"outcome": "rollback"})
+
+    _engines[engine] = model
@@ -0,0 +1,169 @@
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Профілювання команд: кожна команда меню або пакетного режиму виконується під cProfile, семплером стеків
+# і tracemalloc. На команду в каталозі DIR створюються файли NNN-команда.*:
+#   .prof      — статистика cProfile (python -m pstats, snakeviz);
+#   .collapsed — згорнуті стеки семплера ("a;b;c кількість") для flamegraph.pl і speedscope;
+#   .txt       — найдорожчі функції (cumulative/tottime), пік пам'яті й найбільші місця виділення біля піку.
+# Python-частина (форматування View.show_rows, _obj_to_dict, побудова dict_row) видно поруч із часом БД
+# (виклики драйвера). У меню до команди входять і підказки input() — чистий час дає пакетний режим.
+# Увімкнення: python main.py --profile DIR [команда ...] або DB_PROFILE_DIR=DIR.
+# DB_PROFILE_MEMORY=0 — без tracemalloc (він уповільнює код, що багато виділяє),
+# DB_PROFILE_INTERVAL_MS — інтервал семплера (2).
+# cProfile, pstats і tracemalloc імпортуються лише при увімкненні.
+
+PROFILE_DIR = os.getenv("DB_PROFILE_DIR")
+PROFILE_MEMORY = os.getenv("DB_PROFILE_MEMORY", "1") != "0"
+SAMPLE_INTERVAL = float(os.getenv("DB_PROFILE_INTERVAL_MS", "2")) / 1000
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 15
+# знімок пам'яті робиться, коли поточний обсяг виріс на 10% від попереднього знімка
+SNAPSHOT_GROWTH = 1.1
+TRACEMALLOC_FRAMES = 10
+
+_SLUG_RE = re.compile(r"[^\w.-]+")
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+# Фоновий потік: стеки цільового потоку кожні SAMPLE_INTERVAL с і знімок tracemalloc біля піку
+class _Sampler(threading.Thread):
+    def __init__(self, target_ident, memory):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.target = target_ident
+        self.memory = memory
+        self.stacks = {}
+        self.samples = 0
+        self.snapshot = None
+        self.snapshot_size = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        import tracemalloc
+
+        while not self._stop_event.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.target)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+                self.samples += 1
+            if self.memory and tracemalloc.is_tracing():
+                current, _ = tracemalloc.get_traced_memory()
+                if current > max(self.snapshot_size * SNAPSHOT_GROWTH, 1 << 20):
+                    self.snapshot = tracemalloc.take_snapshot()
+                    self.snapshot_size = current
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class CommandProfiler:
+    def __init__(self):
+        self.out_dir = None
+        self.memory = True
+        self.seq = 0
+
+    @property
+    def enabled(self):
+        return self.out_dir is not None
+
+    def start(self, out_dir, memory=PROFILE_MEMORY):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.memory = memory
+
+    def stop(self):
+        self.out_dir = None
+
+    # Контекст однієї команди; без увімкненого профілювання нічого не робить
+    def command(self, name):
+        if not self.enabled:
+            return nullcontext()
+        return self._profile(name)
+
+    @contextmanager
+    def _profile(self, name):
+        import cProfile
+        import tracemalloc
+
+        self.seq += 1
+        base = os.path.join(self.out_dir, f"{self.seq:03d}-{_SLUG_RE.sub('_', name).strip('_')[:60]}")
+        started_tracing = False
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                started_tracing = True
+            tracemalloc.reset_peak()
+            mem_base = tracemalloc.get_traced_memory()[0]
+        sampler = _Sampler(threading.get_ident(), self.memory)
+        profiler = cProfile.Profile()
+        sampler.start()
+        t0 = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - t0
+            sampler.stop()
+            peak = 0
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak -= mem_base
+                if sampler.snapshot is None:
+                    sampler.snapshot, sampler.snapshot_size = tracemalloc.take_snapshot(), current
+                if started_tracing:
+                    tracemalloc.stop()
+            self._write(base, name, elapsed, profiler, sampler, peak)
+
+    def _write(self, base, name, elapsed, profiler, sampler, peak):
+        import io
+        import pstats
+
+        profiler.dump_stats(base + ".prof")
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            for stack, count in sorted(sampler.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+        out = io.StringIO()
+        out.write(f"Команда: {name}\nЧас: {elapsed * 1000:.1f} ms, семплів стеку: {sampler.samples} "
+                  f"(інтервал {SAMPLE_INTERVAL * 1000:g} ms)\n")
+        if self.memory:
+            out.write(f"Пік пам'яті (tracemalloc, від початку команди): {peak / 1024:.1f} KiB\n")
+        for sort in ("cumulative", "tottime"):
+            out.write(f"\n--- cProfile, {sort} ---\n")
+            pstats.Stats(profiler, stream=out).strip_dirs().sort_stats(sort).print_stats(TOP_FUNCTIONS)
+        if sampler.snapshot is not None:
+            import tracemalloc
+
+            snapshot = sampler.snapshot.filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            ))
+            out.write(f"\n--- Найбільші місця виділення пам'яті (знімок біля піку, "
+                      f"{sampler.snapshot_size / 1024:.1f} KiB) ---\n")
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                out.write(f"{stat}\n")
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        print(f"[profile] {name}: {elapsed * 1000:.1f} ms"
+              + (f", пік пам'яті {peak / 1024:.1f} KiB" if self.memory else "")
+              + f" -> {base}.prof/.collapsed/.txt", file=sys.stderr)
+
+
+PROFILER = CommandProfiler()
+if PROFILE_DIR:
+    PROFILER.start(PROFILE_DIR)
@@ -0,0 +1,103 @@
+import functools
+import os
+import random
+import time
+
+# Повтор операцій моделі при тимчасових помилках БД.
+# Помилки класифікуються за SQLSTATE:
+#   TRANSACTION — транзакцію відкочено сервером (серіалізація, взаємоблокування, очікування блокування):
+#                 нічого не зафіксовано, тож повторювати можна будь-яку операцію;
+#   CONNECTION  — з'єднання втрачено: результат COMMIT невідомий, повторюються лише ідемпотентні операції.
+# Решта (порушення обмежень, синтаксис, відмова тригера) не повторюється.
+# Модуль не імпортує драйвер: винятки psycopg, psycopg2 і SQLAlchemy розпізнаються за атрибутами.
+
+TRANSACTION = "transaction"
+CONNECTION = "connection"
+
+RETRY_ATTEMPTS = int(os.getenv("DB_RETRY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = 0.05
+RETRY_MAX_DELAY = 2.0
+
+RETRYABLE_SQLSTATES = {
+    "40001": TRANSACTION,  # serialization_failure
+    "40P01": TRANSACTION,  # deadlock_detected
+    "55P03": TRANSACTION,  # lock_not_available
+    "57P01": CONNECTION,  # admin_shutdown
+    "57P02": CONNECTION,  # crash_shutdown
+    "57P03": CONNECTION,  # cannot_connect_now
+    "53300": CONNECTION,  # too_many_connections
+}
+DB_ERROR_MODULES = ("psycopg", "psycopg2", "sqlalchemy")
+
+
+# SQLSTATE винятку: psycopg (sqlstate), psycopg2 (pgcode), обгортка SQLAlchemy (orig)
+def sqlstate_of(exc):
+    for e in (exc, getattr(exc, "orig", None)):
+        code = getattr(e, "sqlstate", None) or getattr(e, "pgcode", None)
+        if code:
+            return code
+    return None
+
+
+# Чи виняток від драйвера або SQLAlchemy (а не ValidationError тощо)
+def is_database_error(exc):
+    return type(exc).__module__.split(".")[0] in DB_ERROR_MODULES
+
+
+# TRANSACTION, CONNECTION або None (не повторювати)
+def classify(exc):
+    if not is_database_error(exc):
+        return None
+    if getattr(exc, "connection_invalidated", False):
+        return CONNECTION
+    code = sqlstate_of(exc)
+    if code is None:
+        # без SQLSTATE — помилка на боці клієнта: розірване з'єднання, недоступний сервер
+        names = {type(e).__name__ for e in (exc, getattr(exc, "orig", None)) if e is not None}
+        return CONNECTION if names & {"OperationalError", "InterfaceError"} else None
+    if code.startswith("08"):
+        return CONNECTION
+    return RETRYABLE_SQLSTATES.get(code)
+
+
+# Експоненційна затримка з повним джитером
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+# Декоратор методу моделі. Модель надає retry_attempts, retry_stats і _recover(kind).
+# idempotent=False — операція повторюється лише після відкату транзакції сервером.
+# Повторює тільки зовнішній виклик: вкладені методи моделі (row_exists усередині insert_*) помилку пропускають вгору
+def retrying(idempotent=True):
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self._retry_depth:
+                return method(self, *args, **kwargs)
+            attempt = 0
+            while True:
+                self._retry_depth += 1
+                try:
+                    return method(self, *args, **kwargs)
+                except Exception as e:
+                    kind = classify(e)
+                    if is_database_error(e):
+                        self._recover(kind or TRANSACTION)
+                    if kind is None or (kind == CONNECTION and not idempotent):
+                        raise
+                    if attempt >= self.retry_attempts:
+                        self.retry_stats["gave_up"] += 1
+                        raise
+                    self.retry_stats[kind] += 1
+                    time.sleep(backoff_delay(attempt))
+                    attempt += 1
+                finally:
+                    self._retry_depth -= 1
+
+        return wrapper
+
+    return decorate
+
+
+def new_retry_stats():
+    return {TRANSACTION: 0, CONNECTION: 0, "gave_up": 0}
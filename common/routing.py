@@ -0,0 +1,125 @@
+import functools
+import os
+import time
+
+from common.metrics import METRICS
+from common.retry import is_database_error
+
+# Маршрутизація читань на репліки: методи моделі з декоратором read_only (перегляд таблиць, складні запити,
+# підрахунки й попередній перегляд FK) виконуються на репліці потокової реплікації, решта — на основному сервері.
+# Read-your-writes: після фіксації на основному модель «липне» до нього, доки репліка не відтворить WAL
+# до позиції основного (pg_current_wal_lsn -> pg_last_wal_replay_lsn). Позиція запитується лише при
+# наступному читанні, тож серія записів коштує один запит.
+# Репліка з помилкою БД виключається на DB_REPLICA_RETRY_S секунд, а читання повторюється на основному.
+# Налаштування: DB_REPLICAS=host[:port],host[:port] (користувач, пароль і БД — ті самі, що в DB).
+# Усередині transaction() і вкладених викликів методів запису все йде на основний сервер.
+
+REPLICAS = os.getenv("DB_REPLICAS", "")
+REPLICA_RETRY_S = float(os.getenv("DB_REPLICA_RETRY_S", "30"))
+
+# маршрут читання: основний сервер (індекси >= 0 — репліки)
+PRIMARY = -1
+
+
+# "host:port,host" -> параметри з'єднання кожної репліки на основі DB
+def parse_replicas(value, db):
+    replicas = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(":")
+        replicas.append({**db, "host": host, "port": port or db["port"]})
+    return replicas
+
+
+class ReplicaRouter:
+    def __init__(self, replicas):
+        self.replicas = replicas
+        self._next = 0
+        self._down_until = {}
+        # після фіксації на основному: потрібна нова позиція WAL (dirty) / позиція, яку має наздогнати репліка
+        self.dirty = False
+        self.sticky_lsn = None
+
+    # Маршрутизатор з DB_REPLICAS; None — реплік немає, усе йде на основний сервер
+    @classmethod
+    def from_env(cls, db):
+        replicas = parse_replicas(REPLICAS, db)
+        return cls(replicas) if replicas else None
+
+    # Наступна доступна репліка по колу; None — усі виключені
+    def pick(self):
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            index = self._next
+            self._next = (self._next + 1) % len(self.replicas)
+            if self._down_until.get(index, 0) <= now:
+                return index
+        return None
+
+    def mark_down(self, index):
+        self._down_until[index] = time.monotonic() + REPLICA_RETRY_S
+
+    def wrote(self):
+        self.dirty = True
+
+
+def _routed(target):
+    METRICS.inc("db_reads_routed_total", {"target": target})
+
+
+# Вибір маршруту для читання. Модель надає _primary_lsn(), _replica_replayed(index, lsn), _drop_replica(index)
+def choose_route(model):
+    router = model.router
+    index = router.pick()
+    if index is None:
+        _routed("primary")
+        return PRIMARY
+    try:
+        if router.dirty:
+            router.sticky_lsn = model._primary_lsn()
+            router.dirty = False
+        if router.sticky_lsn is not None:
+            if not model._replica_replayed(index, router.sticky_lsn):
+                _routed("sticky")
+                return PRIMARY
+            router.sticky_lsn = None
+    except Exception as e:
+        if not is_database_error(e):
+            raise
+        router.mark_down(index)
+        model._drop_replica(index)
+        _routed("fallback")
+        return PRIMARY
+    _routed("replica")
+    return index
+
+
+# Декоратор методу читання. Модель надає router (ReplicaRouter або None) і _read_route (None поза читанням).
+# Маршрутизується лише зовнішній виклик поза transaction(): _retry_depth == 0
+def read_only(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.router is None or self._retry_depth or self._read_route is not None:
+            return method(self, *args, **kwargs)
+        route = choose_route(self)
+        self._read_route = route
+        try:
+            return method(self, *args, **kwargs)
+        except Exception as e:
+            if route == PRIMARY or not is_database_error(e):
+                raise
+            # репліка недоступна або відстала (наприклад, ще без нової міграції) — читання на основному
+            self.router.mark_down(route)
+            self._drop_replica(route)
+            _routed("fallback")
+        finally:
+            self._read_route = None
+        self._read_route = PRIMARY
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._read_route = None
+
+    return wrapper
@@ -0,0 +1,191 @@
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Журнал повільних запитів: слухач instrumentation.py, який для кожного оператора, довшого за поріг,
+# записує SQL, параметри, час і план EXPLAIN (FORMAT JSON), отриманий повторним запуском на тому ж
+# з'єднанні. SELECT виконується повторно з ANALYZE, BUFFERS; для INSERT/UPDATE/DELETE за замовчуванням
+# лише план (без виконання), з analyze_writes — ANALYZE у точці збереження, яка одразу відкочується.
+# Методи моделі з декоратором slow_logged (складні запити, генератори, delete_all, ...) пишуться в журнал
+# і тоді, коли повільний весь виклик, а не окремий оператор: з переліком його найдовших операторів.
+# Формат — JSON Lines з ротацією файлу (RotatingFileHandler).
+# Налаштування: DB_SLOW_MS=поріг у мс (вмикає журнал), DB_SLOW_LOG=шлях (slow_queries.log),
+# DB_SLOW_ANALYZE_WRITES=1.
+
+SLOW_MS = os.getenv("DB_SLOW_MS")
+SLOW_LOG = os.getenv("DB_SLOW_LOG", "slow_queries.log")
+SLOW_ANALYZE_WRITES = os.getenv("DB_SLOW_ANALYZE_WRITES", "0") == "1"
+SLOW_LOG_MAX_BYTES = 5 * 1024 * 1024
+SLOW_LOG_BACKUPS = 3
+MAX_PARAMS_CHARS = 2000
+CALL_TOP_STATEMENTS = 5
+
+_EXPLAINABLE_RE = re.compile(r"^\s*(SELECT|WITH|VALUES|INSERT|UPDATE|DELETE|MERGE)\b", re.I)
+_WRITE_RE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.I)
+
+_loggers = {}
+_loggers_lock = threading.Lock()
+
+
+# Окремий логер з ротацією на кожен файл (спільний для всіх моделей процесу)
+def _file_logger(path):
+    path = os.path.abspath(path)
+    with _loggers_lock:
+        logger = _loggers.get(path)
+        if logger is None:
+            logger = logging.getLogger(f"slowlog.{path}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=SLOW_LOG_MAX_BYTES, backupCount=SLOW_LOG_BACKUPS, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            _loggers[path] = logger
+        return logger
+
+
+def _short(value):
+    text = repr(value)
+    return text if len(text) <= MAX_PARAMS_CHARS else text[:MAX_PARAMS_CHARS] + "..."
+
+
+def _first_value(row):
+    if isinstance(row, dict):
+        return next(iter(row.values()))
+    return row[0]
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms, path=SLOW_LOG, analyze_writes=SLOW_ANALYZE_WRITES):
+        self.threshold = threshold_ms / 1000.0
+        self.path = path
+        self.analyze_writes = analyze_writes
+        self._logger = _file_logger(path)
+        self._local = threading.local()
+
+    # Журнал із налаштувань оточення; None, якщо DB_SLOW_MS не задано
+    @classmethod
+    def from_env(cls):
+        if not SLOW_MS:
+            return None
+        return cls(float(SLOW_MS))
+
+    def _frames(self):
+        frames = getattr(self._local, "frames", None)
+        if frames is None:
+            frames = self._local.frames = []
+        return frames
+
+    # Слухач instrumentation.py
+    def on_statement(self, sql, params, elapsed, rows, error=None, connection=None):
+        # оператори самого EXPLAIN не журналюються
+        if getattr(self._local, "busy", False):
+            return
+        frames = self._frames()
+        for frame in frames:
+            frame["statements"].append((elapsed, sql, params, rows, connection))
+        if elapsed < self.threshold or error is not None:
+            return
+        entry = {
+            "kind": "statement",
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "sql": sql,
+            "params": _short(params),
+            "rows": rows,
+        }
+        entry.update(self.explain(connection, sql, params, analyze=True))
+        for frame in frames:
+            frame["logged"] = True
+        self.write(entry)
+
+    # Виклик методу моделі: якщо повільний увесь виклик, а окремі оператори — ні, журналюється виклик
+    @contextmanager
+    def call(self, method, args, kwargs):
+        frame = {"statements": [], "logged": False}
+        frames = self._frames()
+        frames.append(frame)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            frames.pop()
+            if frames and frame["logged"]:
+                frames[-1]["logged"] = True
+            if elapsed >= self.threshold and not frame["logged"]:
+                top = sorted(frame["statements"], key=lambda s: -s[0])[:CALL_TOP_STATEMENTS]
+                entry = {
+                    "kind": "call",
+                    "method": method,
+                    "args": _short(args),
+                    "kwargs": _short(kwargs),
+                    "elapsed_ms": round(elapsed * 1000, 3),
+                    "statements_count": len(frame["statements"]),
+                    "statements_ms": round(sum(s[0] for s in frame["statements"]) * 1000, 3),
+                    "top_statements": [
+                        {"elapsed_ms": round(s[0] * 1000, 3), "sql": s[1], "params": _short(s[2]), "rows": s[3]}
+                        for s in top
+                    ],
+                }
+                if top:
+                    # транзакцію виклику вже завершено — для найдовшого оператора лише план
+                    entry.update(self.explain(top[0][4], top[0][1], top[0][2], analyze=False))
+                self.write(entry)
+
+    # План оператора повторним EXPLAIN у точці збереження; повертає {"plan": ...} або {"plan_error": ...}
+    def explain(self, connection, sql, params, analyze):
+        if connection is None or not _EXPLAINABLE_RE.match(sql):
+            return {"plan": None}
+        write = bool(_WRITE_RE.search(sql))
+        analyze = analyze and (self.analyze_writes or not write)
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+        self._local.busy = True
+        cur = None
+        try:
+            cur = connection.cursor()
+            cur.execute("SAVEPOINT slowlog_explain")
+            try:
+                cur.execute(f"EXPLAIN ({options}) {sql}", params)
+                plan = _first_value(cur.fetchone())
+            except Exception as e:
+                cur.execute("ROLLBACK TO SAVEPOINT slowlog_explain")
+                return {"plan": None, "plan_error": str(e).strip()}
+            # ANALYZE виконав оператор — його ефекти відкочуються
+            cur.execute("ROLLBACK TO SAVEPOINT slowlog_explain")
+            cur.execute("RELEASE SAVEPOINT slowlog_explain")
+            return {"plan": plan, "analyze": analyze}
+        except Exception as e:
+            # з'єднання в перерваній транзакції або закрите — лише текст помилки
+            return {"plan": None, "plan_error": str(e).strip()}
+        finally:
+            if cur is not None:
+                try:
+                    cur.close()
+                except Exception:
+                    pass
+            self._local.busy = False
+
+    def write(self, entry):
+        entry = {"ts": datetime.now().isoformat(timespec="milliseconds"), **entry}
+        self._logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+# Декоратор методу моделі (модель надає slow_log — SlowQueryLog або None)
+def slow_logged(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        log = self.slow_log
+        if log is None:
+            return method(self, *args, **kwargs)
+        with log.call(method.__name__, args, kwargs):
+            return method(self, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Тести спільного пакета common імпортують його з кореня репозиторію, як модулі лабораторних через common_path.
+# Запуск: python -m pytest common/tests
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
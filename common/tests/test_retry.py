@@ -0,0 +1,136 @@
+import pytest
+
+from common import retry
+from common.retry import CONNECTION, TRANSACTION, backoff_delay, classify, new_retry_stats, retrying
+
+
+# Виняток, схожий на виняток драйвера: модуль psycopg/psycopg2/sqlalchemy і атрибути SQLSTATE
+def db_error(name="DatabaseError", module="psycopg.errors", **attrs):
+    exc = type(name, (Exception,), {"__module__": module})("boom")
+    for key, value in attrs.items():
+        setattr(exc, key, value)
+    return exc
+
+
+@pytest.mark.parametrize("code, kind", [
+    ("40001", TRANSACTION),
+    ("40P01", TRANSACTION),
+    ("55P03", TRANSACTION),
+    ("57P01", CONNECTION),
+    ("53300", CONNECTION),
+    ("08006", CONNECTION),
+    ("23505", None),
+    ("42601", None),
+])
+def test_classify_by_sqlstate(code, kind):
+    assert classify(db_error(sqlstate=code)) == kind
+
+
+def test_classify_psycopg2_pgcode():
+    assert classify(db_error(module="psycopg2.errors", pgcode="40001")) == TRANSACTION
+
+
+def test_classify_sqlalchemy_wrapper():
+    orig = db_error(sqlstate="40P01")
+    assert classify(db_error("OperationalError", "sqlalchemy.exc", orig=orig)) == TRANSACTION
+    assert classify(db_error("DBAPIError", "sqlalchemy.exc", orig=None, connection_invalidated=True)) == CONNECTION
+
+
+def test_classify_without_sqlstate():
+    assert classify(db_error("OperationalError")) == CONNECTION
+    assert classify(db_error("InterfaceError", "psycopg2")) == CONNECTION
+    assert classify(db_error("ProgrammingError")) is None
+
+
+def test_classify_ignores_non_database_errors():
+    exc = ValueError("boom")
+    exc.sqlstate = "40001"
+    assert classify(exc) is None
+
+
+@pytest.mark.parametrize("attempt, bound", [(0, 0.05), (3, 0.4), (10, 2.0)])
+def test_backoff_delay_bounds(monkeypatch, attempt, bound):
+    monkeypatch.setattr(retry.random, "uniform", lambda low, high: (low, high))
+    assert backoff_delay(attempt) == (0, pytest.approx(bound))
+
+
+# Модель-замінник: те, що декоратор retrying очікує від моделі
+class FakeModel:
+    def __init__(self, errors, retry_attempts=3):
+        self.errors = list(errors)
+        self.retry_attempts = retry_attempts
+        self.retry_stats = new_retry_stats()
+        self._retry_depth = 0
+        self.recovered = []
+        self.calls = 0
+
+    def _recover(self, kind):
+        self.recovered.append(kind)
+
+    def run(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+    idempotent_op = retrying()(run)
+    write_op = retrying(idempotent=False)(run)
+
+    @retrying()
+    def outer(self):
+        return self.idempotent_op()
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(retry.time, "sleep", lambda s: None)
+
+
+def test_retrying_repeats_rolled_back_transactions():
+    model = FakeModel([db_error(sqlstate="40001"), db_error(sqlstate="40P01")])
+    assert model.write_op() == "ok"
+    assert model.calls == 3
+    assert model.retry_stats == {TRANSACTION: 2, CONNECTION: 0, "gave_up": 0}
+    assert model.recovered == [TRANSACTION, TRANSACTION]
+    assert model._retry_depth == 0
+
+
+def test_retrying_connection_loss_only_for_idempotent():
+    model = FakeModel([db_error(sqlstate="57P01")])
+    assert model.idempotent_op() == "ok"
+    assert model.retry_stats[CONNECTION] == 1
+
+    model = FakeModel([db_error(sqlstate="57P01")])
+    with pytest.raises(Exception, match="boom"):
+        model.write_op()
+    assert model.calls == 1
+    assert model.recovered == [CONNECTION]
+
+
+def test_retrying_gives_up_after_attempts():
+    model = FakeModel([db_error(sqlstate="40001")] * 5, retry_attempts=2)
+    with pytest.raises(Exception, match="boom"):
+        model.idempotent_op()
+    assert model.calls == 3
+    assert model.retry_stats == {TRANSACTION: 2, CONNECTION: 0, "gave_up": 1}
+
+
+def test_retrying_does_not_repeat_permanent_errors():
+    model = FakeModel([db_error(sqlstate="23505")])
+    with pytest.raises(Exception, match="boom"):
+        model.idempotent_op()
+    assert model.calls == 1
+    # помилка БД все одно відкочує транзакцію
+    assert model.recovered == [TRANSACTION]
+
+    model = FakeModel([ValueError("bad input")])
+    with pytest.raises(ValueError):
+        model.idempotent_op()
+    assert model.recovered == []
+
+
+def test_retrying_repeats_only_outer_call():
+    model = FakeModel([db_error(sqlstate="40001")])
+    assert model.outer() == "ok"
+    assert model.calls == 2
+    assert model.retry_stats[TRANSACTION] == 1
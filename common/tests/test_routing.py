@@ -0,0 +1,113 @@
+import pytest
+
+from common import routing
+from common.routing import PRIMARY, ReplicaRouter, choose_route, parse_replicas, read_only
+
+DB = {"dbname": "journal", "user": "postgres", "password": "1111", "host": "primary", "port": "5432"}
+
+
+class ReplicaError(Exception):
+    __module__ = "psycopg.errors"
+
+
+# Модель-замінник: позиції WAL основного сервера і реплік, лічильники звернень
+class FakeModel:
+    def __init__(self, replicas=2, primary_lsn="0/10"):
+        self.router = ReplicaRouter(parse_replicas(",".join(f"r{i}" for i in range(replicas)), DB))
+        self.primary_lsn = primary_lsn
+        self.replayed = {}
+        self.failing = set()
+        self.lsn_queries = 0
+        self.dropped = []
+        self._retry_depth = 0
+        self._read_route = None
+
+    def _primary_lsn(self):
+        self.lsn_queries += 1
+        return self.primary_lsn
+
+    def _replica_replayed(self, index, lsn):
+        if index in self.failing:
+            raise ReplicaError("replica is down")
+        return self.replayed.get(index, False)
+
+    def _drop_replica(self, index):
+        self.dropped.append(index)
+
+    @read_only
+    def read(self):
+        if self._read_route in self.failing:
+            raise ReplicaError("relation does not exist")
+        return self._read_route
+
+
+def test_parse_replicas():
+    replicas = parse_replicas(" r1:5433, ,r2", DB)
+    assert [(r["host"], r["port"]) for r in replicas] == [("r1", "5433"), ("r2", "5432")]
+    assert replicas[0]["dbname"] == "journal"
+
+
+def test_pick_round_robin_skips_marked_down(monkeypatch):
+    router = ReplicaRouter(parse_replicas("r0,r1,r2", DB))
+    assert [router.pick() for _ in range(4)] == [0, 1, 2, 0]
+    router.mark_down(1)
+    assert [router.pick() for _ in range(3)] == [2, 0, 2]
+    monkeypatch.setattr(routing.time, "monotonic", lambda: float("inf"))
+    assert router.pick() == 0
+    assert router.pick() == 1
+
+
+def test_clean_router_reads_from_replica_without_lsn_query():
+    model = FakeModel()
+    assert choose_route(model) == 0
+    assert choose_route(model) == 1
+    assert model.lsn_queries == 0
+
+
+def test_all_replicas_down_routes_to_primary():
+    model = FakeModel(replicas=1)
+    model.router.mark_down(0)
+    assert choose_route(model) == PRIMARY
+
+
+def test_read_after_write_sticks_to_primary_until_replica_catches_up():
+    model = FakeModel(replicas=1)
+    model.router.wrote()
+    model.router.wrote()
+    assert choose_route(model) == PRIMARY
+    assert model.router.sticky_lsn == "0/10"
+    assert choose_route(model) == PRIMARY
+    # серія записів — одна позиція WAL
+    assert model.lsn_queries == 1
+    model.replayed[0] = True
+    assert choose_route(model) == 0
+    assert model.router.sticky_lsn is None
+    assert choose_route(model) == 0
+    assert model.lsn_queries == 1
+
+
+def test_replica_error_falls_back_and_marks_replica_down():
+    model = FakeModel(replicas=2)
+    model.router.wrote()
+    model.failing.add(0)
+    assert choose_route(model) == PRIMARY
+    assert model.dropped == [0]
+    model.replayed[1] = True
+    assert choose_route(model) == 1
+    assert choose_route(model) == 1
+
+
+def test_non_database_error_is_not_swallowed():
+    model = FakeModel(replicas=1)
+    model.router.wrote()
+    model._primary_lsn = lambda: 1 / 0
+    with pytest.raises(ZeroDivisionError):
+        choose_route(model)
+
+
+def test_read_only_retries_failed_replica_read_on_primary():
+    model = FakeModel(replicas=1)
+    model.failing.add(0)
+    assert model.read() == PRIMARY
+    assert model.dropped == [0]
+    assert model._read_route is None
@@ -0,0 +1,197 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import types
+from contextlib import contextmanager
+
+# Трасування: вкладені відрізки (spans) від обробників контролера через методи моделі до кожного
+# SQL-оператора (слухач instrumentation.py). Відрізки записуються у файл у форматі Chrome Trace Event
+# (події "X" з часом початку й тривалістю в мкс) — його відкривають chrome://tracing, Perfetto UI
+# (ui.perfetto.dev) або speedscope; вкладеність відновлюється за часом у межах потоку.
+# Корутини AsyncModel отримують окремі доріжки (tid задачі asyncio), щоб конкурентні виклики не змішувались.
+# Увімкнення: DB_TRACE_FILE=trace.json (файл пишеться при завершенні процесу) або TRACER.start(path).
+# Вимкнений трасувальник коштує одну перевірку прапорця на виклик.
+
+TRACE_FILE = os.getenv("DB_TRACE_FILE")
+MAX_EVENTS = 500000
+MAX_ARG_CHARS = 500
+
+# прапорці code.co_flags (як у inspect, який не імпортується заради холодного старту)
+CO_GENERATOR = 0x20
+CO_COROUTINE = 0x80
+CO_ASYNC_GENERATOR = 0x200
+
+
+def _short(value):
+    text = value if isinstance(value, str) else repr(value)
+    return text if len(text) <= MAX_ARG_CHARS else text[:MAX_ARG_CHARS] + "..."
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self._lock = threading.Lock()
+        self._events = []
+        self._dropped = 0
+        self._tids = {}
+        self._t0 = time.perf_counter()
+        self._atexit = False
+
+    # Почати запис; файл path пишеться dump() або при завершенні процесу
+    def start(self, path):
+        with self._lock:
+            self.path = path
+            self.enabled = True
+            if not self._atexit:
+                atexit.register(self.dump)
+                self._atexit = True
+
+    def stop(self):
+        self.enabled = False
+
+    def _now_us(self):
+        return (time.perf_counter() - self._t0) * 1e6
+
+    # Доріжка: задача asyncio (якщо виклик усередині корутини) або потік
+    def _tid(self):
+        key, name = threading.get_ident(), None
+        asyncio = sys.modules.get("asyncio")
+        if asyncio is not None:
+            try:
+                task = asyncio.current_task()
+            except RuntimeError:
+                task = None
+            if task is not None:
+                key, name = id(task), f"task {task.get_name()}"
+        tid = self._tids.get(key)
+        if tid is None:
+            with self._lock:
+                tid = self._tids.setdefault(key, len(self._tids) + 1)
+                self._events.append({
+                    "ph": "M", "name": "thread_name", "pid": os.getpid(), "tid": tid,
+                    "args": {"name": name or threading.current_thread().name},
+                })
+        return tid
+
+    def _add(self, event):
+        with self._lock:
+            if len(self._events) < MAX_EVENTS:
+                self._events.append(event)
+            else:
+                self._dropped += 1
+
+    # Завершений відрізок: start_us — початок від старту трасувальника, dur_us — тривалість
+    def complete(self, name, cat, start_us, dur_us, args=None, tid=None):
+        event = {
+            "ph": "X", "name": name, "cat": cat, "ts": round(start_us, 3), "dur": round(dur_us, 3),
+            "pid": os.getpid(), "tid": self._tid() if tid is None else tid,
+        }
+        if args:
+            event["args"] = args
+        self._add(event)
+
+    @contextmanager
+    def span(self, name, cat="app", **args):
+        if not self.enabled:
+            yield
+            return
+        tid = self._tid()
+        start = self._now_us()
+        try:
+            yield
+        except BaseException as e:
+            args["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.complete(name, cat, start, self._now_us() - start, args, tid)
+
+    # Слухач instrumentation.py: оператор уже завершився, початок = зараз - elapsed
+    def on_statement(self, sql, params, elapsed, rows, error=None, connection=None):
+        if not self.enabled:
+            return
+        dur = elapsed * 1e6
+        args = {"sql": _short(sql), "rows": rows}
+        if params:
+            args["params"] = _short(params)
+        if error is not None:
+            args["error"] = _short(f"{type(error).__name__}: {error}")
+        self.complete(" ".join(sql.split())[:80], "sql", self._now_us() - dur, dur, args)
+
+    # Записати події у файл (Chrome Trace Event, об'єктна форма)
+    def dump(self, path=None):
+        path = path or self.path
+        if not path:
+            return None
+        with self._lock:
+            events = list(self._events)
+            dropped = self._dropped
+        data = {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"dropped_events": dropped, "max_events": MAX_EVENTS},
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self._tids.clear()
+            self._dropped = 0
+
+
+TRACER = Tracer()
+if TRACE_FILE:
+    TRACER.start(TRACE_FILE)
+
+
+def _code_flags(fn):
+    while hasattr(fn, "__wrapped__"):
+        fn = fn.__wrapped__
+    return fn.__code__.co_flags
+
+
+def _call_args(args, kwargs):
+    out = {"args": _short(args)} if args else {}
+    if kwargs:
+        out["kwargs"] = _short(kwargs)
+    return out
+
+
+def _traced(fn, cat, name):
+    if fn.__code__.co_flags & CO_COROUTINE:
+        @functools.wraps(fn)
+        async def wrapper(self, *args, **kwargs):
+            if not TRACER.enabled:
+                return await fn(self, *args, **kwargs)
+            with TRACER.span(name, cat, **_call_args(args, kwargs)):
+                return await fn(self, *args, **kwargs)
+    else:
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            if not TRACER.enabled:
+                return fn(self, *args, **kwargs)
+            with TRACER.span(name, cat, **_call_args(args, kwargs)):
+                return fn(self, *args, **kwargs)
+
+    wrapper._traced = True
+    return wrapper
+
+
+# Відрізки для публічних методів класу (назва — Клас.метод). Генератори й контекстні менеджери
+# пропускаються (відрізок закрився б до роботи), як і exclude та вже обгорнуті спільні методи
+def traced_methods(cls, exclude=(), cat=None):
+    cat = cat or cls.__name__
+    for name, fn in list(vars(cls).items()):
+        if name.startswith("_") or name in exclude or not isinstance(fn, types.FunctionType):
+            continue
+        if getattr(fn, "_traced", False) or _code_flags(fn) & (CO_GENERATOR | CO_ASYNC_GENERATOR):
+            continue
+        setattr(cls, name, _traced(fn, cat, f"{cls.__name__}.{name}"))
+    return cls